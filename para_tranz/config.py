@@ -1,6 +1,7 @@
 import logging
 import os
 from pathlib import Path
+from typing import Optional
 
 # 从项目根目录的 .env 文件中加载环境变量（可选）
 _env_path = Path(__file__).parent.parent / '.env'
@@ -23,12 +24,18 @@ ORIGINAL_PATH = PROJECT_DIRECTORY / 'original'
 TRANSLATION_PATH = PROJECT_DIRECTORY / 'localization'
 PARA_TRANZ_PATH = PROJECT_DIRECTORY / 'para_tranz' / 'output'
 MAP_PATH = PROJECT_DIRECTORY / 'para_tranz' / 'para_tranz_map.json'
+# 映射表的二进制快照，映射表文件的修改时间或内容未变时跳过解析与校验
+MAP_SNAPSHOT_PATH = PROJECT_DIRECTORY / 'para_tranz' / '.cache' / 'para_tranz_map.pickle'
+# 导出/导入清单，记录各 ParaTranz 数据文件及其输入文件的指纹，输入未变化的文件在导出/导入时跳过
+MANIFEST_PATH = PROJECT_DIRECTORY / 'para_tranz' / '.cache' / 'manifest.json'
 
 # [处理的文件类型]
 # 可选：'jar'、'csv'、'json'、'txt'、'java'，或任意组合
 ENABLED_LOADERS = ['jar', 'csv', 'json', 'txt', 'java']
 
 # [通用配置]
+# 影响导出/导入结果的配置项需要加入 para_tranz/utils/scheduler.py 的 _OUTPUT_CONFIG_NAMES，
+# 以便修改配置后重新处理输入未变化的文件
 # 在导出字符串时是否覆盖已导出字符串的翻译stage状态
 OVERRIDE_STRING_STATUS = False
 # 导出词条上下文前缀文本
@@ -38,6 +45,8 @@ EXPORTED_STRING_CONTEXT_PREFIX = f'{EXPORTED_STRING_CONTEXT_PREFIX_PREFIX}\n'
 IGNORE_CONTEXT_PREFIX_MISMATCH_STRINGS = True
 # Paratranz 平台允许的最大词条key长度
 MAX_STRING_KEY_LENGTH = 256
+# 导出/导入时并行处理文件的进程数，1 为逐个处理，0 为使用CPU核心数，也可使用命令行参数 --jobs N 指定
+PARALLEL_JOBS = 1
 
 # [jar_loader 配置]
 MAGIC = b'\xca\xfe\xba\xbe'
@@ -48,10 +57,25 @@ MAX_CLASS_VER = 0x3D  # 17
 ORIGINAL_TEXT_MATCH_IGNORE_WHITESPACE_CHARS = False
 # 在将译文写回jar文件时，是否允许空译文
 UPDATE_STRING_ALLOW_EMPTY_TRANSLATION = True
+# 读取jar中class文件的并行方式：None 为逐个读取，'thread' 为线程池，'process' 为进程池
+JAR_LOAD_PARALLEL_MODE: Optional[str] = None
+# 并行读取时的最大线程/进程数，None 为使用CPU核心数
+JAR_LOAD_MAX_WORKERS: Optional[int] = None
+# 是否使用磁盘缓存保存class常量表的解析结果，jar中的class文件未变化时跳过解析
+CLASS_CACHE_ENABLED = True
+# 是否忽略已有的class常量表缓存并重新生成
+CLASS_CACHE_REBUILD = False
+# class常量表缓存目录及其大小上限（字节），超出上限时删除最久未使用的缓存
+CLASS_CACHE_PATH = PROJECT_DIRECTORY / 'para_tranz' / '.cache' / 'class_constants'
+CLASS_CACHE_MAX_SIZE = 64 * 1024 * 1024
+# jar原文字符串查找（选项5）使用的三元组索引文件，jar中的class文件变化时增量更新
+JAR_STRING_INDEX_PATH = PROJECT_DIRECTORY / 'para_tranz' / 'jar_string_index.pickle'
 
 # [csv_loader 配置]
 # 在将译文写回csv文件时，是否删除原文为空的译文
 REMOVE_TRANSLATION_WHEN_ORIGINAL_IS_EMPTY = True
+# 在将译文写回csv文件前，是否校验全部行（否则只校验本次有改动的行），也可使用命令行参数 --full-validate 开启
+CSV_FULL_VALIDATE = False
 
 # [ParaTranz 平台配置]
 # 从 .env 文件中读取，详见 .env.example
@@ -1,12 +1,13 @@
 import re
+import time
 from _csv import reader, writer
 from ast import literal_eval
-from csv import DictReader
 from dataclasses import asdict
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
 from para_tranz.config import (
+    CSV_FULL_VALIDATE,
     EXPORTED_STRING_CONTEXT_PREFIX,
     EXPORTED_STRING_CONTEXT_PREFIX_PREFIX,
     IGNORE_CONTEXT_PREFIX_MISMATCH_STRINGS,
@@ -20,12 +21,12 @@ from para_tranz.csv_loader.csv_util import (
     rules_csv_find_text_highlight_targets_adjacent_to_non_space,
     rules_csv_max_highlight_commands_per_paragraph,
 )
+from para_tranz.utils.language import has_cjk, has_latin
 from para_tranz.utils.mapping import PARA_TRANZ_MAP, CsvMapItem
 from para_tranz.utils.util import (
     DataFile,
+    FileWriter,
     String,
-    contains_chinese,
-    contains_english,
     make_logger,
     relative_path,
     replace_weird_chars,
@@ -33,8 +34,53 @@ from para_tranz.utils.util import (
 )
 
 
+class CsvRow:
+    """
+    csv中的一行数据。值以元组保存，同一文件的所有行共用列名到下标的映射，
+    提供与 dict 相同的按列名读写接口
+    """
+
+    __slots__ = ('columns', '_values')
+
+    def __init__(self, columns: Dict[str, int], values: Tuple[str, ...]):
+        self.columns = columns
+        self._values = values
+
+    def __getitem__(self, column: str) -> str:
+        return self._values[self.columns[column]]
+
+    def __setitem__(self, column: str, value: str) -> None:
+        i = self.columns[column]
+        self._values = self._values[:i] + (value,) + self._values[i + 1 :]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def get(self, column: str, default: Optional[str] = None) -> Optional[str]:
+        i = self.columns.get(column)
+        return default if i is None else self._values[i]
+
+    def keys(self):
+        return self.columns.keys()
+
+    def values(self) -> Iterator[str]:
+        values = self._values
+        return (values[i] for i in self.columns.values())
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        values = self._values
+        return ((column, values[i]) for column, i in self.columns.items())
+
+
 class CsvFile(DataFile):
     logger = make_logger('CsvFile')
+    full_validate = CSV_FULL_VALIDATE  # 保存前是否校验全部行，否则只校验有改动的行
 
     def __init__(
         self,
@@ -56,24 +102,33 @@ class CsvFile(DataFile):
         self.column_names: List[str] = []
 
         # 原文数据，以及id列内容到数据的映射
-        self.original_data: List[Dict] = []
-        self.original_id_data: Dict[Tuple, Dict] = {}
+        self.original_data: List[CsvRow] = []
+        self.original_id_data: Dict[Tuple, CsvRow] = {}
+        # 原文每行数据在文件中的起始行号（单元格内可能有换行，与数据行序号不同），
+        # 以及id列内容到数据行序号的映射
+        self.original_row_lines: List[int] = []
+        self.original_id_row_numbers: Dict[Tuple, int] = {}
         # 译文数据，以及id列内容到数据的映射
-        self.translation_data: List[Dict] = []
-        self.translation_id_data: Dict[Tuple, Dict] = {}
+        self.translation_data: List[CsvRow] = []
+        self.translation_id_data: Dict[Tuple, CsvRow] = {}
+        # update_strings 中译文有改动的行id，保存前只校验这些行
+        self.dirty_row_ids: Set[Tuple] = set()
 
         self.load_from_file()
 
     # 将数据转换为 ParaTranz 词条数据对象
     def get_strings(self) -> List[String]:
         strings = []
+        first_column_name = self.column_names[0]
+        # 同一文件的词条共用上下文前缀
+        context_prefix = self.generate_context_prefix()
         for row_id, row in self.original_id_data.items():
             # 只导出id不为空且没有被注释行内的词条
-            first_column = row[list(row.keys())[0]]
+            first_column = row[first_column_name]
             if not any(row_id) or first_column.startswith('#'):
                 continue
 
-            context = self.generate_row_context(row)
+            context = self.generate_row_context_suffix(row_id)
             for col in self.text_column_names:
                 key = self.generate_string_key(row_id, col)
                 original = row[col]
@@ -82,17 +137,22 @@ class CsvFile(DataFile):
                 # 如果已翻译，则使用译文覆盖
                 if row_id in self.translation_id_data:
                     translation = self.translation_id_data[row_id][col]
-                    if contains_chinese(translation) or not contains_english(original):
+                    if has_cjk(translation) or not has_latin(original):
                         stage = 1
                 # 如果原文不包含英文，则设定为已翻译
-                elif not contains_english(original):
+                elif not has_latin(original):
                     stage = 1
                 # 如果尚未翻译（不包含中文），则设定为未翻译
-                elif not contains_chinese(translation):
+                elif not has_cjk(translation):
                     translation = ''
                     stage = 0
 
-                strings.append(String(key, original, translation, stage, context))
+                # 读取csv时已将原文中的 \\n 转换为 ^n，无需再次替换
+                strings.append(
+                    String.trusted(
+                        key, original, translation, stage, context, context_prefix
+                    )
+                )
         return strings
 
     def generate_string_key(self, row_id: Tuple, column: str) -> str:
@@ -131,11 +191,11 @@ class CsvFile(DataFile):
                                 '已设置 REMOVE_TRANSLATION_WHEN_ORIGINAL_IS_EMPTY 为 True，'
                                 '将该译文设为空字符串'
                             )
-                            self.translation_id_data[row_id][column] = ''
+                            self._set_translation(row_id, column, '')
                     else:
                         # 更新译文数据
-                        self.translation_id_data[row_id][column] = s.translation
-                elif contains_chinese(self.translation_id_data[row_id][column]):
+                        self._set_translation(row_id, column, s.translation)
+                elif has_cjk(self.translation_id_data[row_id][column]):
                     self.logger.warning(
                         f'key="{self.generate_string_key(row_id, column)}" 已被翻译，'
                         f'但更新的译文数据未翻译该词条，保持原始翻译不变'
@@ -145,137 +205,198 @@ class CsvFile(DataFile):
                     f'在文件 {self.path} 中没有找到 {self.id_column_name}="{row_id}" 的行，未更新该词条。原文可能已删除，请考虑删除该译文词条'
                 )
 
-    def validate_before_save(self) -> None:
+    def _set_translation(self, row_id: Tuple, column: str, value: str) -> None:
+        row = self.translation_id_data[row_id]
+        if row[column] != value:
+            row[column] = value
+            self.dirty_row_ids.add(row_id)
+
+    def validate_before_save(self, full: Optional[bool] = None) -> None:
+        """
+        保存前校验译文数据。默认只校验本次 update_strings 中有改动的行
+        :param full: 是否校验全部行，为 None 时使用 full_validate 设置
+        """
+        full = self.full_validate if full is None else full
+        if full:
+            row_ids = list(self.translation_id_data)
+        else:
+            row_ids = [
+                row_id for row_id in self.translation_id_data if row_id in self.dirty_row_ids
+            ]
+        if not row_ids:
+            self.logger.info(
+                f'{relative_path(self.translation_path)} 中没有需要校验的改动行，跳过校验'
+            )
+            return
         self.logger.info(
             f'开始在保存前校验 {relative_path(self.translation_path)} 中的译文数据'
+            f'（{"全部" if full else "有改动的"} {len(row_ids)} 行）'
         )
-        for row_id, translated_row in self.translation_id_data.items():
+
+        checks = [('中文引号', self._validate_row_quotes)]
+        if self.path.name == 'rules.csv':
+            checks += [
+                ('选项ID', self._validate_rules_row_option_ids),
+                ('高亮命令数量', self._validate_rules_row_highlight_command_count),
+                ('token与行数', self._validate_rules_row_tokens_and_lines),
+                ('高亮目标', self._validate_rules_row_highlight_targets),
+            ]
+        timings = {name: 0.0 for name, _ in checks}
+
+        for row_id in row_ids:
+            translated_row = self.translation_id_data[row_id]
             if row_id not in self.original_id_data:
                 raise ValueError(
                     f'文件 {relative_path(self.translation_path)} 中存在原文文件没有的有效行：'
                     f'{self.id_column_name}="{row_id}"，请删除该行或同步原文文件'
                 )
             original_row = self.original_id_data[row_id]
-            # 检查译文是否包含中文引号
-            for col, translated_value in translated_row.items():
-                if '“' in translated_value or '”' in translated_value:
-                    raise ValueError(
-                        f'key="{self.generate_string_key(row_id, col)}" 的词条中译文数据包含中文引号，请移除后再保存'
-                    )
-            # 选项ID一致性检查：译文 options 列中各选项的ID必须与原文逐一相同，
-            # ID 错误会导致游戏内找不到规则报错，或对话路由到错误分支。
-            # 注意不能依赖 text 列非空：只添加选项的规则行 text 列为空
-            if self.path.name == 'rules.csv' and translated_row.get('options'):
-                original_option_ids = rules_csv_extract_option_ids(
-                    original_row.get('options', '')
+            for name, check in checks:
+                start = time.perf_counter()
+                check(row_id, original_row, translated_row)
+                timings[name] += time.perf_counter() - start
+
+        self.logger.info(
+            f'校验 {relative_path(self.translation_path)} 中的译文数据完成，各项耗时：'
+            + '，'.join(f'{name} {t * 1000:.1f}ms' for name, t in timings.items())
+        )
+
+    def _validate_row_quotes(
+        self, row_id: Tuple, original_row: CsvRow, translated_row: CsvRow
+    ) -> None:
+        # 检查译文是否包含中文引号
+        for col, translated_value in translated_row.items():
+            if '“' in translated_value or '”' in translated_value:
+                raise ValueError(
+                    f'key="{self.generate_string_key(row_id, col)}" 的词条中译文数据包含中文引号，请移除后再保存'
                 )
-                translated_option_ids = rules_csv_extract_option_ids(
-                    translated_row['options']
+
+    def _validate_rules_row_option_ids(
+        self, row_id: Tuple, original_row: CsvRow, translated_row: CsvRow
+    ) -> None:
+        # 选项ID一致性检查：译文 options 列中各选项的ID必须与原文逐一相同，
+        # ID 错误会导致游戏内找不到规则报错，或对话路由到错误分支。
+        # 注意不能依赖 text 列非空：只添加选项的规则行 text 列为空
+        if translated_row.get('options'):
+            original_option_ids = rules_csv_extract_option_ids(
+                original_row.get('options', '')
+            )
+            translated_option_ids = rules_csv_extract_option_ids(
+                translated_row['options']
+            )
+            if original_option_ids != translated_option_ids:
+                raise ValueError(
+                    f'key="{self.generate_string_key(row_id, "options")}" 的译文选项ID '
+                    f'{translated_option_ids} 与原文选项ID {original_option_ids} 不一致，'
+                    f'请修正译文 options 列中的选项ID'
                 )
-                if original_option_ids != translated_option_ids:
-                    raise ValueError(
-                        f'key="{self.generate_string_key(row_id, "options")}" 的译文选项ID '
-                        f'{translated_option_ids} 与原文选项ID {original_option_ids} 不一致，'
-                        f'请修正译文 options 列中的选项ID'
-                    )
 
-            # 高亮命令数量检查：游戏中每条 Highlight/SetTextHighlights 命令都会
-            # 重置目标段落的全部已有高亮，同一段落多条时只有最后一条生效，
-            # 译文中必须合并为一条多参数命令（AddText 之后为新段落，不受影响）
-            if self.path.name == 'rules.csv' and translated_row.get('script'):
-                highlight_command_count = (
-                    rules_csv_max_highlight_commands_per_paragraph(
-                        translated_row['script']
-                    )
+    def _validate_rules_row_highlight_command_count(
+        self, row_id: Tuple, original_row: CsvRow, translated_row: CsvRow
+    ) -> None:
+        # 高亮命令数量检查：游戏中每条 Highlight/SetTextHighlights 命令都会
+        # 重置目标段落的全部已有高亮，同一段落多条时只有最后一条生效，
+        # 译文中必须合并为一条多参数命令（AddText 之后为新段落，不受影响）
+        if translated_row.get('script'):
+            highlight_command_count = (
+                rules_csv_max_highlight_commands_per_paragraph(
+                    translated_row['script']
+                )
+            )
+            if highlight_command_count > 1:
+                raise ValueError(
+                    f'key="{self.generate_string_key(row_id, "script")}" 的译文script中'
+                    f'同一段落包含 {highlight_command_count} 条正文高亮命令'
+                    f'(Highlight/SetTextHighlights)，后执行的命令会清除先前命令的高亮，'
+                    f'请合并为一条多参数命令'
                 )
-                if highlight_command_count > 1:
-                    raise ValueError(
-                        f'key="{self.generate_string_key(row_id, "script")}" 的译文script中'
-                        f'同一段落包含 {highlight_command_count} 条正文高亮命令'
-                        f'(Highlight/SetTextHighlights)，后执行的命令会清除先前命令的高亮，'
-                        f'请合并为一条多参数命令'
-                    )
 
-            # 针对 rules.csv 的特殊检查（译文不为空时）
-            if self.path.name == 'rules.csv' and translated_row['text']:
-                # 逐列检查：$var token 完整性 和 原译文行数一致性
-                for col, translated_value in translated_row.items():
-                    original_value = original_row[col]
-                    missing_tokens = rules_csv_find_missing_csv_tokens(
-                        original_value, translated_value
-                    )
-                    if missing_tokens:
-                        self.logger.warning(
-                            f'key="{self.generate_string_key(row_id, col)}" 的词条中译文数据缺失了原文中的token {missing_tokens}，请检查'
-                        )
-                    if translated_value and (
-                        original_value.count('\n') != translated_value.count('\n')
-                    ):
-                        # 译文会把 script 中多条高亮命令合并为一条（修复游戏的
-                        # 高亮重置问题），扣除高亮命令行数后行数一致则不告警
-                        if col == 'script' and (
-                            original_value.count('\n')
-                            - rules_csv_count_highlight_commands(original_value)
-                            == translated_value.count('\n')
-                            - rules_csv_count_highlight_commands(translated_value)
-                        ):
-                            continue
-                        self.logger.warning(
-                            f'key="{self.generate_string_key(row_id, col)}" 的词条中原文行数'
-                            f'({original_value.count(chr(10)) + 1})与译文行数'
-                            f'({translated_value.count(chr(10)) + 1})不一致，请检查'
-                        )
+    def _validate_rules_row_tokens_and_lines(
+        self, row_id: Tuple, original_row: CsvRow, translated_row: CsvRow
+    ) -> None:
+        # 针对 rules.csv 的特殊检查（译文不为空时）
+        if not translated_row['text']:
+            return
+        # 逐列检查：$var token 完整性 和 原译文行数一致性
+        for col, translated_value in translated_row.items():
+            original_value = original_row[col]
+            missing_tokens = rules_csv_find_missing_csv_tokens(
+                original_value, translated_value
+            )
+            if missing_tokens:
+                self.logger.warning(
+                    f'key="{self.generate_string_key(row_id, col)}" 的词条中译文数据缺失了原文中的token {missing_tokens}，请检查'
+                )
+            if translated_value and (
+                original_value.count('\n') != translated_value.count('\n')
+            ):
+                # 译文会把 script 中多条高亮命令合并为一条（修复游戏的
+                # 高亮重置问题），扣除高亮命令行数后行数一致则不告警
+                if col == 'script' and (
+                    original_value.count('\n')
+                    - rules_csv_count_highlight_commands(original_value)
+                    == translated_value.count('\n')
+                    - rules_csv_count_highlight_commands(translated_value)
+                ):
+                    continue
+                self.logger.warning(
+                    f'key="{self.generate_string_key(row_id, col)}" 的词条中原文行数'
+                    f'({original_value.count(chr(10)) + 1})与译文行数'
+                    f'({translated_value.count(chr(10)) + 1})不一致，请检查'
+                )
+
+    def _validate_rules_row_highlight_targets(
+        self, row_id: Tuple, original_row: CsvRow, translated_row: CsvRow
+    ) -> None:
+        if not translated_row['text']:
+            return
+        # 高亮目标检查：存在性 + 包围字符合法性
+        # SetTextHighlights 的目标可以出现在 text 或 options 任意一列中
+        script = translated_row['script']
+        highlights = rules_csv_extract_highlight_targets_from_script(script)
+        if highlights:
+            # $token 形式的高亮在原文中也不存在，说明是运行时变量，跳过静态检查
+            original_combined = (
+                original_row['text'] + '\n' + original_row.get('options', '')
+            )
+            runtime_highlights = {
+                h
+                for h in highlights
+                if h.startswith('$') and h not in original_combined
+            }
+            checkable_highlights = highlights - runtime_highlights
 
-                # 高亮目标检查：存在性 + 包围字符合法性
-                # SetTextHighlights 的目标可以出现在 text 或 options 任意一列中
-                script = translated_row['script']
-                highlights = rules_csv_extract_highlight_targets_from_script(script)
-                if highlights:
-                    # $token 形式的高亮在原文中也不存在，说明是运行时变量，跳过静态检查
-                    original_combined = (
-                        original_row['text'] + '\n' + original_row.get('options', '')
+            # 检查可验证的高亮目标是否出现在译文的 text 或 options 中
+            translated_combined = (
+                translated_row['text']
+                + '\n'
+                + translated_row.get('options', '')
+            )
+            missing_highlights = {
+                h for h in checkable_highlights if h not in translated_combined
+            }
+            if missing_highlights:
+                self.logger.warning(
+                    f'key="{self.generate_string_key(row_id, "text")}" / "{self.generate_string_key(row_id, "options")}" 的译文数据中缺失了高亮命令目标 {missing_highlights}，请检查译文数据或script列内容(key="{self.generate_string_key(row_id, "script")}")'
+                )
+
+            # 检查各列中的高亮目标是否被合法字符包围
+            for col, col_value in [
+                ('text', translated_row['text']),
+                ('options', translated_row.get('options', '')),
+            ]:
+                highlights_in_col = {
+                    h for h in checkable_highlights if h in col_value
+                }
+                not_surrounded = (
+                    rules_csv_find_text_highlight_targets_adjacent_to_non_space(
+                        col_value, highlights_in_col
                     )
-                    runtime_highlights = {
-                        h
-                        for h in highlights
-                        if h.startswith('$') and h not in original_combined
-                    }
-                    checkable_highlights = highlights - runtime_highlights
-
-                    # 检查可验证的高亮目标是否出现在译文的 text 或 options 中
-                    translated_combined = (
-                        translated_row['text']
-                        + '\n'
-                        + translated_row.get('options', '')
+                )
+                if not_surrounded:
+                    self.logger.warning(
+                        f'key="{self.generate_string_key(row_id, col)}" 的译文数据中高亮命令目标 {not_surrounded} 左右存在非英文标点和空格的字符，请检查'
                     )
-                    missing_highlights = {
-                        h for h in checkable_highlights if h not in translated_combined
-                    }
-                    if missing_highlights:
-                        self.logger.warning(
-                            f'key="{self.generate_string_key(row_id, "text")}" / "{self.generate_string_key(row_id, "options")}" 的译文数据中缺失了高亮命令目标 {missing_highlights}，请检查译文数据或script列内容(key="{self.generate_string_key(row_id, "script")}")'
-                        )
-
-                    # 检查各列中的高亮目标是否被合法字符包围
-                    for col, col_value in [
-                        ('text', translated_row['text']),
-                        ('options', translated_row.get('options', '')),
-                    ]:
-                        highlights_in_col = {
-                            h for h in checkable_highlights if h in col_value
-                        }
-                        not_surrounded = (
-                            rules_csv_find_text_highlight_targets_adjacent_to_non_space(
-                                col_value, highlights_in_col
-                            )
-                        )
-                        if not_surrounded:
-                            self.logger.warning(
-                                f'key="{self.generate_string_key(row_id, col)}" 的译文数据中高亮命令目标 {not_surrounded} 左右存在非英文标点和空格的字符，请检查'
-                            )
-        self.logger.info(
-            f'校验 {relative_path(self.translation_path)} 中的译文数据完成'
-        )
 
     # 将译文数据写回译文csv中
     def save_file(self) -> None:
@@ -307,8 +428,8 @@ class CsvFile(DataFile):
                     value = value.replace('^n', '\\n').replace('\n', '\r\n')
                     row[real_column_index[col]] = value
             rows.append(row)
-        with open(self.translation_path, 'w', newline='', encoding='utf-8') as f:
-            writer(f, strict=True).writerows(rows)
+        with FileWriter(self.translation_path, newline='') as file_writer:
+            writer(file_writer.file, strict=True).writerows(rows)
 
     # 检查当前数据的有效性，在读取完数据后调用
     def validate_after_load(self):
@@ -344,14 +465,18 @@ class CsvFile(DataFile):
 
     # 从原文和译文csv中读取数据
     def load_from_file(self) -> None:
-        self.column_names, self.original_data, self.original_id_data = self.load_csv(
-            self.original_path, self.id_column_name
-        )
+        (
+            self.column_names,
+            self.original_data,
+            self.original_id_data,
+            self.original_row_lines,
+            self.original_id_row_numbers,
+        ) = self.load_csv(self.original_path, self.id_column_name)
         self.logger.info(
             f'从 {relative_path(self.original_path)} 中加载了 {len(self.original_data)} 行原文数据，其中未被注释且不为空的行数为 {len(self.original_id_data)}'
         )
         if self.translation_path.exists():
-            _, self.translation_data, self.translation_id_data = self.load_csv(
+            _, self.translation_data, self.translation_id_data, _, _ = self.load_csv(
                 self.translation_path, self.id_column_name
             )
             self.logger.info(
@@ -363,48 +488,78 @@ class CsvFile(DataFile):
     @classmethod
     def load_csv(
         cls, path: Path, id_column_name: Union[str, List[str]]
-    ) -> Tuple[List[str], List[Dict], Dict[Tuple, Dict]]:
+    ) -> Tuple[List[str], List[CsvRow], Dict[Tuple, CsvRow], List[int], Dict[Tuple, int]]:
         """
         从csv中读取数据，并返回列名列表，数据以及id列内容到数据的映射
         :param path: csv文件路径
         :param id_column_name: id列名称，只有一列的话传入列名，有多列传入列名list
-        :return: (列名列表, 数据list, id列内容到数据的映射dict)
+        :return: (列名列表, 数据list, id列内容到数据的映射dict,
+                  每行数据在文件中的起始行号list, id列内容到数据行序号的映射dict)
         """
         data = []
         id_data = {}
+        row_lines = []
+        id_row_numbers = {}
         with open(path, 'r', errors='surrogateescape', encoding='utf-8') as csv_file:
             # 替换不可识别的字符，并将原文中的 \n 转换为 ^n，以与csv中的直接换行进行区分
-            csv_lines = [
+            csv_reader = reader(
                 replace_weird_chars(line).replace('\\n', '^n') for line in csv_file
-            ]
-            rows: List[Dict[str, str]] = list(DictReader(csv_lines))
-            if not rows:
+            )
+            header = next(csv_reader, None)
+            if header is None:
                 raise ValueError(f'文件 {path} 为空或缺少数据行')
-            columns = list(rows[0].keys())
-            for i, row in enumerate(rows):
-                if isinstance(id_column_name, str):
-                    row_id = tuple([row[id_column_name]])
-                else:  # 存在多个 id column
-                    row_id = tuple([row[id] for id in id_column_name])
+
+            # 与 csv.DictReader 一致，重名的列（如多个空列名）取最后一列的值
+            column_index = {column: i for i, column in enumerate(header)}
+            columns = list(column_index)
+            id_column_names = (
+                [id_column_name] if isinstance(id_column_name, str) else id_column_name
+            )
+            missing_id_columns = [c for c in id_column_names if c not in column_index]
+            if missing_id_columns:
+                raise ValueError(
+                    f'从 {path} 中未找到指定的id列 {missing_id_columns}，请检查配置文件中的设置。可用的列包括： {columns}'
+                )
+            id_indices = [column_index[c] for c in id_column_names]
+            first_column_index = column_index[columns[0]]
+            column_count = len(header)
+
+            previous_line_num = csv_reader.line_num
+            for values in csv_reader:
+                # 与 csv.DictReader 一致，跳过空行
+                if not values:
+                    previous_line_num = csv_reader.line_num
+                    continue
+                # line_num 为读完该行后的行号，该行跨越多行时减去单元格内的换行数即为起始行号
+                line = csv_reader.line_num
+                if line - previous_line_num > 1:
+                    line -= sum(value.count('\n') for value in values)
+                previous_line_num = csv_reader.line_num
+
+                row_id = tuple([values[i] if i < len(values) else '' for i in id_indices])
 
                 # 检查行内数据长度是否与文件一致
-                for col in row:
-                    if row[col] is None:
-                        row[col] = ''
-                        cls.logger.warning(
-                            f'文件 {path} 第 {i} 行 {id_column_name}="{row_id}" 内的值数量不够，可能是缺少逗号'
-                        )
+                if len(values) < column_count:
+                    cls.logger.warning(
+                        f'文件 {path} 第 {line} 行 {id_column_name}="{row_id}" 内的值数量不够，可能是缺少逗号'
+                    )
+                    values.extend([''] * (column_count - len(values)))
 
-                first_column = row[columns[0]]
+                row = CsvRow(column_index, tuple(values))
                 # 只在 id-row mapping 中存储没有被注释, 且不为空的行
-                if not first_column.startswith('#') and any(row_id):
+                if not values[first_column_index].startswith('#') and any(row_id):
                     if row_id in id_data:
                         raise ValueError(
-                            f'文件 {path} 第 {i} 行 {id_column_name}="{row_id}" 的值在文件中不唯一'
+                            f'文件 {path} 第 {line} 行 {id_column_name}="{row_id}" 的值在文件中不唯一'
                         )
                     id_data[row_id] = row
+                    id_row_numbers[row_id] = len(data)
                 data.append(row)
-        return columns, data, id_data
+                row_lines.append(line)
+
+            if not data:
+                raise ValueError(f'文件 {path} 为空或缺少数据行')
+        return columns, data, id_data, row_lines, id_row_numbers
 
     @classmethod
     def load_files_from_config(cls) -> Sequence['CsvFile']:
@@ -433,15 +588,20 @@ class CsvFile(DataFile):
         ]
         """
         cls.logger.info('开始读取游戏csv数据')
-        files = [
-            cls(**asdict(item))
-            for item in PARA_TRANZ_MAP
-            if isinstance(item, CsvMapItem)
-        ]
+        files = [cls(**kwargs) for kwargs in cls.get_file_configs()]
         cls.logger.info('游戏csv数据读取完成')
         return files
 
+    @classmethod
+    def get_file_configs(cls) -> List[dict]:
+        return [asdict(item) for item in PARA_TRANZ_MAP if isinstance(item, CsvMapItem)]
+
     # 根据行ID，生成该行的词条上下文内容，用于辅助翻译
-    def generate_row_context(self, row: dict) -> str:
-        row_num = self.original_data.index(row)
-        return f'{EXPORTED_STRING_CONTEXT_PREFIX}文件：{self.path.name}\n行：{str(row_num + 1).zfill(5)}'
+    def generate_row_context(self, row_id: Tuple) -> str:
+        return self.generate_context_prefix() + self.generate_row_context_suffix(row_id)
+
+    def generate_context_prefix(self) -> str:
+        return f'{EXPORTED_STRING_CONTEXT_PREFIX}文件：{self.path.name}\n行：'
+
+    def generate_row_context_suffix(self, row_id: Tuple) -> str:
+        return str(self.original_id_row_numbers[row_id] + 1).zfill(5)
@@ -1,5 +1,6 @@
 import re
-from typing import List, Set
+from functools import lru_cache
+from typing import List, Pattern, Set
 
 REGEX_CSV_TOKEN = re.compile(r'\$[a-zA-Z0-9][a-zA-Z0-9_\.]+[a-zA-Z0-9]')
 REGEX_IGNORED_TOKENS = re.compile(
@@ -24,7 +25,7 @@ def rules_csv_extract_csv_tokens(s: str) -> Set[str]:
     Returns:
         Set[str]: token集合
     """
-    return set(re.findall(REGEX_CSV_TOKEN, s))
+    return set(REGEX_CSV_TOKEN.findall(s))
 
 
 class TokenIgnoreCase:
@@ -53,7 +54,7 @@ def rules_csv_find_missing_csv_tokens(original: str, translation: str) -> Set[st
 
     # 去除一些不需要检查的token
     original_token_strs = {
-        token for token in original_tokens if not re.search(REGEX_IGNORED_TOKENS, token)
+        token for token in original_tokens if not REGEX_IGNORED_TOKENS.search(token)
     }
     original_tokens = {TokenIgnoreCase(name) for name in original_token_strs}
 
@@ -125,7 +126,7 @@ def rules_csv_extract_highlight_targets_from_script(script: str) -> Set[str]:
     Returns:
         Set[str]: 高亮string集合
     """
-    highlight_command_params = re.findall(REGEX_HIGHLIGHT_TARGET, script)
+    highlight_command_params = REGEX_HIGHLIGHT_TARGET.findall(script)
     highlights = set()
     for command, param in highlight_command_params:
         for s in parse_highlight_params(param):
@@ -159,6 +160,13 @@ def parse_highlight_params(input_text: str) -> List[str]:
     return result
 
 
+@lru_cache(maxsize=4096)
+def _highlight_target_surrounded_regex(highlight: str) -> Pattern[str]:
+    return re.compile(
+        rf'(?:^|[ {{}}"\']){re.escape(highlight)}(?:$|[ {{}}"\'])', re.MULTILINE
+    )
+
+
 def rules_csv_find_text_highlight_targets_adjacent_to_non_space(
     text: str, highlights: Set[str]
 ) -> Set[str]:
@@ -174,11 +182,7 @@ def rules_csv_find_text_highlight_targets_adjacent_to_non_space(
     return {
         highlight
         for highlight in highlights
-        if not re.search(
-            rf'(?:^|[ {{}}"\']){re.escape(highlight)}(?:$|[ {{}}"\'])',
-            text,
-            re.MULTILINE,
-        )
+        if not _highlight_target_surrounded_regex(highlight).search(text)
     }
 
 
@@ -3,8 +3,9 @@ import json
 import re
 from dataclasses import dataclass
 from pathlib import Path, PurePosixPath
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
+from para_tranz.jar_loader.class_file_loader import ClassFileData
 from para_tranz.jar_loader.constant_table import ConstantTable, Utf8Constant
 from para_tranz.config import (
     EXPORTED_STRING_CONTEXT_PREFIX,
@@ -17,11 +18,11 @@ from para_tranz.config import (
     ORIGINAL_TEXT_MATCH_IGNORE_WHITESPACE_CHARS,
     UPDATE_STRING_ALLOW_EMPTY_TRANSLATION,
 )
+from para_tranz.utils.language import has_cjk, has_latin
 from para_tranz.utils.mapping import ClassFileMapItem, IncludeStringRule
 from para_tranz.utils.util import (
+    ContextLocatorCache,
     String,
-    contains_chinese,
-    contains_english,
     hash_string,
     make_logger,
     should_write_translation,
@@ -58,6 +59,24 @@ class StringOccurrence:
     occurrence_total: int
 
 
+@dataclass
+class ClassStringAnalysis:
+    """
+    class 文件中提取与写回词条共用的查找结构，首次使用时构建，常量表被替换（重新加载）时重新构建。
+
+    constants_by_original：原文 class 中被 StringConstant 引用的 UTF-8 常量，按（规范化后的）原文分组，
+        组内按常量号升序排列，下标即为同值序号。
+    translated_constants_by_index：译文 class 中被 StringConstant 引用的 UTF-8 常量，以常量号为键。
+    extra_ref_indices：原文 class 中同时被 StringConstant 和其他非 String 属性引用的 UTF-8 常量的常量号。
+    """
+
+    original_table: ConstantTable
+    translation_table: ConstantTable
+    constants_by_original: Dict[str, List[Utf8Constant]]
+    translated_constants_by_index: Dict[int, Utf8Constant]
+    extra_ref_indices: FrozenSet[int]
+
+
 class JavaClassFile:
     """
     用于表示游戏文件中可以提取原文和译文的class文件
@@ -65,6 +84,7 @@ class JavaClassFile:
     @param jar_file: 该class文件所在的jar文件对象
     @param path: 该class文件在jar文件中的路径
     @param include_strings: 该class文件中需要提取的原文字符串列表，留空则提取全部字符串
+    @param data: 已读取的class文件数据，传入时不再从jar文件中读取
     """
 
     logger = make_logger('JavaClassFile')
@@ -92,6 +112,7 @@ class JavaClassFile:
         path: str,
         include_strings: Optional[List] = None,
         no_auto_load: bool = False,
+        data: Optional[ClassFileData] = None,
         **kwargs,
     ) -> None:
         self.path_str = path
@@ -116,7 +137,12 @@ class JavaClassFile:
         self.translation_bytes = b''
         self.translation_constant_table = None  # type: Optional[ConstantTable]
 
-        if not no_auto_load:
+        self._string_analysis = None  # type: Optional[ClassStringAnalysis]
+
+        if data is not None:
+            self.load_from_data(data)
+            self.validate()
+        elif not no_auto_load:
             self.load_from_file()
             self.validate()
 
@@ -190,7 +216,41 @@ class JavaClassFile:
             return ''
         return f'（同值序号：{occurrence_index}）'
 
+    def get_string_analysis(self) -> ClassStringAnalysis:
+        """
+        获取 get_strings()、update_strings() 等共用的查找结构，常量表未被替换时直接复用上次的结果
+        """
+        analysis = self._string_analysis
+        if (
+            analysis is None
+            or analysis.original_table is not self.original_table
+            or analysis.translation_table is not self.translation_table
+        ):
+            analysis = self._build_string_analysis()
+            self._string_analysis = analysis
+        return analysis
+
+    def _build_string_analysis(self) -> ClassStringAnalysis:
+        original_table = self.original_table
+        translation_table = self.translation_table
+        return ClassStringAnalysis(
+            original_table=original_table,
+            translation_table=translation_table,
+            constants_by_original=self._build_original_string_constants_mapping(),
+            translated_constants_by_index={
+                c.constant_index: c
+                for c in translation_table.get_utf8_constants_with_string_ref()
+            },
+            extra_ref_indices=frozenset(
+                original_table.utf8_other_references
+                & original_table.utf8_string_references
+            ),
+        )
+
     def _get_original_string_constants_mapping(self) -> Dict[str, List[Utf8Constant]]:
+        return self.get_string_analysis().constants_by_original
+
+    def _build_original_string_constants_mapping(self) -> Dict[str, List[Utf8Constant]]:
         """
         返回原文 class 中，所有被 StringConstant 引用的 UTF-8 常量，按原文分组。
         同一原文的常量按 constant_index 升序排列，下标即为该常量的同值序号（occurrence_index）。
@@ -216,14 +276,12 @@ class JavaClassFile:
         return constants_by_original
 
     def _get_translation_constants_by_index(self) -> Dict[int, Utf8Constant]:
-        return {
-            c.constant_index: c
-            for c in self.translation_table.get_utf8_constants_with_string_ref()
-        }
+        return self.get_string_analysis().translated_constants_by_index
 
     def _get_included_string_occurrences(self) -> List[StringOccurrence]:
-        constants_by_original = self._get_original_string_constants_mapping()
-        translated_constant_index_constants = self._get_translation_constants_by_index()
+        analysis = self.get_string_analysis()
+        constants_by_original = analysis.constants_by_original
+        translated_constant_index_constants = analysis.translated_constants_by_index
         include_rules = {rule.val: rule for rule in self.map_item.get_include_rules()}
         has_include_rules = bool(include_rules)
         added_strings = set()
@@ -334,6 +392,12 @@ class JavaClassFile:
 
     def get_strings(self) -> List[String]:
         strings = []
+        # 同一class文件的词条共用上下文前缀
+        context_prefix = (
+            f'{EXPORTED_STRING_CONTEXT_PREFIX}'
+            f'文件：{self.jar_file.path}\n'
+            f'类：{self.path}\n'
+        )
         for occurrence in self._get_included_string_occurrences():
             original_constant = occurrence.original_constant
             translated_constant = occurrence.translated_constant
@@ -355,18 +419,13 @@ class JavaClassFile:
                 translation = translated_constant.string
                 stage = 1
 
-                if not contains_english(translation):
+                if not has_latin(translation):
                     stage = 1
-                elif not contains_chinese(translation):
+                elif not has_cjk(translation):
                     # translation = ''
                     stage = 0
 
-            context = (
-                f'{EXPORTED_STRING_CONTEXT_PREFIX}'
-                f'文件：{self.jar_file.path}\n'
-                f'类：{self.path}\n'
-                f'常量号：{str(original_constant.constant_index).zfill(4)}\n'
-            )
+            context = f'常量号：{str(original_constant.constant_index).zfill(4)}\n'
             if occurrence.occurrence_total > 1:
                 context += f'同值序号：{occurrence.occurrence_index}\n'
             context += (
@@ -374,7 +433,9 @@ class JavaClassFile:
                 f'译文数据："{translated_constant.string}"'
             )
 
-            strings.append(String(key, original, translation, stage, context))
+            strings.append(
+                String(key, original, translation, stage, context, context_prefix)
+            )
 
         # 按已有的上下文信息排序
         # sorted_strings = sorted(strings, key=lambda s: s.context)
@@ -390,6 +451,14 @@ class JavaClassFile:
 
     @classmethod
     def parse_jar_string_context(cls, context: str) -> JarStringContext:
+        """
+        从词条上下文中解析 jar 词条的定位信息。
+        优先按导出时的固定行布局逐行解析，布局不符时（如手动修改过的上下文）再使用正则匹配
+        """
+        locator = cls._parse_jar_string_context_lines(context)
+        if locator is not None:
+            return locator
+
         match = cls.re_context.search(context)
         if not match:
             raise ValueError(f'无法从上下文中解析 jar 词条定位信息：\n{context}')
@@ -404,21 +473,70 @@ class JavaClassFile:
             else None,
         )
 
-    def update_strings(self, strings: List[String]) -> int:
+    @staticmethod
+    def _parse_jar_string_context_lines(context: str) -> Optional[JarStringContext]:
+        """
+        按 文件：/类：/常量号：/同值序号：/原始数据： 的行布局解析上下文，不使用正则
+        :return: 解析结果，布局不符时返回 None
+        """
+        start = context.find('文件：')
+        if start < 0:
+            return None
+        # 原始数据可能跨行，只拆出前三行，剩余部分再单独处理
+        lines = context[start + len('文件：') :].split('\n', 3)
+        if len(lines) < 4:
+            return None
+        jar_path, class_line, constant_line, rest = lines
+        if not jar_path.endswith('.jar'):
+            return None
+        if not class_line.startswith('类：') or not class_line.endswith('.class'):
+            return None
+        class_path = class_line[len('类：') :]
+        if not constant_line.startswith('常量号：'):
+            return None
+        if not constant_line[len('常量号：') :].isdecimal():
+            return None
+
+        occurrence = None
+        if rest.startswith('同值序号：'):
+            occurrence_line, _, rest = rest.partition('\n')
+            occurrence = occurrence_line[len('同值序号：') :]
+            if not occurrence.isdecimal():
+                return None
+
+        if not rest.startswith('原始数据："'):
+            return None
+        end = rest.find('"\n译文数据：', len('原始数据："'))
+        if end < 0:
+            return None
+        original = rest[len('原始数据："') : end]
+
+        return JarStringContext(
+            jar_path=jar_path,
+            class_path=class_path,
+            original=html.unescape(original),
+            occurrence_index=int(occurrence) if occurrence is not None else None,
+        )
+
+    def update_strings(
+        self,
+        strings: List[String],
+        contexts: Optional[List[JarStringContext]] = None,
+    ) -> int:
         """
         根据传入的 strings 更新译文
         :param strings: 包含译文的string列表
+        :param contexts: 与 strings 一一对应的已解析的词条定位信息，不传入时从词条上下文中解析
         :return: 更新成功的词条数量
         """
-        constants_by_original = self._get_original_string_constants_mapping()
-        translated_constant_index_constants = self._get_translation_constants_by_index()
-        const_ref_by_other_attrs = (
-            self.original_table.get_utf8_constants_with_extra_ref()
-        )
+        analysis = self.get_string_analysis()
+        constants_by_original = analysis.constants_by_original
+        translated_constant_index_constants = analysis.translated_constants_by_index
+        extra_ref_indices = analysis.extra_ref_indices
         include_values = self.map_item.get_include_values()
         update_success_count = 0
 
-        for s in strings:
+        for i, s in enumerate(strings):
             if IGNORE_CONTEXT_PREFIX_MISMATCH_STRINGS and not s.context.startswith(
                 EXPORTED_STRING_CONTEXT_PREFIX_PREFIX
             ):
@@ -427,7 +545,9 @@ class JavaClassFile:
                 )
                 continue
 
-            context = self.parse_jar_string_context(s.context)
+            context = (
+                contexts[i] if contexts is not None else JAR_STRING_LOCATORS.get(s)
+            )
             if context.jar_path != str(self.jar_file.path):
                 raise ValueError(
                     f'词条 key={s.key}{self._format_occurrence_index(context.occurrence_index)} 的上下文 jar 为 {context.jar_path}，'
@@ -497,7 +617,7 @@ class JavaClassFile:
                 continue
 
             # 如果原文在原文jar中只被常量引用
-            if original_constant not in const_ref_by_other_attrs:
+            if original_constant.constant_index not in extra_ref_indices:
                 # 如果译文已被翻译且不为空（这个条件写在里面是因为要优先报出“也被其他非string属性引用”的警告）
                 if should_write_translation(s, UPDATE_STRING_ALLOW_EMPTY_TRANSLATION):
                     translation.string = s.translation
@@ -522,18 +642,8 @@ class JavaClassFile:
         return update_success_count
 
     def generate_translated_bytecode(self) -> bytes:
-        const_table_end_index = self.translation_table.table_end_index
-        assert const_table_end_index is not None
-
-        new_translation_bytes = self.translation_bytes[
-            : 4 + 2 + 2
-        ]  # magic, minor_ver, major_ver
-        new_translation_bytes += self.translation_table.to_bytes()  # 常量表
-        new_translation_bytes += self.translation_bytes[
-            const_table_end_index:
-        ]  # 剩余部分
-
-        return new_translation_bytes
+        # 只重新编码被修改过的常量，其余部分（包括常量表之后的内容）原样复制
+        return self.translation_table.to_class_bytes()
 
     def load_from_file(self) -> None:
         path_str = str(self.path)
@@ -541,13 +651,36 @@ class JavaClassFile:
         self.logger.debug(f'正在读取 {self.jar_file.path}:{path_str} ...')
 
         self.original_bytes = self.jar_file.read_original_class_file(path_str)
-        self.original_constant_table = ConstantTable(self.original_bytes)
+        self.original_constant_table = self.jar_file.create_constant_table(
+            path_str, self.original_bytes
+        )
 
         self.translation_bytes = self.jar_file.read_translation_class_file(path_str)
-        self.translation_constant_table = ConstantTable(self.translation_bytes)
+        self.translation_constant_table = self.jar_file.create_constant_table(
+            path_str, self.translation_bytes, from_translation=True
+        )
 
         self.logger.debug(f'class读取完成: {self.jar_file.path}:{path_str} ')
 
+    def load_from_data(self, data: ClassFileData) -> None:
+        """
+        从已读取并扫描过的数据（如并行读取的结果）中加载，不再重复解析常量表
+        """
+        path_str = str(self.path)
+
+        self.original_bytes = data.original_bytes
+        self.original_constant_table = self.jar_file.create_constant_table(
+            path_str, data.original_bytes, layout=data.original_layout
+        )
+
+        self.translation_bytes = data.translation_bytes
+        self.translation_constant_table = self.jar_file.create_constant_table(
+            path_str,
+            data.translation_bytes,
+            from_translation=True,
+            layout=data.translation_layout,
+        )
+
     def export_map_item(self) -> ClassFileMapItem:
         item = ClassFileMapItem(self.path_str)
         constants_by_original = self._get_original_string_constants_mapping()
@@ -568,6 +701,12 @@ class JavaClassFile:
             self.translation_constant_table = ConstantTable(self.original_bytes)
 
 
+# 本次运行中 jar 词条 key -> 定位信息的缓存，jar 与 class 两层共用
+JAR_STRING_LOCATORS: ContextLocatorCache[JarStringContext] = ContextLocatorCache(
+    JavaClassFile.parse_jar_string_context
+)
+
+
 if __name__ == '__main__':
     from para_tranz.jar_loader.jar_file import JavaJarFile
 
@@ -0,0 +1,82 @@
+"""
+并行读取 jar 中 class 文件时在工作线程/进程中执行的部分。
+
+本模块只依赖 constant_table，不导入映射表或日志模块，以便在子进程中快速导入。
+工作函数只负责解压与扫描常量表，返回可 pickle 的原始字节与常量表布局，
+常量对象仍在主进程中按需创建。
+"""
+
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from para_tranz.jar_loader.constant_table import ConstantTable, ConstantTableLayout
+
+
+@dataclass(frozen=True)
+class ClassFileData:
+    """
+    一个 class 文件在原文和译文 jar 中的字节内容及常量表扫描结果
+    """
+
+    path: str
+    original_bytes: bytes
+    translation_bytes: bytes
+    # 为 None 时在加载时扫描
+    original_layout: Optional[ConstantTableLayout] = None
+    translation_layout: Optional[ConstantTableLayout] = None
+
+
+# (class 文件路径, 读取结果, 出错时的错误信息)
+ClassFileLoadResult = Tuple[str, Optional[ClassFileData], Optional[str]]
+
+
+def _read_member(
+    zf: zipfile.ZipFile, jar_path: Path, class_path: str, jar_kind: str
+) -> bytes:
+    try:
+        return zf.read(class_path)
+    except KeyError:
+        raise FileNotFoundError(
+            f'在{jar_kind}jar文件 {jar_path} 中找不到class文件 {class_path}'
+        )
+
+
+def read_class_files(
+    original_jar_path: Path,
+    translation_jar_path: Path,
+    class_paths: Sequence[str],
+) -> List[ClassFileLoadResult]:
+    """
+    读取并扫描一组 class 文件，每次调用只打开一次原文和译文 jar。
+    单个 class 文件出错不会影响其他文件，错误信息随结果返回。
+    """
+    results: List[ClassFileLoadResult] = []
+    with zipfile.ZipFile(original_jar_path) as original_zf, zipfile.ZipFile(
+        translation_jar_path
+    ) as translation_zf:
+        # 按在原文jar中的存储偏移顺序读取
+        offsets = {
+            info.filename: info.header_offset for info in original_zf.infolist()
+        }
+        for class_path in sorted(class_paths, key=lambda p: offsets.get(p, -1)):
+            try:
+                original_bytes = _read_member(
+                    original_zf, original_jar_path, class_path, '原始'
+                )
+                translation_bytes = _read_member(
+                    translation_zf, translation_jar_path, class_path, '译文'
+                )
+                data = ClassFileData(
+                    path=class_path,
+                    original_bytes=original_bytes,
+                    original_layout=ConstantTable.scan(original_bytes),
+                    translation_bytes=translation_bytes,
+                    translation_layout=ConstantTable.scan(translation_bytes),
+                )
+            except Exception as e:
+                results.append((class_path, None, str(e)))
+                continue
+            results.append((class_path, data, None))
+    return results
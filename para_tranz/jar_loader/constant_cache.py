@@ -0,0 +1,160 @@
+import pickle
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from para_tranz.config import (
+    CLASS_CACHE_ENABLED,
+    CLASS_CACHE_MAX_SIZE,
+    CLASS_CACHE_PATH,
+    CLASS_CACHE_REBUILD,
+)
+from para_tranz.jar_loader.constant_table import ConstantTable, ConstantTableLayout
+from para_tranz.utils.util import hash_string, make_logger, relative_path
+
+# 缓存格式版本，修改缓存内容结构时递增以使旧缓存失效
+_CACHE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class CachedConstantTable:
+    """
+    单个class文件常量表的缓存项，以jar中该文件的 CRC 和大小校验是否过期
+    """
+
+    crc: int
+    file_size: int
+    layout: ConstantTableLayout
+    # 被 String 常量引用的 Utf8 常量：常量号 -> 解码后的内容
+    strings: Dict[int, str]
+
+
+class ConstantTableCache:
+    """
+    一个jar文件中所有class常量表扫描结果的磁盘缓存。
+
+    每个jar文件对应缓存目录中的一个文件，以 (jar路径, class路径, CRC, 文件大小) 判断缓存是否有效。
+    缓存目录总大小超过 CLASS_CACHE_MAX_SIZE 时，按最近使用时间删除最旧的缓存文件。
+
+    @param jar_path: jar文件路径
+    @param enabled: 是否使用缓存，为 False 时不读取也不写入
+    @param rebuild: 是否忽略已有缓存并重新生成
+    """
+
+    logger = make_logger('ConstantTableCache')
+
+    def __init__(
+        self,
+        jar_path: Path,
+        enabled: bool = CLASS_CACHE_ENABLED,
+        rebuild: bool = CLASS_CACHE_REBUILD,
+    ) -> None:
+        self.jar_path = jar_path
+        self.enabled = enabled
+        self.cache_path = (
+            CLASS_CACHE_PATH
+            / f'{jar_path.name}-{hash_string(str(jar_path.resolve()))}.pickle'
+        )
+
+        self.entries: Dict[str, CachedConstantTable] = {}
+        self.hit_count = 0
+        self.miss_count = 0
+        self._modified = False
+
+        if self.enabled and not rebuild:
+            self._load()
+
+    def _load(self) -> None:
+        if not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                version, entries = pickle.load(f)
+        except Exception as e:
+            self.logger.warning(
+                f'读取缓存文件 {relative_path(self.cache_path)} 失败，将重新生成：{e}'
+            )
+            return
+        if version == _CACHE_VERSION:
+            self.entries = entries
+
+    def get_table(
+        self, class_path: str, info: zipfile.ZipInfo, class_bytes: bytes
+    ) -> Optional[ConstantTable]:
+        """
+        如果缓存中的 CRC 和大小与jar中的文件一致，则直接根据缓存创建常量表，否则返回 None
+        """
+        if not self.enabled:
+            return None
+        entry = self.entries.get(class_path)
+        if entry is None or entry.crc != info.CRC or entry.file_size != info.file_size:
+            self.miss_count += 1
+            return None
+        self.hit_count += 1
+        return ConstantTable(class_bytes, entry.layout, entry.strings)
+
+    def put_table(
+        self, class_path: str, info: zipfile.ZipInfo, table: ConstantTable
+    ) -> None:
+        """
+        将常量表加入缓存，需要在常量被修改前调用
+        """
+        if not self.enabled:
+            return
+        self.entries[class_path] = CachedConstantTable(
+            crc=info.CRC,
+            file_size=info.file_size,
+            layout=table.layout,
+            strings={
+                c.constant_index: c.string
+                for c in table.get_utf8_constants_with_string_ref()
+            },
+        )
+        self._modified = True
+
+    def save(self) -> None:
+        if not self.enabled:
+            return
+        if not self._modified:
+            if self.cache_path.exists():
+                # 更新修改时间，作为最近使用时间供淘汰时参考
+                self.cache_path.touch()
+            return
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_path.with_name(self.cache_path.name + '.temp')
+        with open(temp_path, 'wb') as f:
+            pickle.dump(
+                (_CACHE_VERSION, self.entries), f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        temp_path.replace(self.cache_path)
+        self._modified = False
+        self.logger.debug(
+            f'已保存 {self.jar_path.name} 的常量表缓存，命中 {self.hit_count} 个，'
+            f'未命中 {self.miss_count} 个'
+        )
+
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        缓存目录总大小超过上限时，从最久未使用的缓存文件开始删除，当前jar的缓存文件不会被删除
+        """
+        # 多个jar并行导出时，其他进程可能同时删除缓存文件
+        stats = {}
+        for path in CLASS_CACHE_PATH.glob('*.pickle'):
+            try:
+                stats[path] = path.stat()
+            except FileNotFoundError:
+                continue
+        cache_files = sorted(stats, key=lambda p: stats[p].st_mtime)
+        total_size = sum(stat.st_size for stat in stats.values())
+        for path in cache_files:
+            if total_size <= CLASS_CACHE_MAX_SIZE:
+                break
+            if path == self.cache_path:
+                continue
+            total_size -= stats[path].st_size
+            path.unlink(missing_ok=True)
+            self.logger.debug(f'缓存目录超过大小上限，已删除 {relative_path(path)}')
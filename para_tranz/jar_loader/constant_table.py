@@ -1,5 +1,9 @@
+from array import array
+from dataclasses import dataclass
 from enum import Enum
-from typing import List, Optional, Set, Union, cast
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Union, cast
+
+ByteData = Union[bytes, memoryview]
 
 
 class ConstantType(Enum):
@@ -36,146 +40,313 @@ CONSTANT_LENGTHS = {
 }
 
 
+# 以常量类型标签（tag）为键的常量长度表，解析时避免逐个构造 ConstantType 枚举
+CONSTANT_LENGTHS_BY_TAG = {
+    constant_type.value: length for constant_type, length in CONSTANT_LENGTHS.items()
+}
+
+_TAG_UTF8 = ConstantType.Utf8.value
+_TAG_STRING = ConstantType.String.value
+_TAG_CLASS = ConstantType.Class.value
+_TAG_NAME_AND_TYPE = ConstantType.NameAndType.value
+_TAG_LONG = ConstantType.Long.value
+_TAG_DOUBLE = ConstantType.Double.value
+
+
+@dataclass(frozen=True)
+class ConstantTableLayout:
+    """
+    常量表的扫描结果：每个常量的类型标签、起始偏移以及 Utf8 常量的引用关系。
+
+    不包含任何常量对象，体积小且可以直接 pickle，用于在进程间传递解析结果。
+    long/double 的占位项标签为 0，偏移与下一项相同。
+    """
+
+    constant_count: int
+    table_end_index: int
+    tags: bytes
+    offsets: array
+    utf8_string_references: FrozenSet[int]
+    utf8_other_references: FrozenSet[int]
+
+
 class ConstantTable:
     """
     用于表示class文件中的常量表
+
+    解析时只扫描并记录每个常量的类型标签与其在 class_bytes 中的起始偏移，不复制剩余字节；
+    常量对象在首次被访问时才创建，Utf8 常量的内容在首次访问 string 时才解码。
+
+    @param class_bytes: class文件的字节内容
+    @param layout: 已有的扫描结果（如在其他进程中扫描得到），留空则重新扫描
+    @param strings: 已解码的 Utf8 常量内容（常量号 -> 内容），如从缓存中读取，这些常量不再重复解码
     """
 
     # TODO: 1. 增加检测同一个UTF8常量是否被多次引用的功能，尤其是被其他非String类型的常量引用
     # TODO: 2. 考虑将被String引用的常量单独复制并添加到常量表尾部，以避免被其他非String类型的常量引用
     # TODO: 3. 分析class文件的剩余部分，找出String被引用的方法名
 
-    def __init__(self, class_bytes: bytes) -> None:
+    def __init__(
+        self,
+        class_bytes: bytes,
+        layout: Optional[ConstantTableLayout] = None,
+        strings: Optional[Dict[int, str]] = None,
+    ) -> None:
         self.class_bytes = class_bytes
-        self.constant_count = int.from_bytes(class_bytes[8:10], 'big')
+        self._data = memoryview(class_bytes)
+
+        if layout is None:
+            layout = self.scan(class_bytes)
+        self.layout = layout
+
+        self.constant_count = layout.constant_count
+        self.table_end_index: int = layout.table_end_index
 
-        self.table_end_index: Optional[int] = None
+        # 每个常量的类型标签和在 class_bytes 中的起始偏移，下标为常量号 - 1
+        self.constant_tags = layout.tags
+        self.constant_offsets = layout.offsets
+        self.utf8_string_references: Set[int] = set(layout.utf8_string_references)
+        self.utf8_other_references: Set[int] = set(layout.utf8_other_references)
+        # 内容被修改过的 Utf8 常量的常量号，生成字节码时只重新编码这些常量
+        self.dirty_utf8_indices: Set[int] = set()
 
-        self.constants: List[Union['BaseConstant', bytes]] = []
-        self.utf8_string_references: Set[int] = set()
-        self.utf8_other_references: Set[int] = set()
+        # 已创建的常量对象，以常量号为键
+        self._constants: Dict[int, Union['BaseConstant', bytes]] = {}
+        self._decoded_strings = strings or {}
 
-        self._load_constants()
+    @staticmethod
+    def scan(class_bytes: bytes) -> ConstantTableLayout:
+        """
+        扫描class文件的常量表，记录每个常量的类型标签与起始偏移
+        """
+        data = class_bytes
+        constant_count = data[8] << 8 | data[9]
+        tags = bytearray()
+        offsets = array('I')
+        utf8_string_references = set()
+        utf8_other_references = set()
 
-    def _load_constants(self) -> None:
         byte_index = (
             4 + 2 + 2 + 2
         )  # magic + minor_version + major_version + constant_count
         constant_index = 1
 
-        while constant_index < self.constant_count:
-            constant_type = ConstantType(self.class_bytes[byte_index])
-
-            if constant_type == ConstantType.Utf8:
-                constant = Utf8Constant(self.class_bytes[byte_index:], constant_index)
-                byte_index += len(constant.to_bytes())
-                self.constants.append(constant)
-            elif constant_type == ConstantType.String:
-                constant = StringConstant(
-                    self.class_bytes[
-                        byte_index : byte_index + CONSTANT_LENGTHS[constant_type]
-                    ],
-                    constant_index,
+        while constant_index < constant_count:
+            tag = data[byte_index]
+            tags.append(tag)
+            offsets.append(byte_index)
+
+            if tag == _TAG_UTF8:
+                byte_index += 3 + (data[byte_index + 1] << 8 | data[byte_index + 2])
+            elif tag == _TAG_STRING:
+                utf8_string_references.add(
+                    data[byte_index + 1] << 8 | data[byte_index + 2]
                 )
-                self.utf8_string_references.add(constant.string_index)
-                byte_index += CONSTANT_LENGTHS[constant_type]
-                self.constants.append(constant)
-            elif constant_type == ConstantType.Class:
-                constant = ClassConstant(
-                    self.class_bytes[
-                        byte_index : byte_index + CONSTANT_LENGTHS[constant_type]
-                    ],
-                    constant_index,
+                byte_index += 3
+            elif tag == _TAG_CLASS:
+                utf8_other_references.add(
+                    data[byte_index + 1] << 8 | data[byte_index + 2]
                 )
-                self.utf8_other_references.add(constant.name_index)
-                byte_index += CONSTANT_LENGTHS[constant_type]
-                self.constants.append(constant)
-            elif constant_type == ConstantType.NameAndType:
-                constant = NameAndTypeConstant(
-                    self.class_bytes[
-                        byte_index : byte_index + CONSTANT_LENGTHS[constant_type]
-                    ],
-                    constant_index,
+                byte_index += 3
+            elif tag == _TAG_NAME_AND_TYPE:
+                utf8_other_references.add(
+                    data[byte_index + 1] << 8 | data[byte_index + 2]
                 )
-                self.utf8_other_references.add(constant.name_index)
-                self.utf8_other_references.add(constant.descriptor_index)
-                byte_index += CONSTANT_LENGTHS[constant_type]
-                self.constants.append(constant)
-            else:
-                # 将原始字节存入常量表
-                length = CONSTANT_LENGTHS[constant_type]
-                self.constants.append(
-                    self.class_bytes[byte_index : byte_index + length]
+                utf8_other_references.add(
+                    data[byte_index + 3] << 8 | data[byte_index + 4]
                 )
+                byte_index += 5
+            else:
+                length = CONSTANT_LENGTHS_BY_TAG.get(tag)
+                if length is None:
+                    raise ValueError(
+                        f'在常量表偏移 {byte_index} 处发现未知的常量类型 {tag}'
+                    )
                 byte_index += length
 
             constant_index += 1
 
-            if (
-                constant_type == ConstantType.Long
-                or constant_type == ConstantType.Double
-            ):
+            if tag == _TAG_LONG or tag == _TAG_DOUBLE:
                 # long 和 double 类型的常量占两个位置
                 constant_index += 1
-                self.constants.append(b'')  # 占位以保证数组索引与常量索引一致
+                tags.append(0)  # 占位以保证数组索引与常量索引一致
+                offsets.append(byte_index)
+
+        return ConstantTableLayout(
+            constant_count=constant_count,
+            table_end_index=byte_index,
+            tags=bytes(tags),
+            offsets=offsets,
+            utf8_string_references=frozenset(utf8_string_references),
+            utf8_other_references=frozenset(utf8_other_references),
+        )
+
+    def get_constant(self, constant_index: int) -> Union['BaseConstant', bytes]:
+        """
+        根据常量号获取常量对象，未被解析为对象的常量类型返回其原始字节
+        """
+        constant = self._constants.get(constant_index)
+        if constant is None:
+            constant = self._create_constant(constant_index)
+            self._constants[constant_index] = constant
+        return constant
+
+    def _create_constant(self, constant_index: int) -> Union['BaseConstant', bytes]:
+        tag = self.constant_tags[constant_index - 1]
+        offset = self.constant_offsets[constant_index - 1]
+
+        if tag == _TAG_UTF8:
+            return Utf8Constant(
+                self._data,
+                constant_index,
+                offset,
+                self.dirty_utf8_indices,
+                self._decoded_strings.get(constant_index),
+            )
+        elif tag == _TAG_STRING:
+            return StringConstant(self._data, constant_index, offset)
+        elif tag == _TAG_CLASS:
+            return ClassConstant(self._data, constant_index, offset)
+        elif tag == _TAG_NAME_AND_TYPE:
+            return NameAndTypeConstant(self._data, constant_index, offset)
+        elif tag == 0:
+            return b''
+        # 将原始字节存入常量表
+        return self.class_bytes[offset : offset + CONSTANT_LENGTHS_BY_TAG[tag]]
+
+    @property
+    def constants(self) -> List[Union['BaseConstant', bytes]]:
+        """
+        常量表中的全部常量，下标为常量号 - 1
+        """
+        return [self.get_constant(i) for i in range(1, self.constant_count)]
 
-        self.table_end_index = byte_index
+    def _get_utf8_constants(self, constant_indices: Iterable[int]) -> List['Utf8Constant']:
+        constants = []
+        for i in sorted(constant_indices):
+            if self.constant_tags[i - 1] == _TAG_UTF8:
+                constants.append(cast(Utf8Constant, self.get_constant(i)))
+        return constants
 
     def get_utf8_constants_with_string_ref(self) -> List['Utf8Constant']:
         """
         获取常量表中所有被String类型常量引用的Utf8常量
         """
-        return [
-            cast(Utf8Constant, self.constants[i - 1])
-            for i in self.utf8_string_references
-            if isinstance(self.constants[i - 1], Utf8Constant)
-        ]
+        return self._get_utf8_constants(self.utf8_string_references)
 
     def get_utf8_constants_with_extra_ref(self) -> List['Utf8Constant']:
         """
         获取常量表中所有被String常量和其他常量同时引用的Utf8常量
         """
+        return self._get_utf8_constants(
+            self.utf8_other_references & self.utf8_string_references
+        )
+
+    def get_dirty_utf8_constants(self) -> List['Utf8Constant']:
+        """
+        获取内容被修改过的Utf8常量，按常量号（即在class文件中的位置）排序
+        """
         return [
-            cast(Utf8Constant, self.constants[i - 1])
-            for i in (self.utf8_other_references & self.utf8_string_references)
-            if isinstance(self.constants[i - 1], Utf8Constant)
+            cast(Utf8Constant, self.get_constant(i))
+            for i in sorted(self.dirty_utf8_indices)
         ]
 
+    def _splice(self, start: int, end: int) -> bytes:
+        """
+        生成 class_bytes[start:end] 范围内替换了已修改Utf8常量后的字节流。
+        未修改的字节区间原样复制，只有被修改的常量会重新编码。
+        """
+        data = self._data
+        parts: List[Union[bytes, memoryview]] = []
+        last_index = start
+        for constant in self.get_dirty_utf8_constants():
+            if constant.offset < start or constant.offset >= end:
+                continue
+            parts.append(data[last_index : constant.offset])
+            parts.append(constant.to_bytes())
+            last_index = constant.offset + 3 + constant.length
+        parts.append(data[last_index:end])
+        return b''.join(parts)
+
     def to_bytes(self) -> bytes:
         """
-        将常量表转换为字节流
+        将常量表（含常量数量）转换为字节流
         """
-        result = self.constant_count.to_bytes(2, 'big')
-        for constant in self.constants:
-            if isinstance(constant, BaseConstant):
-                result += constant.to_bytes()
-            else:
-                result += constant
+        return self._splice(8, self.table_end_index)
 
-        return result
+    def to_class_bytes(self) -> bytes:
+        """
+        生成应用了常量修改后的完整class文件字节流，没有修改时直接返回原始字节
+        """
+        if not self.dirty_utf8_indices:
+            return self.class_bytes
+        return self._splice(0, len(self.class_bytes))
 
 
 class BaseConstant:
-    def __init__(self, data: bytes, constant_index: int) -> None:
+    """
+    常量表中的常量
+
+    @param data: 常量所在的字节缓冲区（通常为整个 class 文件）
+    @param constant_index: 常量号
+    @param offset: 常量（含类型标签）在 data 中的起始偏移
+    """
+
+    __slots__ = ('constant_index', 'offset')
+
+    def __init__(self, data: ByteData, constant_index: int, offset: int = 0) -> None:
         self.constant_index = constant_index
+        self.offset = offset
 
     def to_bytes(self) -> bytes:
         raise NotImplementedError
 
 
 class Utf8Constant(BaseConstant):
-    def __init__(self, data: bytes, constant_index: int) -> None:
-        super().__init__(data, constant_index)
-        self.length = int.from_bytes(data[1:3], 'big')
-        self.string = data[3 : 3 + self.length].decode('utf-8')
+    __slots__ = ('length', 'dirty', '_data', '_string', '_dirty_indices')
+
+    def __init__(
+        self,
+        data: ByteData,
+        constant_index: int,
+        offset: int = 0,
+        dirty_indices: Optional[Set[int]] = None,
+        string: Optional[str] = None,
+    ) -> None:
+        super().__init__(data, constant_index, offset)
+        # 原始字节中的内容长度，在常量内容被修改后也不会变化
+        self.length = data[offset + 1] << 8 | data[offset + 2]
+        # 内容是否与原始字节不同
+        self.dirty = False
+        self._data = data
+        # 已解码的内容，为 None 时在首次访问时从 data 中解码
+        self._string: Optional[str] = string
+        # 所属常量表的已修改常量号集合
+        self._dirty_indices = dirty_indices
+
+    @property
+    def string(self) -> str:
+        # 只在首次访问时解码，未被使用的常量（方法名、描述符等）无需解码
+        if self._string is None:
+            start = self.offset + 3
+            self._string = str(self._data[start : start + self.length], 'utf-8')
+        return self._string
+
+    @string.setter
+    def string(self, value: str) -> None:
+        if value == self.string:
+            return
+        self._string = value
+        self.dirty = True
+        if self._dirty_indices is not None:
+            self._dirty_indices.add(self.constant_index)
 
     def to_bytes(self) -> bytes:
         string_bytes = self.string.encode('utf-8')
-        self.length = len(string_bytes)
 
         return (
             ConstantType.Utf8.value.to_bytes(1, 'big')
-            + self.length.to_bytes(2, 'big')
+            + len(string_bytes).to_bytes(2, 'big')
             + string_bytes
         )
 
@@ -187,9 +358,11 @@ class Utf8Constant(BaseConstant):
 
 
 class StringConstant(BaseConstant):
-    def __init__(self, data: bytes, constant_index: int) -> None:
-        super().__init__(data, constant_index)
-        self.string_index = int.from_bytes(data[1:3], 'big')
+    __slots__ = ('string_index',)
+
+    def __init__(self, data: ByteData, constant_index: int, offset: int = 0) -> None:
+        super().__init__(data, constant_index, offset)
+        self.string_index = data[offset + 1] << 8 | data[offset + 2]
 
     def to_bytes(self) -> bytes:
         return ConstantType.String.value.to_bytes(
@@ -204,10 +377,12 @@ class StringConstant(BaseConstant):
 
 
 class NameAndTypeConstant(BaseConstant):
-    def __init__(self, data: bytes, constant_index: int) -> None:
-        super().__init__(data, constant_index)
-        self.name_index = int.from_bytes(data[1:3], 'big')
-        self.descriptor_index = int.from_bytes(data[3:5], 'big')
+    __slots__ = ('name_index', 'descriptor_index')
+
+    def __init__(self, data: ByteData, constant_index: int, offset: int = 0) -> None:
+        super().__init__(data, constant_index, offset)
+        self.name_index = data[offset + 1] << 8 | data[offset + 2]
+        self.descriptor_index = data[offset + 3] << 8 | data[offset + 4]
 
     def to_bytes(self) -> bytes:
         return (
@@ -224,9 +399,11 @@ class NameAndTypeConstant(BaseConstant):
 
 
 class ClassConstant(BaseConstant):
-    def __init__(self, data: bytes, constant_index: int) -> None:
-        super().__init__(data, constant_index)
-        self.name_index = int.from_bytes(data[1:3], 'big')
+    __slots__ = ('name_index',)
+
+    def __init__(self, data: ByteData, constant_index: int, offset: int = 0) -> None:
+        super().__init__(data, constant_index, offset)
+        self.name_index = data[offset + 1] << 8 | data[offset + 2]
 
     def to_bytes(self) -> bytes:
         return ConstantType.Class.value.to_bytes(1, 'big') + self.name_index.to_bytes(
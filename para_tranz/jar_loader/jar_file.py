@@ -1,19 +1,114 @@
+import copy
 import datetime
+import os
+import struct
+import time
 import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import asdict
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence, Union
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
 
-from para_tranz.jar_loader.class_file import JavaClassFile
+from para_tranz.jar_loader.class_file import (
+    JAR_STRING_LOCATORS,
+    JarStringContext,
+    JavaClassFile,
+)
+from para_tranz.jar_loader.class_file_loader import ClassFileData, read_class_files
+from para_tranz.jar_loader.constant_cache import ConstantTableCache
+from para_tranz.jar_loader.constant_table import ConstantTable, ConstantTableLayout
 from para_tranz.config import (
     EXPORTED_STRING_CONTEXT_PREFIX_PREFIX,
     IGNORE_CONTEXT_PREFIX_MISMATCH_STRINGS,
+    JAR_LOAD_MAX_WORKERS,
+    JAR_LOAD_PARALLEL_MODE,
     ORIGINAL_PATH,
     TRANSLATION_PATH,
 )
 from para_tranz.utils.mapping import PARA_TRANZ_MAP, JarMapItem
 from para_tranz.utils.util import DataFile, String, make_logger
 
+if TYPE_CHECKING:
+    from para_tranz.utils.manifest import Manifest
+
+_LOCAL_FILE_HEADER_SIGNATURE = b'PK\x03\x04'
+_LOCAL_FILE_HEADER_SIZE = 30
+_DATA_DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+_ZIP64_EXTRA_HEADER_ID = 0x0001
+# _append_raw_zip_record 用到的 ZipFile 属性（含私有属性）
+_ZIPFILE_RAW_WRITE_ATTRS = (
+    'fp',
+    'filelist',
+    'NameToInfo',
+    'start_dir',
+    '_lock',
+    '_writing',
+    '_seekable',
+    '_writecheck',
+    '_didModify',
+)
+
+
+def _has_zip64_extra(extra: bytes) -> bool:
+    """
+    判断本地文件头的扩展字段中是否有 ZIP64 扩展信息（header id 0x0001）。
+    有 ZIP64 扩展信息时，数据描述符中的大小为8字节，否则为4字节
+    """
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, size = struct.unpack_from('<HH', extra, pos)
+        if header_id == _ZIP64_EXTRA_HEADER_ID:
+            return True
+        pos += 4 + size
+    return False
+
+
+def _can_append_raw_zip_record(zf: zipfile.ZipFile) -> bool:
+    """
+    判断正在写入的 ZipFile 是否有 _append_raw_zip_record 需要的全部属性，
+    Python 版本变化导致 zipfile 内部实现改变时返回 False，此时应改用 writestr 写入
+    """
+    return all(hasattr(zf, name) for name in _ZIPFILE_RAW_WRITE_ATTRS)
+
+
+def _append_raw_zip_record(
+    zf: zipfile.ZipFile, info: zipfile.ZipInfo, record: bytes
+) -> None:
+    """
+    将一个文件完整的原始记录（本地文件头、压缩后的数据、数据描述符）追加到正在写入的 zip 中，
+    并登记到中央目录。
+
+    zipfile 没有公开的接口写入已压缩的数据，此函数是本模块中唯一使用 ZipFile 私有属性的地方，
+    其加锁、写入检查及写入后更新 filelist、NameToInfo、start_dir 的方式
+    与 CPython 3.11 的 ZipFile._open_to_write 和 _ZipWriteFile.close 相同（已在 3.11.7 上验证），
+    升级 Python 版本时需要重新核对。调用前需要用 _can_append_raw_zip_record 检查
+    """
+    new_info = copy.copy(info)
+    with zf._lock:
+        if zf._writing:
+            raise ValueError(f'写入 {info.filename} 时 zip 文件中有其它未关闭的写入句柄')
+        if zf._seekable:
+            zf.fp.seek(zf.start_dir)
+        new_info.header_offset = zf.fp.tell()
+        zf._writecheck(new_info)
+        zf._didModify = True
+        zf.fp.write(record)
+        # 中央目录从当前位置之后开始写入
+        zf.start_dir = zf.fp.tell()
+        zf.filelist.append(new_info)
+        zf.NameToInfo[new_info.filename] = new_info
+
 
 class JavaJarFile(DataFile):
     """
@@ -29,6 +124,8 @@ class JavaJarFile(DataFile):
         class_files: List[dict],
         type: str = 'jar',
         no_auto_load: bool = False,
+        parallel_mode: Optional[str] = JAR_LOAD_PARALLEL_MODE,
+        max_workers: Optional[int] = JAR_LOAD_MAX_WORKERS,
         **kwargs,
     ):
         super().__init__(path, type)
@@ -39,16 +136,26 @@ class JavaJarFile(DataFile):
 
         self.original_file: Optional[zipfile.ZipFile] = None
         self.translation_file: Optional[zipfile.ZipFile] = None
+        # jar 中文件路径到 ZipInfo 的索引，打开jar文件时建立
+        self.original_infos: Dict[str, zipfile.ZipInfo] = {}
+        self.translation_infos: Dict[str, zipfile.ZipInfo] = {}
         self.open_files()
 
+        # class 常量表的磁盘缓存
+        self.original_cache = ConstantTableCache(self.original_path)
+        self.translation_cache = ConstantTableCache(self.translation_path)
+
         self.class_files: Dict[str, JavaClassFile] = {}
 
         if not no_auto_load:
             self.logger.info(
                 f'开始读取 {self.path} 中指定的class文件，共 {len(class_files)} 个'
             )
-            for class_file_info in class_files:
-                self.load_class_file(**class_file_info)
+            if parallel_mode:
+                self.load_class_files_parallel(class_files, parallel_mode, max_workers)
+            else:
+                self.load_class_files(class_files)
+            self.save_caches()
             self.logger.info(f'jar读取完成: {self.path}')
 
     def __del__(self) -> None:
@@ -57,6 +164,12 @@ class JavaJarFile(DataFile):
     def open_files(self) -> None:
         self.original_file = zipfile.ZipFile(self.original_path, 'r')
         self.translation_file = zipfile.ZipFile(self.translation_path, 'r')
+        self.original_infos = {
+            info.filename: info for info in self.original_file.infolist()
+        }
+        self.translation_infos = {
+            info.filename: info for info in self.translation_file.infolist()
+        }
 
     def close_files(self) -> None:
         if self.original_file is not None:
@@ -75,11 +188,12 @@ class JavaJarFile(DataFile):
         path: str,
         include_strings: Optional[List] = None,
         override: bool = False,
+        data: Optional[ClassFileData] = None,
     ) -> Optional['JavaClassFile']:
         if not override and path in self.class_files:
             return self.class_files[path]
         try:
-            class_file = JavaClassFile(self, path, include_strings)
+            class_file = JavaClassFile(self, path, include_strings, data=data)
             self.class_files[path] = class_file
         except Exception as e:
             self.logger.warning(f'在 {self.path} 中读取 class 文件 {path} 时出错：{e}')
@@ -87,14 +201,92 @@ class JavaJarFile(DataFile):
 
         return class_file
 
+    def load_class_files(self, class_files: List[dict], override: bool = False) -> None:
+        """
+        依次加载 class_files 中的class文件，文件内容按在jar中的存储顺序批量读取
+        :param class_files: 与 map 中 class_files 格式相同的class文件信息列表
+        :param override: 是否重新加载已加载的class文件
+        """
+        class_paths = [info['path'] for info in class_files]
+        original_contents = self.read_class_files(class_paths)
+        translation_contents = self.read_class_files(class_paths, from_translation=True)
+
+        for class_file_info in class_files:
+            path = class_file_info['path']
+            if path not in original_contents or path not in translation_contents:
+                # 交由逐个读取报告找不到文件的错误
+                self.load_class_file(**class_file_info, override=override)
+                continue
+            data = ClassFileData(
+                path=path,
+                original_bytes=original_contents[path],
+                translation_bytes=translation_contents[path],
+            )
+            self.load_class_file(**class_file_info, override=override, data=data)
+
+    def load_class_files_parallel(
+        self,
+        class_files: List[dict],
+        parallel_mode: str = 'process',
+        max_workers: Optional[int] = None,
+    ) -> None:
+        """
+        使用线程池或进程池并行解压并扫描class文件，再按 class_files 的顺序依次加载。
+        :param class_files: 与 map 中 class_files 格式相同的class文件信息列表
+        :param parallel_mode: 'thread' 或 'process'
+        :param max_workers: 最大线程/进程数，None 为使用CPU核心数
+        """
+        if parallel_mode == 'process':
+            executor_cls = ProcessPoolExecutor
+        elif parallel_mode == 'thread':
+            executor_cls = ThreadPoolExecutor
+        else:
+            raise ValueError(f'未知的并行读取方式：{parallel_mode}')
+
+        class_paths = list(dict.fromkeys(info['path'] for info in class_files))
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        # 每个任务处理一批class文件，以减少打开jar文件和进程间通信的次数
+        chunk_count = min(len(class_paths), max_workers * 4) or 1
+        chunks = [class_paths[i::chunk_count] for i in range(chunk_count)]
+
+        data_by_path: Dict[str, ClassFileData] = {}
+        errors_by_path: Dict[str, str] = {}
+        with executor_cls(max_workers=max_workers) as executor:
+            for results in executor.map(
+                read_class_files,
+                repeat(self.original_path),
+                repeat(self.translation_path),
+                chunks,
+            ):
+                for class_path, data, error in results:
+                    if data is not None:
+                        data_by_path[class_path] = data
+                    else:
+                        errors_by_path[class_path] = error or ''
+
+        for class_file_info in class_files:
+            path = class_file_info['path']
+            if path in errors_by_path:
+                if path not in self.class_files:
+                    self.logger.warning(
+                        f'在 {self.path} 中读取 class 文件 {path} 时出错：{errors_by_path[path]}'
+                    )
+                continue
+            self.load_class_file(**class_file_info, data=data_by_path[path])
+
     def update_strings(self, strings: List[String]) -> None:
         class_file_path_strings_mapping = {
             class_file_path: [] for class_file_path in self.class_files
         }  # type: Dict[str, List[String]]
+        # 与 class_file_path_strings_mapping 中的词条一一对应的定位信息，传给 class 文件避免重复解析上下文
+        class_file_path_contexts_mapping = {
+            class_file_path: [] for class_file_path in self.class_files
+        }  # type: Dict[str, List[JarStringContext]]
 
         for s in strings:
             try:
-                parsed_context = JavaClassFile.parse_jar_string_context(s.context)
+                parsed_context = JAR_STRING_LOCATORS.get(s)
             except ValueError as e:
                 if (
                     IGNORE_CONTEXT_PREFIX_MISMATCH_STRINGS
@@ -135,9 +327,12 @@ class JavaJarFile(DataFile):
                 continue
 
             class_file_path_strings_mapping[class_file_path].append(s)
+            class_file_path_contexts_mapping[class_file_path].append(parsed_context)
 
         for class_file_path, strings in class_file_path_strings_mapping.items():
-            self.class_files[class_file_path].update_strings(strings)
+            self.class_files[class_file_path].update_strings(
+                strings, class_file_path_contexts_mapping[class_file_path]
+            )
 
     def save_file(self) -> None:
         # 对于每一个已读取的class文件，生成新的字节码
@@ -152,22 +347,49 @@ class JavaJarFile(DataFile):
             self.logger.info(f'{self.path} 中没有 class 字节码变化，跳过重写 jar')
             return
 
+        start_time = time.perf_counter()
         temp_path = self.translation_path.with_name(
             self.translation_path.name + '.temp'
         )
 
-        # 生成新的jar文件，写入新的class文件，并将老jar中的其它文件也复制进去
+        # 生成新的jar文件，写入新的class文件，老jar中的其它文件直接复制压缩后的数据，不重新压缩
+        assert self.translation_file is not None
         with zipfile.ZipFile(temp_path, 'w') as zf:
-            with zipfile.ZipFile(self.translation_path) as old_zf:
-                for info in old_zf.infolist():
+            copy_raw = _can_append_raw_zip_record(zf)
+            if not copy_raw:
+                self.logger.warning(
+                    '当前 Python 版本的 zipfile 缺少直接复制压缩数据所需的内部属性，'
+                    '将解压并重新压缩老jar中的其它文件'
+                )
+            with open(self.translation_path, 'rb') as old_fp:
+                for info in self.translation_file.infolist():
                     # 复制老文件
                     if info.filename not in updated_file_contents:
-                        zf.writestr(info, old_zf.read(info))
+                        if copy_raw:
+                            self._copy_raw_zip_entry(old_fp, info, zf)
+                        else:
+                            zf.writestr(
+                                copy.copy(info), self.translation_file.read(info)
+                            )
                     # 写入新文件
                     else:
+                        new_info = copy.copy(info)
                         # 将文件修改日期设置为当前时间
-                        info.date_time = datetime.datetime.now().timetuple()[:6]
-                        zf.writestr(info, updated_file_contents[info.filename])
+                        new_info.date_time = datetime.datetime.now().timetuple()[:6]
+                        zf.writestr(new_info, updated_file_contents[info.filename])
+
+        # 直接复制压缩数据时绕过了 zipfile 的写入流程，替换老jar前校验新jar的中央目录及所有文件的CRC
+        if copy_raw:
+            try:
+                with zipfile.ZipFile(temp_path) as zf:
+                    bad_file = zf.testzip()
+            except (zipfile.BadZipFile, zlib.error) as e:
+                bad_file = str(e)
+            if bad_file is not None:
+                temp_path.unlink()
+                raise zipfile.BadZipFile(
+                    f'重写 {self.path} 时生成的jar文件校验失败（{bad_file}），未替换原有jar文件'
+                )
 
         # 关闭读模式的文件
         self.close_files()
@@ -176,57 +398,152 @@ class JavaJarFile(DataFile):
         temp_path.rename(self.translation_path)
         # 重新打开文件
         self.open_files()
+        self.logger.info(
+            f'已重写 {self.path}，更新了 {len(updated_file_contents)} 个 class 文件，'
+            f'耗时 {time.perf_counter() - start_time:.2f} 秒'
+        )
+
+    @staticmethod
+    def _copy_raw_zip_entry(
+        old_fp: BinaryIO, info: zipfile.ZipInfo, zf: zipfile.ZipFile
+    ) -> None:
+        """
+        将老jar中的一个文件原样（本地文件头、压缩后的数据、数据描述符）复制到正在写入的新jar中，
+        不解压也不重新压缩。中央目录仍由 zipfile 根据复制的 ZipInfo 生成。
+        """
+        old_fp.seek(info.header_offset)
+        header = old_fp.read(_LOCAL_FILE_HEADER_SIZE)
+        if header[:4] != _LOCAL_FILE_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f'{info.filename} 的本地文件头无效')
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        name = old_fp.read(name_length)
+        extra = old_fp.read(extra_length)
+        record = [header, name, extra, old_fp.read(info.compress_size)]
+
+        # 标志位3表示压缩数据后有数据描述符：可选的签名 + CRC + 压缩后大小 + 原始大小
+        if info.flag_bits & 0x08:
+            descriptor_length = 4 + (16 if _has_zip64_extra(extra) else 8)
+            first_field = old_fp.read(4)
+            if first_field == _DATA_DESCRIPTOR_SIGNATURE:
+                first_field += old_fp.read(4)
+            record.append(first_field + old_fp.read(descriptor_length - 4))
+
+        _append_raw_zip_record(zf, info, b''.join(record))
 
     def load_from_file(self) -> None:
         for class_file in self.class_files.values():
             class_file.load_from_file()
+        self.save_caches()
+
+    def create_constant_table(
+        self,
+        class_file_path: str,
+        class_bytes: bytes,
+        from_translation: bool = False,
+        layout: Optional[ConstantTableLayout] = None,
+    ) -> ConstantTable:
+        """
+        为jar中的class文件创建常量表，class文件未变化时直接使用缓存的解析结果
+        :param class_file_path: class文件在jar中的路径
+        :param class_bytes: class文件内容
+        :param from_translation: 是否为译文jar中的class文件
+        :param layout: 已有的扫描结果（如并行读取的结果）
+        """
+        zf = self.translation_file if from_translation else self.original_file
+        cache = self.translation_cache if from_translation else self.original_cache
+        assert zf is not None
+
+        info = zf.getinfo(class_file_path)
+        table = cache.get_table(class_file_path, info, class_bytes)
+        if table is None:
+            table = ConstantTable(class_bytes, layout)
+            cache.put_table(class_file_path, info, table)
+        return table
+
+    def save_caches(self) -> None:
+        self.original_cache.save()
+        self.translation_cache.save()
 
     def read_original_class_file(self, class_file_path: str) -> bytes:
         assert self.original_file is not None
-        path = zipfile.Path(self.original_file, class_file_path)
-        if not path.exists():
+        info = self.original_infos.get(class_file_path)
+        if info is None:
             raise FileNotFoundError(
                 f'在原始jar文件 {self.original_path} 中找不到class文件 {class_file_path}'
             )
-        return path.read_bytes()
+        return self.original_file.read(info)
 
     def read_translation_class_file(self, class_file_path: str) -> bytes:
         assert self.translation_file is not None
-        path = zipfile.Path(self.translation_file, class_file_path)
-        if not path.exists():
+        info = self.translation_infos.get(class_file_path)
+        if info is None:
             raise FileNotFoundError(
                 f'在译文jar文件 {self.translation_path} 中找不到class文件 {class_file_path}'
             )
-        return path.read_bytes()
+        return self.translation_file.read(info)
+
+    def read_class_files(
+        self, class_file_paths: Iterable[str], from_translation: bool = False
+    ) -> Dict[str, bytes]:
+        """
+        批量读取jar中的多个文件。按文件在jar中的存储偏移排序后依次读取，使读取过程为顺序I/O。
+        jar中不存在的文件不会出现在返回结果中。
+        :param class_file_paths: 文件在jar中的路径
+        :param from_translation: 是否从译文jar中读取
+        :return: 文件路径到文件内容的映射
+        """
+        zf = self.translation_file if from_translation else self.original_file
+        infos = self.translation_infos if from_translation else self.original_infos
+        assert zf is not None
+
+        found_infos = {infos[path] for path in class_file_paths if path in infos}
+        return {
+            info.filename: zf.read(info)
+            for info in sorted(found_infos, key=lambda info: info.header_offset)
+        }
 
     def load_all_classes_in_jar(
         self, from_translation: bool = False, override_loaded: bool = False
     ) -> None:
-        jar_path = (
-            ORIGINAL_PATH / self.path
-            if not from_translation
-            else TRANSLATION_PATH / self.path
+        jar_path = self.translation_path if from_translation else self.original_path
+        infos = self.translation_infos if from_translation else self.original_infos
+
+        class_files = [
+            {'path': filename} for filename in infos if filename.endswith('.class')
+        ]
+        self.logger.info(
+            f'在jar文件 {jar_path} 中找到了 {len(class_files)} 个class文件。'
         )
 
-        with zipfile.ZipFile(jar_path) as zf:
+        if not override_loaded:
             class_files = [
-                {'path': info.filename}
-                for info in zf.infolist()
-                if info.filename.endswith('.class')
+                info for info in class_files if info['path'] not in self.class_files
             ]
-            self.logger.info(
-                f'在jar文件 {jar_path} 中找到了 {len(class_files)} 个class文件。'
-            )
+        self.load_class_files(class_files, override=override_loaded)
+        self.save_caches()
 
-        for class_file_info in class_files:
-            self.load_class_file(path=class_file_info['path'], override=override_loaded)
+    @classmethod
+    def get_file_configs(cls) -> List[dict]:
+        return [asdict(item) for item in PARA_TRANZ_MAP if isinstance(item, JarMapItem)]
+
+    @classmethod
+    def get_input_fingerprint(cls, kwargs: dict, manifest: 'Manifest') -> List[str]:
+        """
+        jar文件按映射的class文件在 zip 目录中的 CRC 计算指纹，未映射的class文件变化时不会重新导出
+        """
+        from para_tranz.utils.manifest import hash_json
+
+        class_paths = [info['path'] for info in kwargs['class_files']]
+        return [
+            hash_json(kwargs),
+            manifest.hash_jar_classes(ORIGINAL_PATH / kwargs['path'], class_paths),
+            manifest.hash_jar_classes(TRANSLATION_PATH / kwargs['path'], class_paths),
+        ]
 
     @classmethod
     def load_files_from_config(cls) -> Sequence['JavaJarFile']:
         cls.logger.info('开始读取游戏jar数据')
-        files = [
-            cls(**asdict(item)) for item in PARA_TRANZ_MAP if isinstance(item, JarMapItem)
-        ]
+        files = [cls(**kwargs) for kwargs in cls.get_file_configs()]
         cls.logger.info('游戏jar数据读取完成')
         return files
 
@@ -12,19 +12,75 @@ from para_tranz.config import (
     ORIGINAL_PATH,
     UPDATE_STRING_ALLOW_EMPTY_TRANSLATION,
 )
+from para_tranz.utils.language import has_cjk, has_latin
 from para_tranz.utils.mapping import IncludeStringRule, JavaMapItem, PARA_TRANZ_MAP
 from para_tranz.utils.util import (
+    ContextLocatorCache,
     DataFile,
     String,
-    contains_chinese,
-    contains_english,
     hash_string,
     make_logger,
     relative_path,
     should_write_translation,
+    write_text_file,
 )
 
 
+# 依次匹配 行注释、块注释、字符字面量、文本块、字符串字面量，未闭合的记号一直匹配到文件末尾。
+# 只有字符串字面量带有命名分组，可以通过 match.lastgroup 区分：
+#   'close' 为闭合的字符串字面量，'inner' 为未闭合的字符串字面量，None 为其他记号
+_RE_JAVA_TOKEN = re.compile(
+    r"//[^\r\n]*"
+    r"|/\*[\s\S]*?(?:\*/|\Z)"
+    r"|'[^'\\]*(?:\\[\s\S][^'\\]*)*'?"
+    r'|"""[\s\S]*?(?:"""|\Z)'
+    r'|"(?P<inner>[^"\\]*(?:\\[\s\S][^"\\]*)*)(?P<close>")?'
+)
+# Java 转义序列：\uXXXX（可有多个 u）、八进制转义、单字符转义，以及末尾单独的反斜杠
+_RE_JAVA_ESCAPE = re.compile(
+    r'\\(?:(?P<unicode>u+)(?P<hex>[0-9a-fA-F]{4})?'
+    r'|(?P<octal>[0-3][0-7]{0,2}|[4-7][0-7]?)'
+    r'|(?P<char>[\s\S])'
+    r'|\Z)'
+)
+_JAVA_SIMPLE_ESCAPES = {
+    'b': '\b',
+    't': '\t',
+    'n': '\n',
+    'f': '\f',
+    'r': '\r',
+    '"': '"',
+    "'": "'",
+    '\\': '\\',
+}
+_JAVA_ENCODE_TABLE = str.maketrans(
+    {
+        '\\': '\\\\',
+        '"': '\\"',
+        '\n': '\\n',
+        '\r': '\\r',
+        '\t': '\\t',
+        '\b': '\\b',
+        '\f': '\\f',
+    }
+)
+
+
+def _decode_java_escape(match: re.Match) -> str:
+    if match.group('unicode') is not None:
+        hex_digits = match.group('hex')
+        # 无效的 \u 转义保留 \u，丢弃多余的 u
+        return chr(int(hex_digits, 16)) if hex_digits else '\\u'
+    octal = match.group('octal')
+    if octal is not None:
+        return chr(int(octal, 8))
+    char = match.group('char')
+    if char is None:
+        # 末尾单独的反斜杠
+        return '\\'
+    return _JAVA_SIMPLE_ESCAPES.get(char, char)
+
+
 @dataclass(frozen=True)
 class JavaStringLiteral:
     value: str
@@ -94,163 +150,45 @@ class JavaSourceFile(DataFile):
 
     @staticmethod
     def _decode_java_string(raw_inner: str) -> str:
-        result = []
-        i = 0
-        while i < len(raw_inner):
-            char = raw_inner[i]
-            if char != '\\':
-                result.append(char)
-                i += 1
-                continue
-
-            i += 1
-            if i >= len(raw_inner):
-                result.append('\\')
-                break
-
-            escaped = raw_inner[i]
-            simple_escapes = {
-                'b': '\b',
-                't': '\t',
-                'n': '\n',
-                'f': '\f',
-                'r': '\r',
-                '"': '"',
-                "'": "'",
-                '\\': '\\',
-            }
-            if escaped in simple_escapes:
-                result.append(simple_escapes[escaped])
-                i += 1
-                continue
-
-            if escaped == 'u':
-                i += 1
-                while i < len(raw_inner) and raw_inner[i] == 'u':
-                    i += 1
-                hex_digits = raw_inner[i : i + 4]
-                if len(hex_digits) == 4 and all(c in '0123456789abcdefABCDEF' for c in hex_digits):
-                    result.append(chr(int(hex_digits, 16)))
-                    i += 4
-                else:
-                    result.append('\\u')
-                continue
-
-            if escaped in '01234567':
-                octal = escaped
-                i += 1
-                max_extra = 2 if escaped in '0123' else 1
-                while (
-                    max_extra > 0
-                    and i < len(raw_inner)
-                    and raw_inner[i] in '01234567'
-                ):
-                    octal += raw_inner[i]
-                    i += 1
-                    max_extra -= 1
-                result.append(chr(int(octal, 8)))
-                continue
-
-            result.append(escaped)
-            i += 1
-
-        return ''.join(result)
+        # 绝大多数字面量不含转义，直接返回
+        if '\\' not in raw_inner:
+            return raw_inner
+        return _RE_JAVA_ESCAPE.sub(_decode_java_escape, raw_inner)
 
     @staticmethod
     def _encode_java_string(value: str) -> str:
-        escaped = []
-        for char in value:
-            if char == '\\':
-                escaped.append('\\\\')
-            elif char == '"':
-                escaped.append('\\"')
-            elif char == '\n':
-                escaped.append('\\n')
-            elif char == '\r':
-                escaped.append('\\r')
-            elif char == '\t':
-                escaped.append('\\t')
-            elif char == '\b':
-                escaped.append('\\b')
-            elif char == '\f':
-                escaped.append('\\f')
-            else:
-                escaped.append(char)
-        return '"' + ''.join(escaped) + '"'
+        return '"' + value.translate(_JAVA_ENCODE_TABLE) + '"'
 
     @classmethod
     def _parse_string_literals(cls, text: str) -> List[JavaStringLiteral]:
+        """
+        扫描源码中的普通字符串字面量，跳过注释、字符字面量与文本块中的内容。
+        由一个组合正则依次匹配这些记号，只有字符串字面量需要在 Python 中处理。
+        """
         literals = []
-        i = 0
         source_index = 0
-        length = len(text)
-
-        while i < length:
-            char = text[i]
-            next_char = text[i + 1] if i + 1 < length else ''
-
-            if char == '/' and next_char == '/':
-                i += 2
-                while i < length and text[i] not in '\r\n':
-                    i += 1
-                continue
-
-            if char == '/' and next_char == '*':
-                i += 2
-                while i + 1 < length and not (text[i] == '*' and text[i + 1] == '/'):
-                    i += 1
-                i = min(i + 2, length)
-                continue
-
-            if char == "'":
-                i += 1
-                while i < length:
-                    if text[i] == '\\':
-                        i += 2
-                    elif text[i] == "'":
-                        i += 1
-                        break
-                    else:
-                        i += 1
-                continue
+        decode = cls._decode_java_string
 
-            if char != '"':
-                i += 1
-                continue
-
-            if text.startswith('"""', i):
-                i += 3
-                while i < length and not text.startswith('"""', i):
-                    i += 1
-                i = min(i + 3, length)
+        for match in _RE_JAVA_TOKEN.finditer(text):
+            kind = match.lastgroup
+            # 注释、字符字面量、文本块
+            if kind is None:
                 continue
+            # 未闭合的字符串字面量会一直延续到文件末尾
+            if kind != 'close':
+                break
 
-            start = i
-            i += 1
-            raw_inner = []
-            while i < length:
-                if text[i] == '\\':
-                    raw_inner.append(text[i])
-                    if i + 1 < length:
-                        raw_inner.append(text[i + 1])
-                    i += 2
-                    continue
-                if text[i] == '"':
-                    i += 1
-                    raw = text[start:i]
-                    literals.append(
-                        JavaStringLiteral(
-                            value=cls._decode_java_string(''.join(raw_inner)),
-                            start=start,
-                            end=i,
-                            raw=raw,
-                            source_index=source_index,
-                        )
-                    )
-                    source_index += 1
-                    break
-                raw_inner.append(text[i])
-                i += 1
+            start, end = match.span()
+            literals.append(
+                JavaStringLiteral(
+                    value=decode(match.group('inner')),
+                    start=start,
+                    end=end,
+                    raw=match.group(),
+                    source_index=source_index,
+                )
+            )
+            source_index += 1
 
         return literals
 
@@ -375,6 +313,8 @@ class JavaSourceFile(DataFile):
 
     def get_strings(self) -> List[String]:
         strings = []
+        # 同一文件的词条共用上下文前缀
+        context_prefix = f'{EXPORTED_STRING_CONTEXT_PREFIX}文件：{self._path_key()}\n'
         for occurrence in self._get_included_string_occurrences():
             original_literal = occurrence.original_literal
             translation_literal = occurrence.translation_literal
@@ -388,16 +328,12 @@ class JavaSourceFile(DataFile):
             translation = translation_literal.value
             stage = 1 if translation else 0
             if translation:
-                if not contains_english(translation):
+                if not has_latin(translation):
                     stage = 1
-                elif not contains_chinese(translation):
+                elif not has_cjk(translation):
                     stage = 0
 
-            context = (
-                f'{EXPORTED_STRING_CONTEXT_PREFIX}'
-                f'文件：{self._path_key()}\n'
-                f'源码序号：{original_literal.source_index}\n'
-            )
+            context = f'源码序号：{original_literal.source_index}\n'
             if occurrence.include_occurrence_index:
                 context += f'同值序号：{occurrence.occurrence_index}\n'
             context += (
@@ -412,12 +348,21 @@ class JavaSourceFile(DataFile):
                     translation=translation,
                     stage=stage,
                     context=context,
+                    context_prefix=context_prefix,
                 )
             )
         return strings
 
     @classmethod
     def parse_java_string_context(cls, context: str) -> JavaStringContext:
+        """
+        从词条上下文中解析 Java 源码词条的定位信息。
+        优先按导出时的固定行布局逐行解析，布局不符时再使用正则匹配
+        """
+        locator = cls._parse_java_string_context_lines(context)
+        if locator is not None:
+            return locator
+
         match = cls.re_context.search(context)
         if not match:
             raise ValueError(f'无法从上下文中解析 Java 源码词条定位信息：\n{context}')
@@ -432,6 +377,49 @@ class JavaSourceFile(DataFile):
             else None,
         )
 
+    @staticmethod
+    def _parse_java_string_context_lines(context: str) -> Optional[JavaStringContext]:
+        """
+        按 文件：/源码序号：/同值序号：/原始数据： 的行布局解析上下文，不使用正则
+        :return: 解析结果，布局不符时返回 None
+        """
+        start = context.find('文件：')
+        if start < 0:
+            return None
+        # 原始数据可能跨行，只拆出前两行，剩余部分再单独处理
+        lines = context[start + len('文件：') :].split('\n', 2)
+        if len(lines) < 3:
+            return None
+        path, source_index_line, rest = lines
+        if not path.endswith('.java'):
+            return None
+        if not source_index_line.startswith('源码序号：'):
+            return None
+        source_index = source_index_line[len('源码序号：') :]
+        if not source_index.isdecimal():
+            return None
+
+        occurrence = None
+        if rest.startswith('同值序号：'):
+            occurrence_line, _, rest = rest.partition('\n')
+            occurrence = occurrence_line[len('同值序号：') :]
+            if not occurrence.isdecimal():
+                return None
+
+        if not rest.startswith('原始数据："'):
+            return None
+        end = rest.find('"\n译文数据：', len('原始数据："'))
+        if end < 0:
+            return None
+        original = rest[len('原始数据："') : end]
+
+        return JavaStringContext(
+            path=path,
+            source_index=int(source_index),
+            original=original,
+            occurrence_index=int(occurrence) if occurrence is not None else None,
+        )
+
     def update_strings(self, strings: List[String]) -> None:
         literals_by_original = self._get_original_string_literals_mapping()
         include_rules = {rule.val: rule for rule in self.map_item.get_include_rules()}
@@ -446,7 +434,7 @@ class JavaSourceFile(DataFile):
                 )
                 continue
 
-            context = self.parse_java_string_context(s.context)
+            context = JAVA_STRING_LOCATORS.get(s)
             if context.path != self._path_key():
                 raise ValueError(
                     f'词条 key={s.key}{self._format_occurrence_index(context.occurrence_index)} '
@@ -520,33 +508,64 @@ class JavaSourceFile(DataFile):
         if not replacements:
             return
 
-        self.translation_text = self._replace_translation_literals(replacements)
-        self.translation_literals = self._parse_string_literals(self.translation_text)
+        self._replace_translation_literals(replacements)
 
-    def _replace_translation_literals(self, replacements: Dict[int, str]) -> str:
+    def _replace_translation_literals(self, replacements: Dict[int, str]) -> None:
+        """
+        替换译文中的字符串字面量。替换后的字面量与原字面量一样是完整的记号，
+        其余字面量只需按之前各处替换的长度差平移位置，无需重新扫描整个文件
+        :param replacements: 源码序号 -> 新的译文
+        """
+        text = self.translation_text
         parts = []
+        literals = []
         last_index = 0
+        shift = 0
         for literal in self.translation_literals:
-            if literal.source_index not in replacements:
-                continue
-            parts.append(self.translation_text[last_index:literal.start])
-            parts.append(self._encode_java_string(replacements[literal.source_index]))
-            last_index = literal.end
-        parts.append(self.translation_text[last_index:])
-        return ''.join(parts)
+            source_index = literal.source_index
+            if source_index in replacements:
+                value = replacements[source_index]
+                raw = self._encode_java_string(value)
+                parts.append(text[last_index : literal.start])
+                parts.append(raw)
+                last_index = literal.end
+                start = literal.start + shift
+                shift += len(raw) - (literal.end - literal.start)
+                literal = JavaStringLiteral(
+                    value=value,
+                    start=start,
+                    end=start + len(raw),
+                    raw=raw,
+                    source_index=source_index,
+                )
+            elif shift:
+                literal = JavaStringLiteral(
+                    value=literal.value,
+                    start=literal.start + shift,
+                    end=literal.end + shift,
+                    raw=literal.raw,
+                    source_index=source_index,
+                )
+            literals.append(literal)
+        parts.append(text[last_index:])
+
+        self.translation_text = ''.join(parts)
+        self.translation_literals = literals
 
     def save_file(self) -> None:
-        self.translation_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.translation_path, 'w', encoding='utf-8') as f:
-            f.write(self.translation_text)
-        self.logger.info(f'已保存译文文件：{relative_path(self.translation_path)}')
+        if write_text_file(self.translation_path, self.translation_text):
+            self.logger.info(f'已保存译文文件：{relative_path(self.translation_path)}')
+        else:
+            self.logger.info(f'译文文件内容未变化：{relative_path(self.translation_path)}')
+
+    @classmethod
+    def get_file_configs(cls) -> List[dict]:
+        return [asdict(item) for item in PARA_TRANZ_MAP if isinstance(item, JavaMapItem)]
 
     @classmethod
     def load_files_from_config(cls) -> Sequence['JavaSourceFile']:
         cls.logger.info('开始读取 Java 源码数据')
-        files = [
-            cls(**asdict(item)) for item in PARA_TRANZ_MAP if isinstance(item, JavaMapItem)
-        ]
+        files = [cls(**kwargs) for kwargs in cls.get_file_configs()]
         cls.logger.info('Java 源码数据读取完成')
         return files
 
@@ -559,3 +578,9 @@ class JavaSourceFile(DataFile):
             else:
                 item.add_include_rule(IncludeStringRule(original, set(range(len(literals)))))
         return item
+
+
+# 本次运行中 Java 源码词条 key -> 定位信息的缓存
+JAVA_STRING_LOCATORS: ContextLocatorCache[JavaStringContext] = ContextLocatorCache(
+    JavaSourceFile.parse_java_string_context
+)
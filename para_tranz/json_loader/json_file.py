@@ -25,6 +25,7 @@ from para_tranz.utils.util import (
     make_logger,
     relative_path,
     should_write_translation,
+    write_text_file,
 )
 
 _ALEXSON_CONFIG = AlexsonConfig(allow_duplicate_keys=True)
@@ -87,51 +88,6 @@ def _parse_path_segments(text_path: str) -> List[str]:
     return segments
 
 
-def _parse_exact_path(json_path: str) -> List[Union[str, int]]:
-    """将具体路径（无通配符）解析为段列表。
-
-    Examples:
-        '$.nav_buoy.name'               -> ['nav_buoy', 'name']
-        '$.tips[0].tip'                 -> ['tips', 0, 'tip']
-        '$.designTypeColors["Low Tech"]'-> ['designTypeColors', 'Low Tech']
-        '$[0]'                          -> [0]
-    """
-    path = json_path[1:]  # 去掉 '$'
-    segments: List[Union[str, int]] = []
-
-    while path:
-        if path.startswith('['):
-            end = path.index(']')
-            inner = path[1:end]
-            if inner.startswith('"') and inner.endswith('"'):
-                segments.append(inner[1:-1])
-            else:
-                segments.append(int(inner))
-            path = path[end + 1 :]
-            if path.startswith('.'):
-                path = path[1:]
-        elif path.startswith('.'):
-            path = path[1:]
-            end = len(path)
-            for i, c in enumerate(path):
-                if c in '.[]':
-                    end = i
-                    break
-            segments.append(path[:end])
-            path = path[end:]
-        else:
-            # 字段名在开头（理论上不应出现，但做兼容处理）
-            end = len(path)
-            for i, c in enumerate(path):
-                if c in '.[]':
-                    end = i
-                    break
-            segments.append(path[:end])
-            path = path[end:]
-
-    return segments
-
-
 # ---------------------------------------------------------------------------
 # 树遍历
 # ---------------------------------------------------------------------------
@@ -143,25 +99,52 @@ def _is_translatable_string(node) -> bool:
 
 
 JsonParent = Union[Object, Array]
+# (json_path, parent, accessor, is_key_rename, trans_parent, trans_accessor)，见 _traverse_pair()
+JsonMatch = Tuple[str, JsonParent, Union[str, int], bool, Optional[object], Optional[Union[str, int]]]
+
+
+def _has_child(node, accessor: Union[str, int]) -> bool:
+    """判断 node 是否为对应的容器（Array / Object）且包含该下标或 key。"""
+    if isinstance(accessor, int):
+        return isinstance(node, Array) and 0 <= accessor < len(node.items)
+    return isinstance(node, Object) and accessor in node.dict
+
 
+def _get_child(node, accessor: Union[str, int]):
+    """按 key 或下标取子节点，node 不是对应的容器或没有该子节点时返回 None。"""
+    if not _has_child(node, accessor):
+        return None
+    if isinstance(accessor, int):
+        return node.items[accessor]
+    return node[accessor]
 
-def _traverse_path(
+
+def _traverse_pair(
     node,
+    trans_node,
     segments: List[str],
     current_path: str,
-) -> Iterator[Tuple[str, JsonParent, Union[str, int], bool]]:
-    """递归遍历路径段，生成匹配项。
+) -> Iterator[JsonMatch]:
+    """按路径段同时递归遍历原文树与译文树，生成匹配项。
+
+    译文树一侧按与原文相同的 key / 下标逐层取子节点，不存在时为 None 并继续随原文向下传递，
+    无需为每个词条重新解析路径并从根节点查找。
 
     Yields:
-        (json_path, parent, accessor, is_key_rename)
-        - json_path:     词条的 JSONPath 字符串，如 '$.nav_buoy.name'
-        - parent:        包含目标的父容器（Object / Array）
-        - accessor:      访问目标的 key (str) 或 index (int)
-        - is_key_rename: True 表示翻译 key 本身而非 value
+        (json_path, parent, accessor, is_key_rename, trans_parent, trans_accessor)
+        - json_path:      词条的 JSONPath 字符串，如 '$.nav_buoy.name'
+        - parent:         原文中包含目标的父容器（Object / Array）
+        - accessor:       访问目标的 key (str) 或 index (int)
+        - is_key_rename:  True 表示翻译 key 本身而非 value
+        - trans_parent:   译文树中与 parent 路径相同的节点，不存在时为 None
+        - trans_accessor: 普通词条与 accessor 相同；key 重命名词条为译文对象中同一位置的 key，
+                          没有对应位置时为 None
     """
     # 透明处理 Root
     if isinstance(node, Root):
         node = node.get_primary_obj()
+    if isinstance(trans_node, Root):
+        trans_node = trans_node.get_primary_obj()
 
     if not segments:
         return
@@ -177,10 +160,12 @@ def _traverse_path(
             child = node[key]
             new_path = _make_field_path(current_path, key)
             if rest:
-                yield from _traverse_path(child, rest, new_path)
+                yield from _traverse_pair(
+                    child, _get_child(trans_node, key), rest, new_path
+                )
             else:
                 if _is_translatable_string(child):
-                    yield (new_path, node, key, False)
+                    yield (new_path, node, key, False, trans_node, key)
 
     elif seg == '[*]':
         # 展开 Array 的所有元素
@@ -189,19 +174,23 @@ def _traverse_path(
         for i, item in enumerate(node.items):
             new_path = f'{current_path}[{i}]'
             if rest:
-                yield from _traverse_path(item, rest, new_path)
+                yield from _traverse_pair(item, _get_child(trans_node, i), rest, new_path)
             else:
                 if _is_translatable_string(item):
-                    yield (new_path, node, i, False)
+                    yield (new_path, node, i, False, trans_node, i)
 
     elif seg == '$key':
-        # 翻译 Object 的 key 本身
+        # 翻译 Object 的 key 本身，原文与译文的 key 按位置对应，每个对象只取一次 key 列表
         if not isinstance(node, Object):
             return
-        for key in list(node.dict.keys()):
+        trans_keys = (
+            list(trans_node.dict.keys()) if isinstance(trans_node, Object) else []
+        )
+        for idx, key in enumerate(list(node.dict.keys())):
             if key:
                 new_path = _make_field_path(current_path, key)
-                yield (new_path, node, key, True)
+                trans_key = trans_keys[idx] if idx < len(trans_keys) else None
+                yield (new_path, node, key, True, trans_node, trans_key)
 
     else:
         # 具名字段访问
@@ -210,28 +199,10 @@ def _traverse_path(
         child = node[seg]
         new_path = f'{current_path}.{seg}'
         if rest:
-            yield from _traverse_path(child, rest, new_path)
+            yield from _traverse_pair(child, _get_child(trans_node, seg), rest, new_path)
         else:
             if _is_translatable_string(child):
-                yield (new_path, node, seg, False)
-
-
-def _navigate_exact(root, segments: List[Union[str, int]]) -> Optional[Union[AlexsonString, Object, Array]]:
-    """在树中按精确路径导航，返回目标节点，找不到返回 None。"""
-    node = root.get_primary_obj() if isinstance(root, Root) else root
-    for seg in segments:
-        if isinstance(node, Root):
-            node = node.get_primary_obj()
-        if isinstance(seg, int):
-            if isinstance(node, Array) and 0 <= seg < len(node.items):
-                node = node.items[seg]
-            else:
-                return None
-        elif isinstance(node, Object) and seg in node.dict:
-            node = node[seg]
-        else:
-            return None
-    return node if isinstance(node, (AlexsonString, Object, Array)) else None
+                yield (new_path, node, seg, False, trans_node, seg)
 
 
 # ---------------------------------------------------------------------------
@@ -291,23 +262,29 @@ class JsonFile(DataFile):
             )
         return key
 
+    def _generate_context_prefix(self) -> str:
+        return f'{EXPORTED_STRING_CONTEXT_PREFIX}源文件：{self.path}\n数据路径：'
+
     def _generate_context(self, json_path: str, is_key_rename: bool = False) -> str:
-        context = f'{EXPORTED_STRING_CONTEXT_PREFIX}源文件：{self.path}\n数据路径：{json_path}'
+        """
+        生成上下文中前缀之后的部分，完整的上下文为 _generate_context_prefix() 加上该部分
+        """
+        context = json_path
         if is_key_rename:
             context += '\n（词条内容为json key值）'
         return context
 
-    def _iter_strings(
-        self, root: Root
-    ) -> Iterator[Tuple[str, JsonParent, Union[str, int], bool]]:
-        """遍历所有 text_paths，生成 (json_path, parent, accessor, is_key_rename)。"""
+    def _iter_strings(self) -> Iterator[JsonMatch]:
+        """遍历所有 text_paths，同时遍历原文树与译文树，生成匹配项（见 _traverse_pair）。"""
         for text_path in self.text_paths:
             try:
                 segments = _parse_path_segments(text_path)
             except ValueError as e:
                 self.logger.warning(f'路径表达式解析失败 {text_path!r}：{e}')
                 continue
-            yield from _traverse_path(root, segments, '$')
+            yield from _traverse_pair(
+                self._original_root, self._translation_root, segments, '$'
+            )
 
     def get_strings(self) -> List[String]:
         if self._original_root is None:
@@ -315,10 +292,17 @@ class JsonFile(DataFile):
 
         strings: List[String] = []
         seen_keys: Set[str] = set()
-
-        for json_path, orig_parent, accessor, is_key_rename in self._iter_strings(
-            self._original_root
-        ):
+        # 同一文件的词条共用上下文前缀
+        context_prefix = self._generate_context_prefix()
+
+        for (
+            json_path,
+            orig_parent,
+            accessor,
+            is_key_rename,
+            trans_parent,
+            trans_accessor,
+        ) in self._iter_strings():
             try:
                 key = self._generate_key(json_path, is_key_rename)
             except ValueError as e:
@@ -338,29 +322,16 @@ class JsonFile(DataFile):
                     continue
                 original = node.value
 
-            # 译文：从 translation_root 同路径取值
+            # 译文：译文树中同路径的值
             translation = ''
-            if self._translation_root is not None:
-                exact_segs = _parse_exact_path(json_path)
-                if is_key_rename:
-                    # key 重命名：按位置匹配译文树中对应位置的 key
-                    parent_segs = exact_segs[:-1]
-                    orig_key = str(accessor)
-                    trans_parent = _navigate_exact(self._translation_root, parent_segs)
-                    if isinstance(trans_parent, Object):
-                        assert isinstance(orig_parent, Object)
-                        orig_keys = list(orig_parent.dict.keys())
-                        trans_keys = list(trans_parent.dict.keys())
-                        try:
-                            idx = orig_keys.index(orig_key)
-                            if idx < len(trans_keys):
-                                translation = trans_keys[idx]
-                        except ValueError:
-                            pass
-                else:
-                    trans_node = _navigate_exact(self._translation_root, exact_segs)
-                    if isinstance(trans_node, AlexsonString) and trans_node.value:
-                        translation = trans_node.value
+            if is_key_rename:
+                # key 重命名：译文树中对应位置的 key
+                if isinstance(trans_parent, Object) and trans_accessor is not None:
+                    translation = str(trans_accessor)
+            else:
+                trans_node = _get_child(trans_parent, cast(Union[str, int], trans_accessor))
+                if isinstance(trans_node, AlexsonString) and trans_node.value:
+                    translation = trans_node.value
 
             stage = 1 if translation else 0
             strings.append(
@@ -370,6 +341,7 @@ class JsonFile(DataFile):
                     translation=translation,
                     stage=stage,
                     context=self._generate_context(json_path, is_key_rename),
+                    context_prefix=context_prefix,
                 )
             )
 
@@ -386,9 +358,14 @@ class JsonFile(DataFile):
 
         key_to_string = {s.key: s for s in strings}
 
-        for json_path, orig_parent, accessor, is_key_rename in self._iter_strings(
-            self._original_root
-        ):
+        for (
+            json_path,
+            orig_parent,
+            accessor,
+            is_key_rename,
+            trans_parent,
+            trans_accessor,
+        ) in self._iter_strings():
             try:
                 key = self._generate_key(json_path, is_key_rename)
             except ValueError:
@@ -411,24 +388,12 @@ class JsonFile(DataFile):
                 continue
             translation = pt_string.translation
 
-            exact_segs = _parse_exact_path(json_path)
-
             if is_key_rename:
-                parent_segs = exact_segs[:-1]
-                old_key = str(accessor)
-                trans_parent = _navigate_exact(self._translation_root, parent_segs)
                 if isinstance(trans_parent, Object) and isinstance(orig_parent, Object):
                     # 用位置匹配找到译文树中对应的 key（与 get_strings 保持一致）
-                    orig_keys = list(orig_parent.dict.keys())
-                    trans_keys = list(trans_parent.dict.keys())
-                    try:
-                        idx = orig_keys.index(old_key)
-                    except ValueError:
-                        self.logger.warning(f'在原文中找不到 key {old_key!r}：{key}')
-                        continue
-                    if idx >= len(trans_keys):
+                    if trans_accessor is None:
                         continue
-                    current_trans_key = trans_keys[idx]
+                    current_trans_key = str(trans_accessor)
                     if current_trans_key != translation:
                         if translation in trans_parent.dict:
                             pass  # 目标 key 已存在（中英文并存），跳过
@@ -441,30 +406,12 @@ class JsonFile(DataFile):
                     self.logger.warning(
                         f'在 {self.path} 中没有找到词条 key={key} 对应的位置，未写入译文'
                     )
+            elif _has_child(trans_parent, cast(Union[str, int], trans_accessor)):
+                trans_parent[trans_accessor] = AlexsonString(translation)
             else:
-                parent_segs = exact_segs[:-1]
-                last_seg = exact_segs[-1]
-                trans_parent = _navigate_exact(self._translation_root, parent_segs)
-
-                if isinstance(last_seg, int):
-                    if isinstance(trans_parent, Array) and 0 <= last_seg < len(
-                        trans_parent.items
-                    ):
-                        trans_parent[last_seg] = AlexsonString(translation)
-                    else:
-                        self.logger.warning(
-                            f'在 {self.path} 中没有找到词条 key={key} 对应的位置，未写入译文'
-                        )
-                elif isinstance(last_seg, str):
-                    if (
-                        isinstance(trans_parent, Object)
-                        and last_seg in trans_parent.dict
-                    ):
-                        trans_parent[last_seg] = AlexsonString(translation)
-                    else:
-                        self.logger.warning(
-                            f'在 {self.path} 中没有找到词条 key={key} 对应的位置，未写入译文'
-                        )
+                self.logger.warning(
+                    f'在 {self.path} 中没有找到词条 key={key} 对应的位置，未写入译文'
+                )
 
     def save_file(self) -> None:
         if self._translation_root is None:
@@ -472,16 +419,20 @@ class JsonFile(DataFile):
                 f'译文文件不存在，无法保存：{relative_path(self.translation_path)}'
             )
             return
-        self.translation_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.translation_path, 'w', encoding='utf-8') as f:
-            f.write(self._translation_root.to_alexson())
-        self.logger.info(f'已保存译文文件：{relative_path(self.translation_path)}')
+        if write_text_file(self.translation_path, self._translation_root.to_alexson()):
+            self.logger.info(f'已保存译文文件：{relative_path(self.translation_path)}')
+        else:
+            self.logger.info(f'译文文件内容未变化：{relative_path(self.translation_path)}')
 
     @classmethod
     def load_files_from_config(cls) -> Sequence['JsonFile']:
+        return [cls(**kwargs) for kwargs in cls.get_file_configs()]
+
+    @classmethod
+    def get_file_configs(cls) -> List[dict]:
         from para_tranz.utils.mapping import PARA_TRANZ_MAP, JsonMapItem
 
-        files: List['JsonFile'] = []
+        configs: List[dict] = []
         for item in PARA_TRANZ_MAP:
             if not isinstance(item, JsonMapItem):
                 continue
@@ -496,8 +447,8 @@ class JsonFile(DataFile):
                     cls.logger.warning(f'glob 模式未匹配到任何文件：{item.path}')
                 for actual_path in matched:
                     rel_path = actual_path.relative_to(ORIGINAL_PATH)
-                    files.append(cls(path=rel_path, text_paths=item.text_paths, output_path=output_path))
+                    configs.append(dict(path=rel_path, text_paths=item.text_paths, output_path=output_path))
             else:
-                files.append(cls(path=item_path, text_paths=item.text_paths, output_path=output_path))
+                configs.append(dict(path=item_path, text_paths=item.text_paths, output_path=output_path))
 
-        return files
+        return configs
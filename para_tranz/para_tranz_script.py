@@ -1,61 +1,74 @@
+import re
 import sys
 from os.path import abspath, dirname
 
 # 将父级目录加入到环境变量中，以便从命令行中运行本脚本
 sys.path.append(dirname(dirname(abspath(__file__))))
 
-from para_tranz.config import ENABLED_LOADERS
-from para_tranz.csv_loader.csv_file import CsvFile
-from para_tranz.jar_loader.jar_file import JavaJarFile
-from para_tranz.java_loader.java_file import JavaSourceFile
-from para_tranz.json_loader.json_file import JsonFile
-from para_tranz.txt_loader.txt_file import TxtFile
-from para_tranz.utils.mapping import PARA_TRANZ_MAP
-from para_tranz.utils.mapping_generation import (
-    generate_class_file_mapping_by_path,
-    print_class_mapping_result,
-)
-from para_tranz.utils.paratranz_api import download_paratranz_export
-from para_tranz.utils.search import print_search_results, search_for_string_in_jar_files
+import importlib
+from typing import List, Set, Tuple, Type
+
+from para_tranz.config import ENABLED_LOADERS, PARALLEL_JOBS
 from para_tranz.utils.util import DataFile, make_logger
 
 logger = make_logger('ParaTranzScript')
 
+# 加载器在使用时才导入，避免只使用部分功能时导入所有加载器
 _LOADER_MAP = {
-    'jar': JavaJarFile,
-    'csv': CsvFile,
-    'json': JsonFile,
-    'txt': TxtFile,
-    'java': JavaSourceFile,
+    'jar': ('para_tranz.jar_loader.jar_file', 'JavaJarFile'),
+    'csv': ('para_tranz.csv_loader.csv_file', 'CsvFile'),
+    'json': ('para_tranz.json_loader.json_file', 'JsonFile'),
+    'txt': ('para_tranz.txt_loader.txt_file', 'TxtFile'),
+    'java': ('para_tranz.java_loader.java_file', 'JavaSourceFile'),
 }
-loaders = [_LOADER_MAP[name] for name in ENABLED_LOADERS if name in _LOADER_MAP]
 
 
-def game_to_paratranz() -> None:
-    for Loader in loaders:
-        DataFile.save_json_files(Loader.load_files_from_config())
+def get_loaders() -> List[Type[DataFile]]:
+    loaders = []
+    for name in ENABLED_LOADERS:
+        if name in _LOADER_MAP:
+            module_name, class_name = _LOADER_MAP[name]
+            loaders.append(getattr(importlib.import_module(module_name), class_name))
+    return loaders
+
+
+def game_to_paratranz(jobs: int = PARALLEL_JOBS, force: bool = False) -> None:
+    from para_tranz.utils.scheduler import run_export
+
+    run_export(get_loaders(), jobs, force)
     logger.info('ParaTranz 词条导出完成')
 
 
-def paratranz_to_game() -> None:
-    for Loader in loaders:
-        for file in Loader.load_files_from_config():
-            file.update_from_json()
-            file.save_file()
+def paratranz_to_game(jobs: int = PARALLEL_JOBS, force: bool = False) -> None:
+    from para_tranz.utils.scheduler import run_import
+
+    run_import(get_loaders(), jobs, force)
     logger.info('ParaTranz 词条导入到译文数据完成')
 
 
-def download_and_import_from_paratranz() -> None:
+def download_and_import_from_paratranz(
+    jobs: int = PARALLEL_JOBS, force: bool = False
+) -> None:
+    from para_tranz.utils.paratranz_api import download_paratranz_export
+    from para_tranz.utils.scheduler import run_sync
+
     success = download_paratranz_export()
     if success:
-        paratranz_to_game()
-        game_to_paratranz()
+        # 每个文件只读取一次，写回译文后直接从内存中重新导出词条
+        run_sync(get_loaders(), jobs, force)
+        logger.info('ParaTranz 词条同步完成')
 
 
 def gen_mapping_by_class_path(class_path: str | None = None) -> None:
+    from para_tranz.utils.mapping_generation import (
+        generate_class_file_mapping_by_path,
+        print_class_mapping_result,
+    )
+
     print('请输入java jar文件及其中类文件的路径，以生成类文件映射项')
     print('例如：starfarer.api.jar:com/fs/starfarer/api/campaign/FleetAssignment.class')
     print('例如：com.fs.starfarer.api.campaign.FleetAssignment')
+    print('例如：FleetAssignment（只输入类名时在映射表中已有的类中查找）')
 
     if class_path is None:
         class_path = input('类文件路径：')
@@ -67,26 +80,87 @@ def gen_mapping_by_class_path(class_path: str | None = None) -> None:
 
 
 def format_map() -> None:
+    from para_tranz.utils.mapping import PARA_TRANZ_MAP
+
     merged = PARA_TRANZ_MAP.format()
     PARA_TRANZ_MAP.save()
     logger.info(f'map 格式化完成，合并了 {merged} 个重复条目')
 
 
 def search_string_in_jar_files(pattern: str | None = None) -> None:
+    from para_tranz.utils.search import (
+        print_search_results,
+        search_for_string_in_jar_files,
+    )
+
     if pattern is None:
-        pattern = input('请输入要查找的字符串：')
+        pattern = input('请输入要查找的字符串（前缀 i: 忽略大小写，re: 使用正则表达式）：')
     else:
         print(f'查找字符串：{pattern}')
-    results = search_for_string_in_jar_files(pattern.strip())
+    pattern = pattern.strip()
+
+    ignore_case = regex = False
+    while True:
+        if pattern.startswith('i:'):
+            ignore_case, pattern = True, pattern[2:]
+        elif pattern.startswith('re:'):
+            regex, pattern = True, pattern[3:]
+        else:
+            break
+
+    try:
+        results = search_for_string_in_jar_files(pattern, ignore_case, regex)
+    except re.error as e:
+        logger.error(f'正则表达式 "{pattern}" 无效：{e}')
+        return
     print_search_results(results)
     logger.info('字符串查找完成')
 
 
+def parse_argv(argv: List[str]) -> Tuple[List[str], Set[str], int]:
+    """
+    :return: (位置参数, 开关参数, 并行进程数)
+    """
+    args: List[str] = []
+    flags: Set[str] = set()
+    jobs = PARALLEL_JOBS
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == '--jobs' or arg.startswith('--jobs='):
+            if arg == '--jobs':
+                i += 1
+                value = argv[i] if i < len(argv) else ''
+            else:
+                value = arg.removeprefix('--jobs=')
+            try:
+                jobs = int(value)
+            except ValueError:
+                print(f'无效的并行进程数：{value}')
+                sys.exit(1)
+        elif arg.startswith('--'):
+            flags.add(arg)
+        else:
+            args.append(arg)
+        i += 1
+    return args, flags, jobs
+
+
 def mian() -> None:
     # 支持通过命令行参数直接指定操作，跳过交互式菜单
-    # 用法：python para_tranz_script.py [1|2|4|5]
-    if len(sys.argv) > 1:
-        option = sys.argv[1]
+    # 用法：python para_tranz_script.py [1|2|3|4|5] [参数] [--full-validate] [--jobs N] [--force]
+    # --full-validate：写回csv前校验全部行，而不是只校验有改动的行
+    # --jobs N：导出/导入时使用 N 个进程并行处理文件，N 为0时使用CPU核心数
+    # --force：忽略导出/导入清单，重新处理输入未变化的文件
+    args, flags, jobs = parse_argv(sys.argv[1:])
+    force = '--force' in flags
+    if '--full-validate' in flags:
+        from para_tranz.csv_loader.csv_file import CsvFile
+
+        CsvFile.full_validate = True
+
+    if args:
+        option = args[0]
     else:
         print('欢迎使用 远行星号 ParaTranz 词条导入导出工具')
         print('请选择您要进行的操作：')
@@ -101,17 +175,17 @@ def mian() -> None:
         # 7 - jar版本迁移（未实现）
         option = input('请输入选项数字：')
 
-    non_interactive = len(sys.argv) > 1
-    arg2 = sys.argv[2] if len(sys.argv) > 2 else None
+    non_interactive = len(args) > 0
+    arg2 = args[1] if len(args) > 1 else None
     while True:
         if option == '1':
-            game_to_paratranz()
+            game_to_paratranz(jobs, force)
             break
         elif option == '2':
-            paratranz_to_game()
+            paratranz_to_game(jobs, force)
             break
         elif option == '3':
-            download_and_import_from_paratranz()
+            download_and_import_from_paratranz(jobs, force)
             break
         elif option == '4':
             if non_interactive:
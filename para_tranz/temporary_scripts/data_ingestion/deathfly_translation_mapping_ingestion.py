@@ -5,8 +5,9 @@ from dataclasses import asdict
 
 from para_tranz.jar_loader.jar_file import JavaJarFile
 from para_tranz.config import PARA_TRANZ_PATH, PROJECT_DIRECTORY
+from para_tranz.utils.language import has_cjk
 from para_tranz.utils.mapping import PARA_TRANZ_MAP, JarMapItem
-from para_tranz.utils.util import contains_chinese, make_logger
+from para_tranz.utils.util import make_logger
 
 SCRIPT_PATH = PROJECT_DIRECTORY / 'para_tranz' / 'temporary_scripts' / 'data_ingestion'
 
@@ -122,7 +123,7 @@ def add_translation_to_exported_strings():
                         if original_text in original_to_translation:
                             new_translation = original_to_translation[original_text]
                             if (
-                                contains_chinese(new_translation)
+                                has_cjk(new_translation)
                                 and new_translation != string_item.translation
                             ):
                                 string_item.stage = 1  # 标记为已翻译
@@ -19,6 +19,7 @@ from para_tranz.utils.util import (
     make_logger,
     relative_path,
     should_write_translation,
+    write_text_file,
 )
 
 
@@ -95,16 +96,20 @@ class TxtFile(DataFile):
         if self._translation_text is None:
             self.logger.warning(f'译文内容为空，无法保存：{relative_path(self.translation_path)}')
             return
-        self.translation_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.translation_path, 'w', encoding='utf-8') as f:
-            f.write(self._translation_text)
-        self.logger.info(f'已保存译文文件：{relative_path(self.translation_path)}')
+        if write_text_file(self.translation_path, self._translation_text):
+            self.logger.info(f'已保存译文文件：{relative_path(self.translation_path)}')
+        else:
+            self.logger.info(f'译文文件内容未变化：{relative_path(self.translation_path)}')
 
     @classmethod
     def load_files_from_config(cls) -> Sequence['TxtFile']:
+        return [cls(**kwargs) for kwargs in cls.get_file_configs()]
+
+    @classmethod
+    def get_file_configs(cls) -> List[dict]:
         from para_tranz.utils.mapping import PARA_TRANZ_MAP, TxtMapItem
 
-        files: List['TxtFile'] = []
+        configs: List[dict] = []
         for item in PARA_TRANZ_MAP:
             if not isinstance(item, TxtMapItem):
                 continue
@@ -115,7 +120,7 @@ class TxtFile(DataFile):
                     cls.logger.warning(f'glob 模式未匹配到任何文件：{item.path}')
                 for actual_path in matched:
                     rel_path = actual_path.relative_to(ORIGINAL_PATH)
-                    files.append(cls(path=rel_path, output_path=output_path))
+                    configs.append(dict(path=rel_path, output_path=output_path))
             else:
-                files.append(cls(path=Path(item.path), output_path=output_path))
-        return files
+                configs.append(dict(path=Path(item.path), output_path=output_path))
+        return configs
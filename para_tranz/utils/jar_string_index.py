@@ -0,0 +1,340 @@
+import pickle
+import re
+import zipfile
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from para_tranz.config import JAR_STRING_INDEX_PATH, ORIGINAL_PATH
+from para_tranz.jar_loader.constant_table import ConstantTable
+from para_tranz.utils.util import make_logger, relative_path
+
+# 索引格式版本，修改索引结构时递增以使旧索引失效
+_INDEX_VERSION = 3
+_NGRAM_LENGTH = 3
+
+# (jar文件路径, class文件路径)
+ClassLocation = Tuple[str, str]
+# 压缩保存的编号列表：升序排列的 uint32 的原始字节
+PackedIds = bytes
+# 倒排表，从文件读取时为 PackedIds，更新索引时修改过的转换为 set，保存时重新压缩
+Postings = Union[PackedIds, Set[int]]
+
+
+def _ngrams(s: str) -> Set[str]:
+    return {s[i : i + _NGRAM_LENGTH] for i in range(len(s) - _NGRAM_LENGTH + 1)}
+
+
+def _pack_ids(ids: Iterable[int]) -> PackedIds:
+    return array('I', sorted(ids)).tobytes()
+
+
+def _iter_postings(postings: Postings) -> Union[memoryview, Set[int]]:
+    # 压缩的编号列表不复制数据，直接转换为 uint32 的 memoryview，可迭代或用于 set 运算
+    return memoryview(postings).cast('I') if isinstance(postings, bytes) else postings
+
+
+def _pack_postings(postings: Postings) -> PackedIds:
+    return postings if isinstance(postings, bytes) else _pack_ids(postings)
+
+
+def _get_mutable_postings(container, key) -> Set[int]:
+    """
+    获取 container[key] 的可修改形式，压缩的编号列表转换为 set 并写回 container
+    :param container: 以三元组为 key 的 dict，或以字符串编号为下标的 list
+    """
+    postings = container[key]
+    if isinstance(postings, bytes):
+        postings = container[key] = set(_iter_postings(postings))
+    return postings
+
+
+def make_string_matcher(
+    pattern: str, ignore_case: bool = False, regex: bool = False
+) -> Callable[[str], bool]:
+    """
+    生成判断字符串是否匹配查找条件的函数
+    :param pattern: 要查找的子串或正则表达式
+    :param ignore_case: 是否忽略大小写
+    :param regex: pattern 是否为正则表达式
+    """
+    if regex:
+        compiled = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        return lambda s: compiled.search(s) is not None
+    if ignore_case:
+        lowered = pattern.lower()
+        return lambda s: lowered in s.lower()
+    return lambda s: pattern in s
+
+
+class JarStringIndex:
+    """
+    所有映射中 jar 文件内被 String 常量引用的字符串的三元组（trigram）索引，用于快速查找原文字符串。
+
+    索引保存在 JAR_STRING_INDEX_PATH，以每个 class 文件的 CRC 和大小判断是否过期，
+    jar 更新后只重新读取有变化的 class 文件，jar 文件的修改时间与大小未变化时不打开 jar。
+    不再被任何 class 文件引用的字符串会从索引中删除，其编号留给之后新增的字符串复用，
+    因此索引大小不会随 jar 的多次更新而增长。
+
+    每次查找都需要读取整个索引，因此倒排表都以压缩的 uint32 字节保存，
+    读取时不需要重建大量的 set，只有更新索引时被修改的倒排表才会转换为 set。
+    """
+
+    logger = make_logger('JarStringIndex')
+
+    def __init__(self, path: Path = JAR_STRING_INDEX_PATH) -> None:
+        self.path = path
+
+        # 字符串编号 -> 字符串，已删除的字符串为 None
+        self.strings: List[Optional[str]] = []
+        # 字符串编号 -> 引用该字符串的 class 编号，为空时删除字符串
+        self.string_classes: List[Postings] = []
+        # 已删除的字符串编号，新增字符串时优先复用
+        self.free_ids: List[int] = []
+        # 小写字符串的三元组 -> 包含该三元组的字符串编号
+        self.ngrams: Dict[str, Postings] = {}
+        # class 编号 -> class 文件位置，已删除的 class 为 None
+        self.classes: List[Optional[ClassLocation]] = []
+        # 已删除的 class 编号，新增 class 时优先复用
+        self.free_class_ids: List[int] = []
+        # jar文件路径 -> class文件路径 -> (CRC, 文件大小, class 编号, 字符串编号)
+        self.class_entries: Dict[str, Dict[str, Tuple[int, int, int, PackedIds]]] = {}
+        # jar文件路径 -> (修改时间(ns), 大小)
+        self.jar_stats: Dict[str, Tuple[int, int]] = {}
+
+        # 字符串 -> 字符串编号，只在更新索引时用到，不保存到文件中
+        self._string_ids: Optional[Dict[str, int]] = None
+        self._modified = False
+
+    @classmethod
+    def load(cls, path: Path = JAR_STRING_INDEX_PATH) -> 'JarStringIndex':
+        index = cls(path)
+        if not path.exists():
+            return index
+        try:
+            with open(path, 'rb') as f:
+                version, state = pickle.load(f)
+        except Exception as e:
+            cls.logger.warning(f'读取字符串索引 {relative_path(path)} 失败，将重新生成：{e}')
+            return index
+        if version == _INDEX_VERSION:
+            index.__dict__.update(state)
+        return index
+
+    def save(self) -> None:
+        if not self._modified:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ngrams = {
+            ngram: _pack_postings(postings) for ngram, postings in self.ngrams.items()
+        }
+        self.string_classes = [_pack_postings(p) for p in self.string_classes]
+        state = {
+            'strings': self.strings,
+            'string_classes': self.string_classes,
+            'free_ids': self.free_ids,
+            'ngrams': self.ngrams,
+            'classes': self.classes,
+            'free_class_ids': self.free_class_ids,
+            'class_entries': self.class_entries,
+            'jar_stats': self.jar_stats,
+        }
+        temp_path = self.path.with_name(self.path.name + '.temp')
+        with open(temp_path, 'wb') as f:
+            pickle.dump((_INDEX_VERSION, state), f, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_path.replace(self.path)
+        self._modified = False
+
+    def _get_string_ids(self) -> Dict[str, int]:
+        if self._string_ids is None:
+            self._string_ids = {
+                s: string_id for string_id, s in enumerate(self.strings) if s is not None
+            }
+        return self._string_ids
+
+    def _add_string(self, s: str) -> int:
+        string_ids = self._get_string_ids()
+        string_id = string_ids.get(s)
+        if string_id is None:
+            if self.free_ids:
+                string_id = self.free_ids.pop()
+                self.strings[string_id] = s
+                self.string_classes[string_id] = set()
+            else:
+                string_id = len(self.strings)
+                self.strings.append(s)
+                self.string_classes.append(set())
+            string_ids[s] = string_id
+            for ngram in _ngrams(s.lower()):
+                self.ngrams.setdefault(ngram, set())
+                _get_mutable_postings(self.ngrams, ngram).add(string_id)
+        return string_id
+
+    def _add_class(
+        self, jar_path: str, class_path: str, crc: int, size: int, strings: List[str]
+    ) -> None:
+        if self.free_class_ids:
+            class_id = self.free_class_ids.pop()
+            self.classes[class_id] = (jar_path, class_path)
+        else:
+            class_id = len(self.classes)
+            self.classes.append((jar_path, class_path))
+        string_ids = {self._add_string(s) for s in strings}
+        for string_id in string_ids:
+            _get_mutable_postings(self.string_classes, string_id).add(class_id)
+        self.class_entries[jar_path][class_path] = (
+            crc,
+            size,
+            class_id,
+            _pack_ids(string_ids),
+        )
+
+    def _remove_class(self, jar_path: str, class_path: str) -> None:
+        _, _, class_id, string_ids = self.class_entries[jar_path].pop(class_path)
+        for string_id in _iter_postings(string_ids):
+            class_ids = _get_mutable_postings(self.string_classes, string_id)
+            class_ids.discard(class_id)
+            if not class_ids:
+                self._remove_string(string_id)
+        self.classes[class_id] = None
+        self.free_class_ids.append(class_id)
+
+    def _remove_string(self, string_id: int) -> None:
+        """
+        删除不再被任何 class 文件引用的字符串及其三元组，编号留待复用
+        """
+        s = self.strings[string_id]
+        for ngram in _ngrams(s.lower()):
+            postings = _get_mutable_postings(self.ngrams, ngram)
+            postings.discard(string_id)
+            if not postings:
+                del self.ngrams[ngram]
+        del self._get_string_ids()[s]
+        self.strings[string_id] = None
+        self.string_classes[string_id] = b''
+        self.free_ids.append(string_id)
+
+    def _remove_jar(self, jar_path: str) -> None:
+        if jar_path not in self.class_entries:
+            return
+        for class_path in list(self.class_entries[jar_path]):
+            self._remove_class(jar_path, class_path)
+        del self.class_entries[jar_path]
+        self.jar_stats.pop(jar_path, None)
+        self._modified = True
+
+    def update_jar(self, jar_path: str) -> None:
+        """
+        根据原文jar中每个class文件的 CRC 和大小，增量更新该jar的索引
+        jar文件的修改时间与大小和上次更新时相同时不打开jar文件
+        :param jar_path: 相对 original 文件夹的jar文件路径
+        """
+        full_path = ORIGINAL_PATH / jar_path
+        if not full_path.exists():
+            self.logger.warning(f'未找到jar文件 {relative_path(full_path)}，跳过索引')
+            self._remove_jar(jar_path)
+            return
+        stat = full_path.stat()
+        jar_stat = (stat.st_mtime_ns, stat.st_size)
+        if jar_path in self.class_entries and self.jar_stats.get(jar_path) == jar_stat:
+            return
+
+        entries = self.class_entries.setdefault(jar_path, {})
+        updated_count = 0
+        with zipfile.ZipFile(full_path) as zf:
+            infos = {
+                info.filename: info
+                for info in zf.infolist()
+                if info.filename.endswith('.class')
+            }
+
+            for class_path in [p for p in entries if p not in infos]:
+                self._remove_class(jar_path, class_path)
+                self._modified = True
+
+            for class_path, info in sorted(
+                infos.items(), key=lambda item: item[1].header_offset
+            ):
+                entry = entries.get(class_path)
+                if entry is not None and entry[:2] == (info.CRC, info.file_size):
+                    continue
+                if entry is not None:
+                    self._remove_class(jar_path, class_path)
+
+                try:
+                    table = ConstantTable(zf.read(info))
+                    strings = [c.string for c in table.get_utf8_constants_with_string_ref()]
+                except Exception as e:
+                    self.logger.warning(
+                        f'在 {jar_path} 中读取 class 文件 {class_path} 时出错，未加入索引：{e}'
+                    )
+                    strings = []
+
+                self._add_class(jar_path, class_path, info.CRC, info.file_size, strings)
+                updated_count += 1
+                self._modified = True
+
+        if self.jar_stats.get(jar_path) != jar_stat:
+            self.jar_stats[jar_path] = jar_stat
+            self._modified = True
+
+        if updated_count:
+            self.logger.info(f'已更新 {jar_path} 中 {updated_count} 个 class 文件的字符串索引')
+
+    def update(self, jar_paths: Iterable[str]) -> None:
+        """
+        增量更新指定jar文件的索引，并删除不在列表中的jar文件的索引，有变化时保存索引文件
+        """
+        jar_paths = list(jar_paths)
+        for jar_path in [p for p in self.class_entries if p not in jar_paths]:
+            self._remove_jar(jar_path)
+        for jar_path in jar_paths:
+            self.update_jar(jar_path)
+        self.save()
+
+    def _get_candidate_ids(self, pattern: str, regex: bool) -> Optional[Iterable[int]]:
+        """
+        :return: 可能包含 pattern 的字符串编号，无法使用三元组筛选时返回 None
+        """
+        if regex or len(pattern) < _NGRAM_LENGTH:
+            return None
+        postings_list = []
+        for ngram in _ngrams(pattern.lower()):
+            postings = self.ngrams.get(ngram)
+            if not postings:
+                return ()
+            postings_list.append(_iter_postings(postings))
+        # 从包含字符串最少的三元组开始求交集
+        postings_list.sort(key=len)
+        candidates = set(postings_list[0])
+        for postings in postings_list[1:]:
+            candidates.intersection_update(postings)
+            if not candidates:
+                return ()
+        return candidates
+
+    def search(
+        self, pattern: str, ignore_case: bool = False, regex: bool = False
+    ) -> List[Tuple[str, str, str]]:
+        """
+        查找包含 pattern 的字符串
+        :param pattern: 要查找的子串或正则表达式
+        :param ignore_case: 是否忽略大小写
+        :param regex: pattern 是否为正则表达式
+        :return: (jar文件路径, class文件路径, 字符串) 列表
+        """
+        matcher = make_string_matcher(pattern, ignore_case, regex)
+        candidate_ids = self._get_candidate_ids(pattern, regex)
+        if candidate_ids is None:
+            candidates = enumerate(self.strings)
+        else:
+            candidates = ((string_id, self.strings[string_id]) for string_id in candidate_ids)
+
+        results = []
+        for string_id, s in candidates:
+            if s is None or not matcher(s):
+                continue
+            for class_id in _iter_postings(self.string_classes[string_id]):
+                jar_path, class_path = self.classes[class_id]
+                results.append((jar_path, class_path, s))
+        return results
@@ -0,0 +1,114 @@
+"""
+词条文本的语言特征分类。
+
+判断文本中是否包含中文、拉丁字母、残留的英文单词，以及以 surrogateescape 解码得到的 Windows-1252 字符。
+每个特征都由编译好的字符类正则在 C 层扫描，找到第一个匹配即停止；纯 ASCII 文本不再扫描中文与 surrogate。
+
+运行 python -m para_tranz.utils.language 可在全部导出的 ParaTranz 数据上进行性能测试。
+"""
+import re
+from typing import Iterable, List
+
+# 特征位，classify_text() 的返回值为以下特征的按位或
+CJK = 1  # 包含中文（CJK 统一表意文字 U+4E00-U+9FA5）
+LATIN = 2  # 包含 ASCII 拉丁字母
+ENGLISH_WORD = 4  # 包含残留的英文单词：两个以上连续的字母，且不属于 $变量 或标识符的一部分
+SURROGATE = 8  # 包含 surrogateescape 解码产生的字符（游戏文件中以 Windows-1252 编码的引号等）
+
+_RE_CJK = re.compile('[\u4e00-\u9fa5]')
+_RE_LATIN = re.compile('[A-Za-z]')
+_RE_ENGLISH_WORD = re.compile(r'(?<![A-Za-z0-9_$.])[A-Za-z]{2,}(?![A-Za-z0-9_])')
+_RE_SURROGATE = re.compile('[\udc80-\udcff]')
+
+
+def has_cjk(s: str) -> bool:
+    # str.isascii() 为 O(1)，纯 ASCII 文本不可能包含中文
+    return not s.isascii() and _RE_CJK.search(s) is not None
+
+
+def has_latin(s: str) -> bool:
+    return _RE_LATIN.search(s) is not None
+
+
+def has_english_word(s: str) -> bool:
+    return _RE_ENGLISH_WORD.search(s) is not None
+
+
+def has_surrogate(s: str) -> bool:
+    return not s.isascii() and _RE_SURROGATE.search(s) is not None
+
+
+def classify_text(s: str) -> int:
+    """
+    计算文本的全部语言特征
+    :param s: 文本
+    :return: CJK、LATIN、ENGLISH_WORD、SURROGATE 的按位或
+    """
+    flags = 0
+    if _RE_LATIN.search(s) is not None:
+        flags = LATIN
+        if _RE_ENGLISH_WORD.search(s) is not None:
+            flags |= ENGLISH_WORD
+    if not s.isascii():
+        if _RE_CJK.search(s) is not None:
+            flags |= CJK
+        if _RE_SURROGATE.search(s) is not None:
+            flags |= SURROGATE
+    return flags
+
+
+def classify_texts(texts: Iterable[str]) -> List[int]:
+    """
+    批量计算文本的语言特征，结果与 texts 一一对应
+    """
+    return [classify_text(s) for s in texts]
+
+
+def _benchmark() -> None:
+    import timeit
+
+    from para_tranz.config import PARA_TRANZ_PATH
+    from para_tranz.utils.util import iter_json_array
+
+    def contains_chinese_loop(s: str) -> bool:
+        for _char in s:
+            if '\u4e00' <= _char <= '\u9fa5':
+                return True
+        return False
+
+    def contains_english_loop(s: str) -> bool:
+        for _char in s:
+            if 'a' <= _char <= 'z' or 'A' <= _char <= 'Z':
+                return True
+        return False
+
+    texts = []
+    for path in sorted(PARA_TRANZ_PATH.rglob('*.json')):
+        for item in iter_json_array(path):
+            texts.append(item['original'])
+            texts.append(item['translation'])
+    total_chars = sum(map(len, texts))
+    print(f'共 {len(texts)} 条文本（原文与译文），{total_chars} 个字符')
+
+    for a, b in ((contains_chinese_loop, has_cjk), (contains_english_loop, has_latin)):
+        assert [a(s) for s in texts] == [b(s) for s in texts]
+
+    cases = [
+        ('逐字符循环 contains_chinese', lambda: [contains_chinese_loop(s) for s in texts]),
+        ('has_cjk', lambda: [has_cjk(s) for s in texts]),
+        ('逐字符循环 contains_english', lambda: [contains_english_loop(s) for s in texts]),
+        ('has_latin', lambda: [has_latin(s) for s in texts]),
+        (
+            '逐字符循环 中文+英文',
+            lambda: [(contains_chinese_loop(s), contains_english_loop(s)) for s in texts],
+        ),
+        ('classify_text', lambda: [classify_text(s) for s in texts]),
+        ('classify_texts', lambda: classify_texts(texts)),
+    ]
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=1, repeat=5))
+        print(f'{name:<28} {seconds * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from para_tranz.config import MANIFEST_PATH
+from para_tranz.utils.util import make_logger, relative_path
+
+# 清单格式版本，修改清单结构或指纹计算方式时递增以使旧清单失效
+_MANIFEST_VERSION = 2
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _json_default(o: Any) -> str:
+    # 路径转换为相对项目目录的路径，使指纹不随项目所在位置变化
+    if isinstance(o, Path):
+        return relative_path(o).as_posix()
+    return str(o)
+
+
+def hash_json(data: Any) -> str:
+    """
+    计算可被 json 序列化的数据的 hash 值，用于映射表条目等配置的指纹
+    """
+    s = json.dumps(data, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+
+def _path_key(path: Path) -> str:
+    return str(relative_path(path)).replace('\\', '/')
+
+
+class Manifest:
+    """
+    记录导出/导入时各个 ParaTranz 数据文件对应的输入文件指纹，用于跳过未变化的文件。
+
+    同时缓存每个输入文件的 (修改时间, 大小, 内容hash)，文件修改时间与大小未变时不再读取文件内容。
+    """
+
+    logger = make_logger('Manifest')
+
+    def __init__(self, path: Path = MANIFEST_PATH) -> None:
+        self.path = path
+        # 文件路径 -> [修改时间(ns), 大小, sha1]
+        self.files: Dict[str, List] = {}
+        # 分区名（如 export） -> ParaTranz 数据文件路径 -> 记录
+        self.sections: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self._used_files: set = set()
+        self._modified = False
+
+    @classmethod
+    def load(cls, path: Path = MANIFEST_PATH) -> 'Manifest':
+        manifest = cls(path)
+        if not path.exists():
+            return manifest
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            cls.logger.warning(f'读取清单 {relative_path(path)} 失败，将重新生成：{e}')
+            return manifest
+        if data.get('version') == _MANIFEST_VERSION:
+            manifest.files = data.get('files', {})
+            manifest.sections = data.get('sections', {})
+        return manifest
+
+    def save(self) -> None:
+        if not self._modified:
+            return
+        # 只保留本次用到的文件的hash缓存，避免已删除的文件一直留在清单中
+        self.files = {k: v for k, v in self.files.items() if k in self._used_files}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.temp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {
+                    'version': _MANIFEST_VERSION,
+                    'files': self.files,
+                    'sections': self.sections,
+                },
+                f,
+                ensure_ascii=False,
+                indent=1,
+                sort_keys=True,
+            )
+        temp_path.replace(self.path)
+        self._modified = False
+
+    def hash_file(self, path: Path) -> str:
+        """
+        获取文件内容的 sha1，文件不存在时返回空字符串
+        """
+        key = _path_key(path)
+        self._used_files.add(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            if self.files.pop(key, None) is not None:
+                self._modified = True
+            return ''
+
+        cached = self.files.get(key)
+        if cached is not None and cached[:2] == [stat.st_mtime_ns, stat.st_size]:
+            return cached[2]
+
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            while chunk := f.read(_HASH_CHUNK_SIZE):
+                sha1.update(chunk)
+        digest = sha1.hexdigest()
+        self.files[key] = [stat.st_mtime_ns, stat.st_size, digest]
+        self._modified = True
+        return digest
+
+    @staticmethod
+    def hash_jar_classes(path: Path, class_paths: Iterable[str]) -> str:
+        """
+        根据 zip 目录中记录的 CRC 和大小计算jar中指定class文件的指纹，无需解压class文件
+        jar文件不存在时返回空字符串
+        """
+        if not path.exists():
+            return ''
+        with zipfile.ZipFile(path) as zf:
+            infos = {info.filename: info for info in zf.infolist()}
+        entries = []
+        for class_path in sorted(set(class_paths)):
+            info = infos.get(class_path)
+            entries.append(
+                (class_path, info.CRC, info.file_size) if info else (class_path,)
+            )
+        return hash_json(entries)
+
+    def get_entry(self, section: str, output_path: Path) -> Optional[Dict[str, str]]:
+        return self.sections.get(section, {}).get(_path_key(output_path))
+
+    def set_entry(self, section: str, output_path: Path, entry: Dict[str, str]) -> None:
+        self.sections.setdefault(section, {})[_path_key(output_path)] = entry
+        self._modified = True
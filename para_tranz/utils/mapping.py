@@ -1,14 +1,21 @@
+import bisect
 import dataclasses
+import hashlib
 import json
+import os
+import pickle
 import re
 from dataclasses import dataclass
 from typing import Dict, Iterator, List, Optional, Set, Tuple, Union, overload
 
-from para_tranz.config import MAP_PATH
+from para_tranz.config import MAP_PATH, MAP_SNAPSHOT_PATH
 from para_tranz.utils.util import SetEncoder, make_logger
 
 logger = make_logger('MappingLoader')
 
+# 快照格式版本，修改映射项数据结构时递增以使旧快照失效
+_SNAPSHOT_VERSION = 3
+
 
 @dataclass(frozen=True)
 class IncludeStringRule:
@@ -21,6 +28,10 @@ class IncludeStringRule:
         return {'val': self.val, 'occurs': sorted(self.occurs)}
 
 
+def _include_string_val(item: Union[str, dict]) -> str:
+    return item if isinstance(item, str) else item['val']
+
+
 @dataclass
 class ParaTranzMapItem:
     type: str
@@ -69,29 +80,28 @@ class JavaMapItem(ParaTranzMapItem):
     include_strings: List[Union[str, dict]] = dataclasses.field(default_factory=list)
 
     def __post_init__(self):
-        normalized = ClassFileMapItem(self.path, self.include_strings)
-        self.include_strings = normalized.include_strings
+        # 规则解析与索引由 ClassFileMapItem 完成，两者共用同一个 include_strings 列表
+        self._class_item = ClassFileMapItem(self.path, self.include_strings)
+        self.include_strings = self._class_item.include_strings
 
     def get_include_rules(self) -> List[IncludeStringRule]:
-        return ClassFileMapItem(self.path, self.include_strings).get_include_rules()
+        return self._class_item.get_include_rules()
 
     def get_include_rule(self, val: str) -> Optional[IncludeStringRule]:
-        return ClassFileMapItem(self.path, self.include_strings).get_include_rule(val)
+        return self._class_item.get_include_rule(val)
 
     def get_include_values(self) -> Set[str]:
-        return ClassFileMapItem(self.path, self.include_strings).get_include_values()
+        return self._class_item.get_include_values()
 
     def add_include_rule(self, rule: IncludeStringRule) -> None:
-        item = ClassFileMapItem(self.path, self.include_strings)
-        item.add_include_rule(rule)
-        self.include_strings = item.include_strings
+        self._class_item.add_include_rule(rule)
 
     def merge_from(self, other: 'JavaMapItem') -> None:
         for rule in other.get_include_rules():
             self.add_include_rule(rule)
 
     def search_for_string(self, pattern: str) -> List[str]:
-        return ClassFileMapItem(self.path, self.include_strings).search_for_string(pattern)
+        return self._class_item.search_for_string(pattern)
 
 
 @dataclass
@@ -100,6 +110,8 @@ class ClassFileMapItem:
     include_strings: List[Union[str, dict]] = dataclasses.field(default_factory=list)
 
     def __post_init__(self):
+        # 原文 -> 解析后的规则，与按原文排序的 include_strings 列表同步更新
+        self._rules: Dict[str, IncludeStringRule] = {}
         self.include_strings = self._normalize_include_strings(self.include_strings)
 
     def _normalize_include_strings(
@@ -108,23 +120,19 @@ class ClassFileMapItem:
         if not include_strings:
             return []
 
-        rules_by_val = {}
         normalized = []
 
         for item in include_strings:
             rule = self._parse_include_string_rule(item)
-            if rule.val in rules_by_val:
+            if rule.val in self._rules:
                 raise ValueError(
                     f'类 {self.path} 的 include_strings 中重复声明了原文 "{rule.val}"，'
                     f'请合并或删除重复规则'
                 )
-            rules_by_val[rule.val] = rule
+            self._rules[rule.val] = rule
             normalized.append(rule.to_json_value())
 
-        return sorted(
-            normalized,
-            key=lambda item: item if isinstance(item, str) else item['val'],
-        )
+        return sorted(normalized, key=_include_string_val)
 
     def _parse_include_string_rule(self, item: Union[str, dict]) -> IncludeStringRule:
         if isinstance(item, str):
@@ -171,24 +179,22 @@ class ClassFileMapItem:
         return IncludeStringRule(val, occurs_set)
 
     def get_include_rules(self) -> List[IncludeStringRule]:
-        return [self._parse_include_string_rule(item) for item in self.include_strings]
+        return [self._rules[_include_string_val(item)] for item in self.include_strings]
 
     def get_include_rule(self, val: str) -> Optional[IncludeStringRule]:
-        for rule in self.get_include_rules():
-            if rule.val == val:
-                return rule
-        return None
+        return self._rules.get(val)
 
     def get_include_values(self) -> Set[str]:
-        return {rule.val for rule in self.get_include_rules()}
+        return set(self._rules)
 
     def add_include_rule(self, rule: IncludeStringRule) -> None:
-        if self.get_include_rule(rule.val) is not None:
+        if rule.val in self._rules:
             raise ValueError(
                 f'类 {self.path} 的 include_strings 中重复声明了原文 "{rule.val}"'
             )
-        self.include_strings.append(rule.to_json_value())
-        self.include_strings = self._normalize_include_strings(self.include_strings)
+        self._rules[rule.val] = rule
+        # 原地插入以保持排序，JavaMapItem 与本对象共用该列表
+        bisect.insort(self.include_strings, rule.to_json_value(), key=_include_string_val)
 
     def merge_from(self, other: 'ClassFileMapItem') -> None:
         for rule in other.get_include_rules():
@@ -202,9 +208,9 @@ class ClassFileMapItem:
     def search_for_string(self, pattern: str) -> List[str]:
         included = set()
 
-        for rule in self.get_include_rules():
-            if pattern in rule.val:
-                included.add(rule.val)
+        for val in self._rules:
+            if pattern in val:
+                included.add(val)
 
         return sorted(list(included))
 
@@ -213,26 +219,39 @@ class ClassFileMapItem:
 class JarMapItem(ParaTranzMapItem):
     class_files: List[ClassFileMapItem]
 
+    def __post_init__(self):
+        self.reindex_class_files()
+
+    def reindex_class_files(self) -> None:
+        """
+        重建类文件路径索引，直接修改 class_files 列表后需要调用
+        """
+        self._class_index: Dict[str, ClassFileMapItem] = {}
+        for item in self.class_files:
+            self._class_index.setdefault(item.path, item)
+        # 类文件映射项增减时递增，供 ParaTranzMap 判断索引是否过期
+        self._version = getattr(self, '_version', 0) + 1
+
     def add_class_file_item(
         self,
         path: str,
         include_strings: Optional[List[Union[str, dict]]] = None,
     ):
-        self.class_files.append(
-            ClassFileMapItem(path, include_strings or [])
-        )
+        item = ClassFileMapItem(path, include_strings or [])
+        self.class_files.append(item)
+        self._class_index.setdefault(path, item)
+        self._version += 1
 
     def get_class_file_item(
         self, path: str, create: bool = False
     ) -> Optional[ClassFileMapItem]:
-        for item in self.class_files:
-            if item.path == path:
-                return item
+        item = self._class_index.get(path)
+        if item is not None:
+            return item
 
         if create:
-            item = ClassFileMapItem(path)
-            self.class_files.append(item)
-            return item
+            self.add_class_file_item(path)
+            return self._class_index[path]
 
         return None
 
@@ -248,9 +267,55 @@ class JarMapItem(ParaTranzMapItem):
         return cls(**d)
 
 
+class _ParaTranzMapIndexes:
+    """
+    ParaTranzMap 的查找索引：文件路径、类文件路径及类名到映射项。
+    映射项数量或任一jar映射项的类文件发生变化时失效
+    """
+
+    def __init__(self, items: List[ParaTranzMapItem]) -> None:
+        self.item_count = len(items)
+        self.jar_versions: List[Tuple[JarMapItem, int]] = []
+        self.items_by_path: Dict[str, ParaTranzMapItem] = {}
+        self.class_items_by_path: Dict[str, Tuple[JarMapItem, ClassFileMapItem]] = {}
+        self.class_items_by_name: Dict[str, List[Tuple[JarMapItem, ClassFileMapItem]]] = {}
+
+        for item in items:
+            self.items_by_path.setdefault(item.path, item)
+            if not isinstance(item, JarMapItem):
+                continue
+            self.jar_versions.append((item, item._version))
+            for class_item in item.class_files:
+                result = (item, class_item)
+                self.class_items_by_path.setdefault(class_item.path, result)
+                simple_name = class_item.path.rsplit('/', 1)[-1].removesuffix('.class')
+                self.class_items_by_name.setdefault(simple_name, []).append(result)
+
+    def is_valid_for(self, items: List[ParaTranzMapItem]) -> bool:
+        return len(items) == self.item_count and all(
+            item._version == version for item, version in self.jar_versions
+        )
+
+
 class ParaTranzMap:
+    """
+    para_tranz_map.json 映射表，在第一次访问 items 时才加载
+    """
+
     def __init__(self):
-        self.items: List[ParaTranzMapItem] = []
+        self._items: Optional[List[ParaTranzMapItem]] = None
+        self._indexes: Optional[_ParaTranzMapIndexes] = None
+
+    @property
+    def items(self) -> List[ParaTranzMapItem]:
+        if self._items is None:
+            self.load()
+        return self._items
+
+    @items.setter
+    def items(self, items: List[ParaTranzMapItem]) -> None:
+        self._items = items
+        self._indexes = None
 
     @overload
     def __getitem__(self, item: int) -> ParaTranzMapItem: ...
@@ -264,25 +329,103 @@ class ParaTranzMap:
     def __iter__(self) -> Iterator[ParaTranzMapItem]:
         return iter(self.items)
 
+    def _get_indexes(self) -> '_ParaTranzMapIndexes':
+        indexes = self._indexes
+        if indexes is None or not indexes.is_valid_for(self.items):
+            indexes = self._indexes = _ParaTranzMapIndexes(self.items)
+        return indexes
+
+    def add_item(self, item: ParaTranzMapItem) -> None:
+        self.items.append(item)
+        self._indexes = None
+
     def get_item_by_path(self, path: str) -> Optional[ParaTranzMapItem]:
-        for item in self.items:
-            if item.path == path:
-                return item
-        return None
+        return self._get_indexes().items_by_path.get(path)
 
     def get_jar_and_class_file_item_by_class_path(
         self, path: str
     ) -> Optional[Tuple[JarMapItem, ClassFileMapItem]]:
-        for item in self.items:
-            if isinstance(item, JarMapItem):
-                for class_file in item.class_files:
-                    if class_file.path == path:
-                        return item, class_file
-        return None
+        return self._get_indexes().class_items_by_path.get(path)
+
+    def find_class_file_items_by_name(
+        self, name: str
+    ) -> List[Tuple[JarMapItem, ClassFileMapItem]]:
+        """
+        按类名（不含包名）查找类文件映射项。存在同名类时返回所有同名类，
+        否则返回类名包含 name 的所有类（不区分大小写）
+        """
+        name = name.removesuffix('.class')
+        class_items_by_name = self._get_indexes().class_items_by_name
+        if name in class_items_by_name:
+            return list(class_items_by_name[name])
+
+        lowered = name.lower()
+        return [
+            result
+            for simple_name, results in class_items_by_name.items()
+            if lowered in simple_name.lower()
+            for result in results
+        ]
 
     def load(self) -> None:
-        with open(MAP_PATH, 'r', encoding='utf-8') as f:
-            self.items = [ParaTranzMapItem.from_dict(item) for item in json.load(f)]
+        """
+        加载映射表。映射表文件的修改时间和大小与快照一致，或内容hash与快照一致时，
+        直接使用快照中已校验和规范化的映射项，否则解析json并重新生成快照
+        """
+        stat = MAP_PATH.stat()
+        snapshot = self._read_snapshot()
+        if (
+            snapshot is not None
+            and snapshot['mtime_ns'] == stat.st_mtime_ns
+            and snapshot['size'] == stat.st_size
+        ):
+            self.items = snapshot['items']
+            return
+
+        content = MAP_PATH.read_bytes()
+        digest = hashlib.sha1(content).hexdigest()
+        if snapshot is not None and snapshot['digest'] == digest:
+            self.items = snapshot['items']
+        else:
+            self.items = [
+                ParaTranzMapItem.from_dict(item)
+                for item in json.loads(content.decode('utf-8'))
+            ]
+        self._write_snapshot(stat.st_mtime_ns, stat.st_size, digest)
+
+    @staticmethod
+    def _read_snapshot() -> Optional[dict]:
+        if not MAP_SNAPSHOT_PATH.exists():
+            return None
+        try:
+            with open(MAP_SNAPSHOT_PATH, 'rb') as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            logger.warning(f'读取映射表快照失败，将重新生成：{e}')
+            return None
+        if snapshot.get('version') != _SNAPSHOT_VERSION:
+            return None
+        return snapshot
+
+    def _write_snapshot(self, mtime_ns: int, size: int, digest: str) -> None:
+        snapshot = {
+            'version': _SNAPSHOT_VERSION,
+            'mtime_ns': mtime_ns,
+            'size': size,
+            'digest': digest,
+            'items': self.items,
+        }
+        try:
+            MAP_SNAPSHOT_PATH.parent.mkdir(parents=True, exist_ok=True)
+            # 并行导出/导入时多个进程可能同时写入快照，临时文件名中加入进程号
+            temp_path = MAP_SNAPSHOT_PATH.with_name(
+                f'{MAP_SNAPSHOT_PATH.name}.{os.getpid()}.temp'
+            )
+            with open(temp_path, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            temp_path.replace(MAP_SNAPSHOT_PATH)
+        except OSError as e:
+            logger.warning(f'写入映射表快照失败：{e}')
 
     def save(self) -> None:
         def _drop_none(d: dict) -> dict:
@@ -301,6 +444,10 @@ class ParaTranzMap:
         with open(MAP_PATH, 'w', encoding='utf-8') as f:
             f.write(json_str)
 
+        stat = MAP_PATH.stat()
+        digest = hashlib.sha1(MAP_PATH.read_bytes()).hexdigest()
+        self._write_snapshot(stat.st_mtime_ns, stat.st_size, digest)
+
     def format(self) -> int:
         """整理 map：合并重复 jar class 和重复 java 文件项。
         include_strings 严格禁止同一 val 重复声明。
@@ -319,6 +466,7 @@ class ParaTranzMap:
                     else:
                         seen[cls.path] = cls
                 item.class_files = sorted(seen.values(), key=lambda c: c.path)
+                item.reindex_class_files()
                 formatted_items.append(item)
                 continue
 
@@ -339,7 +487,6 @@ class ParaTranzMap:
 
 
 PARA_TRANZ_MAP = ParaTranzMap()
-PARA_TRANZ_MAP.load()
 
 if __name__ == '__main__':
     # cls1 = ClassFileMapItem(path='path.class', include_strings=['include', 'include'])
@@ -34,16 +34,13 @@ def generate_class_mapping_diff_string(
     :return: 可打印的对比信息，带有ANSI颜色标记
     """
 
-    included_rules = target_class_map.get_include_rules()
-
     def _is_included(source_rule) -> bool:
-        for target_rule in included_rules:
-            if target_rule.val != source_rule.val:
-                continue
-            if target_rule.occurs is None:
-                return True
-            return target_rule.occurs == source_rule.occurs
-        return False
+        target_rule = target_class_map.get_include_rule(source_rule.val)
+        if target_rule is None:
+            return False
+        if target_rule.occurs is None:
+            return True
+        return target_rule.occurs == source_rule.occurs
 
     diff_str = f'  "path": "{source_class_map.path}",\n'
     diff_str += '  "include_strings": [\n'
@@ -76,7 +73,8 @@ def generate_class_file_mapping_by_path(
     """
     通过类文件路径查找类，并生成类文件映射项
 
-    :param class_file_path: 类文件路径，格式为：[jar文件路径:]类文件路径[.class]。其中类文件路径可以使用'/'或'.'分隔每个包名和类名
+    :param class_file_path: 类文件路径，格式为：[jar文件路径:]类文件路径[.class]。其中类文件路径可以使用'/'或'.'分隔每个包名和类名，
+        也可以只输入类名或类名的一部分，在映射表中已有的类中查找
     :return: 类所处的jar文件映射项、生成的类文件映射项、已存在的类文件映射项（如果存在）
     """
 
@@ -106,6 +104,19 @@ def generate_class_file_mapping_by_path(
         class_path = normalize_class_path(class_file_path)
         result = PARA_TRANZ_MAP.get_jar_and_class_file_item_by_class_path(class_path)
 
+        # 只输入了类名（不含包名）时，按类名在映射表中查找
+        if not result and '/' not in class_path:
+            candidates = PARA_TRANZ_MAP.find_class_file_items_by_name(class_path)
+            if len(candidates) == 1:
+                result = candidates[0]
+                class_path = result[1].path
+            elif len(candidates) > 1:
+                logger.error(
+                    f'映射表中有 {len(candidates)} 个类与 {class_file_path} 匹配，请输入完整类路径：\n'
+                    + '\n'.join(f'{jar.path}:{cls.path}' for jar, cls in candidates)
+                )
+                return
+
         # 如果在 para_tranz_map.json 中找到了类文件映射项，那么就可以确定所属的jar文件
         if result:
             found_jar_item, existing_class_item = result
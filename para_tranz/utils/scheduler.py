@@ -0,0 +1,493 @@
+"""
+导出/导入任务的并行调度器。
+
+每个文件（一个csv、一个java源文件、一个json匹配文件、一个jar等）作为一个独立任务，
+在进程池中执行。主进程按任务提交顺序处理结果并输出子进程的日志，
+因此写出的 ParaTranz 数据文件与日志顺序都与逐个执行时一致。
+"""
+
+import logging
+import os
+import pickle
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from para_tranz import config
+from para_tranz.utils.manifest import Manifest, hash_json
+from para_tranz.utils.util import (
+    WRITE_STATS,
+    DataFile,
+    ExportedStrings,
+    LogCollector,
+    WriteStats,
+    init_worker_logging,
+    make_logger,
+    relative_path,
+    replay_log_records,
+)
+
+logger = make_logger('Scheduler')
+
+_EXPORT_SECTION = 'export'
+_IMPORT_SECTION = 'import'
+
+# 会影响导出/导入结果的配置项，计入分组指纹，修改其中任一项后所有分组都会重新处理
+# 在 config.py 中新增此类配置时需要同时加入此处
+_OUTPUT_CONFIG_NAMES = (
+    'OVERRIDE_STRING_STATUS',
+    'EXPORTED_STRING_CONTEXT_PREFIX',
+    'IGNORE_CONTEXT_PREFIX_MISMATCH_STRINGS',
+    'MAX_STRING_KEY_LENGTH',
+    'MIN_CLASS_VER',
+    'MAX_CLASS_VER',
+    'ORIGINAL_TEXT_MATCH_IGNORE_WHITESPACE_CHARS',
+    'UPDATE_STRING_ALLOW_EMPTY_TRANSLATION',
+    'REMOVE_TRANSLATION_WHEN_ORIGINAL_IS_EMPTY',
+)
+
+# (加载器类, 文件构造参数)
+FileUnit = Tuple[Type[DataFile], dict]
+# (加载器类, ParaTranz 数据文件路径)
+GroupKey = Tuple[Type[DataFile], Path]
+UnitFunc = Callable[[Type[DataFile], dict], Any]
+
+
+@dataclass
+class UnitResult:
+    elapsed: float
+    result: Any = None
+    error: Optional[BaseException] = None
+    error_text: str = ''
+    logs: Optional[List[logging.LogRecord]] = None
+    # 子进程中写入/跳过写入的文件数，由主进程累加到 WRITE_STATS
+    write_stats: Optional[WriteStats] = None
+
+
+_collector: Optional[LogCollector] = None
+
+
+def _get_worker_settings() -> Dict[str, Any]:
+    """
+    获取主进程中可被命令行参数修改的设置。
+    spawn 方式（Windows、macOS 的默认方式）启动的子进程会重新导入模块，
+    这些设置需要通过 _init_worker 显式传入，否则子进程只会使用 config 中的默认值
+    """
+    from para_tranz.csv_loader.csv_file import CsvFile
+
+    return {'csv_full_validate': CsvFile.full_validate}
+
+
+def _init_worker(settings: Dict[str, Any]) -> None:
+    global _collector
+    _collector = init_worker_logging()
+
+    from para_tranz.csv_loader.csv_file import CsvFile
+
+    CsvFile.full_validate = settings['csv_full_validate']
+
+
+def _run_unit(func: UnitFunc, loader: Type[DataFile], kwargs: dict) -> UnitResult:
+    start = time.perf_counter()
+    try:
+        result = UnitResult(0, result=func(loader, kwargs))
+    except Exception as e:
+        result = UnitResult(0, error=e, error_text=traceback.format_exc())
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _run_unit_in_worker(
+    func: UnitFunc, loader: Type[DataFile], kwargs: dict
+) -> UnitResult:
+    written, skipped = WRITE_STATS.written, WRITE_STATS.skipped
+    result = _run_unit(func, loader, kwargs)
+    result.write_stats = WriteStats(
+        WRITE_STATS.written - written, WRITE_STATS.skipped - skipped
+    )
+    if result.error is not None:
+        # 部分异常对象无法 pickle，此时只返回错误信息
+        try:
+            pickle.dumps(result.error)
+        except Exception:
+            result.error = RuntimeError(str(result.error))
+    result.logs = _collector.pop_records() if _collector else []
+    return result
+
+
+def _export_unit(
+    loader: Type[DataFile], kwargs: dict
+) -> Tuple[Path, ExportedStrings]:
+    file = loader(**kwargs)
+    return file.para_tranz_path, (loader, file.path, file.get_export_strings())
+
+
+def _import_unit(loader: Type[DataFile], kwargs: dict) -> None:
+    file = loader(**kwargs)
+    file.update_from_json()
+    file.save_file()
+
+
+def _sync_unit(
+    loader: Type[DataFile], kwargs: dict
+) -> Tuple[Path, ExportedStrings]:
+    # 写回后直接从内存中的数据导出词条，无需重新读取刚写入的文件
+    file = loader(**kwargs)
+    file.update_from_json()
+    file.save_file()
+    return file.para_tranz_path, (loader, file.path, file.get_export_strings())
+
+
+def collect_units(loaders: Sequence[Type[DataFile]]) -> List[FileUnit]:
+    units: List[FileUnit] = []
+    for loader in loaders:
+        units.extend((loader, kwargs) for kwargs in loader.get_file_configs())
+    return units
+
+
+def _unit_name(unit: FileUnit) -> str:
+    loader, kwargs = unit
+    path = kwargs.get('path')
+    return f'{loader.__name__}({relative_path(Path(path)) if path else kwargs})'
+
+
+def run_units(
+    units: Sequence[FileUnit],
+    func: UnitFunc,
+    jobs: int,
+    on_result: Callable[[int, Any], None],
+) -> Tuple[List[float], float]:
+    """
+    执行所有任务，并按提交顺序对每个任务的返回值调用 on_result
+    :param units: 任务列表
+    :param func: 在子进程中执行的任务函数，必须是模块级函数
+    :param jobs: 并行进程数，为1时在当前进程中逐个执行
+    :param on_result: 回调函数，参数为任务序号及任务返回值
+    :return: (每个任务的耗时, on_result 在主进程中的总耗时)，单位为秒
+    """
+    elapsed: List[float] = []
+    main_elapsed = 0.0
+
+    def handle(index: int, result: UnitResult) -> None:
+        nonlocal main_elapsed
+        if result.logs:
+            replay_log_records(result.logs)
+        if result.write_stats:
+            WRITE_STATS.written += result.write_stats.written
+            WRITE_STATS.skipped += result.write_stats.skipped
+        elapsed.append(result.elapsed)
+        if result.error is not None:
+            logger.error(f'处理 {_unit_name(units[index])} 时出错：\n{result.error_text}')
+            raise result.error
+        start = time.perf_counter()
+        on_result(index, result.result)
+        main_elapsed += time.perf_counter() - start
+
+    if jobs <= 1 or len(units) <= 1:
+        for index, (loader, kwargs) in enumerate(units):
+            handle(index, _run_unit(func, loader, kwargs))
+        return elapsed, main_elapsed
+
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(units)),
+        initializer=_init_worker,
+        initargs=(_get_worker_settings(),),
+    ) as executor:
+        futures: List[Future] = [
+            executor.submit(_run_unit_in_worker, func, loader, kwargs)
+            for loader, kwargs in units
+        ]
+        try:
+            for index, future in enumerate(futures):
+                handle(index, future.result())
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return elapsed, main_elapsed
+
+
+def _log_summary(
+    action: str,
+    units: Sequence[FileUnit],
+    elapsed: List[float],
+    main_elapsed: float,
+    wall: float,
+    jobs: int,
+) -> None:
+    """
+    :param main_elapsed: 只能在主进程中执行的部分（读取配置、合并写出数据文件等）的耗时
+    """
+    loader_times: Dict[str, List[float]] = defaultdict(list)
+    for (loader, _), t in zip(units, elapsed):
+        loader_times[loader.__name__].append(t)
+    for name, times in loader_times.items():
+        logger.info(f'{name}：{len(times)} 个文件，耗时合计 {sum(times):.2f} 秒')
+
+    # 各任务耗时与主进程耗时之和即为逐个执行时的近似耗时
+    serial = sum(elapsed) + main_elapsed
+    speedup = serial / wall if wall > 0 else 1.0
+    logger.info(
+        f'{action}共 {len(units)} 个任务，使用 {jobs} 个进程，总耗时 {wall:.2f} 秒，'
+        f'逐个执行预计耗时 {serial:.2f} 秒，加速比 {speedup:.2f}x'
+    )
+    logger.info(
+        f'写入了 {WRITE_STATS.written} 个文件，{WRITE_STATS.skipped} 个文件内容未变化，跳过写入'
+    )
+
+
+def normalize_jobs(jobs: int) -> int:
+    """
+    :param jobs: 并行进程数，小于等于0时使用CPU核心数
+    """
+    cpu_count = os.cpu_count() or 1
+    if jobs <= 0:
+        return cpu_count
+    if jobs > cpu_count:
+        # 进程数超过CPU核心数时不会更快，且会使各任务耗时偏高，导致加速比估算失真
+        logger.warning(f'并行进程数 {jobs} 超过CPU核心数，已改为 {cpu_count}')
+        return cpu_count
+    return jobs
+
+
+def _unit_key(unit: FileUnit) -> GroupKey:
+    loader, kwargs = unit
+    return loader, loader.get_output_path(kwargs)
+
+
+def _group_units(units: Sequence[FileUnit]) -> Dict[GroupKey, List[FileUnit]]:
+    """
+    将任务按 (加载器, ParaTranz 数据文件) 分组
+    """
+    groups: Dict[GroupKey, List[FileUnit]] = {}
+    for unit in units:
+        groups.setdefault(_unit_key(unit), []).append(unit)
+    return groups
+
+
+def _get_group_fingerprint(
+    key: GroupKey, grouped: Sequence[FileUnit], manifest: Manifest, *extra: Any
+) -> str:
+    """
+    计算一个分组中所有文件输入的指纹
+    :param extra: 其他需要计入指纹的数据
+    """
+    loader = key[0]
+    return hash_json(
+        [
+            loader.__name__,
+            [getattr(config, name) for name in _OUTPUT_CONFIG_NAMES],
+            *extra,
+            [loader.get_input_fingerprint(kwargs, manifest) for _, kwargs in grouped],
+        ]
+    )
+
+
+def _get_export_entry(
+    key: GroupKey, groups: Dict[GroupKey, List[FileUnit]], manifest: Manifest
+) -> Dict[str, str]:
+    return {
+        'fingerprint': _get_group_fingerprint(key, groups[key], manifest),
+        'output': manifest.hash_file(key[1]),
+    }
+
+
+def _get_import_entry(
+    key: GroupKey, groups: Dict[GroupKey, List[FileUnit]], manifest: Manifest
+) -> Dict[str, str]:
+    # 指纹包含 ParaTranz 数据文件以及写回后的原文、译文文件，
+    # 三者与上次导入后均相同时说明写回结果不会变化
+    return {
+        'fingerprint': _get_group_fingerprint(
+            key, groups[key], manifest, manifest.hash_file(key[1])
+        )
+    }
+
+
+def _filter_changed_units(
+    units: Sequence[FileUnit],
+    groups: Dict[GroupKey, List[FileUnit]],
+    is_changed: Callable[[GroupKey], bool],
+    action: str,
+) -> List[FileUnit]:
+    """
+    只保留有变化的分组中的任务，保持任务原有顺序
+    """
+    changed_keys = {key for key in groups if is_changed(key)}
+    skipped = len(groups) - len(changed_keys)
+    if skipped:
+        logger.info(f'{skipped} 个 ParaTranz 数据文件的输入未变化，跳过{action}')
+    return [unit for unit in units if _unit_key(unit) in changed_keys]
+
+
+class _ExportWriter:
+    """
+    按任务顺序收集导出的词条，某个加载器的最后一个任务完成后，
+    按 para_tranz_path 合并写出该加载器的所有数据文件并更新清单
+    """
+
+    def __init__(
+        self,
+        units: Sequence[FileUnit],
+        groups: Dict[GroupKey, List[FileUnit]],
+        manifest: Manifest,
+    ) -> None:
+        self.units = units
+        self.groups = groups
+        self.manifest = manifest
+        self.last_index = {loader: index for index, (loader, _) in enumerate(units)}
+        self.exported: Dict[Path, List[ExportedStrings]] = {}
+
+    def add(self, index: int, result: Tuple[Path, ExportedStrings]) -> None:
+        output_path, exported = result
+        self.exported.setdefault(output_path, []).append(exported)
+        loader = self.units[index][0]
+        if self.last_index[loader] != index:
+            return
+        for path, grouped in self.exported.items():
+            DataFile.save_json_group(path, grouped)
+            self.manifest.set_entry(
+                _EXPORT_SECTION,
+                path,
+                _get_export_entry((loader, path), self.groups, self.manifest),
+            )
+        self.exported.clear()
+
+
+def _run_with_manifest(
+    action: str,
+    loaders: Sequence[Type[DataFile]],
+    jobs: int,
+    func: UnitFunc,
+    is_changed: Callable[[GroupKey, Dict[GroupKey, List[FileUnit]], Manifest], bool],
+    make_on_result: Callable[
+        [List[FileUnit], Dict[GroupKey, List[FileUnit]], Manifest],
+        Callable[[int, Any], None],
+    ],
+) -> None:
+    """
+    跳过清单中记录的未变化分组，执行其余任务并保存清单，最后输出耗时统计
+    """
+    jobs = normalize_jobs(jobs)
+    start = time.perf_counter()
+    WRITE_STATS.written = WRITE_STATS.skipped = 0
+    manifest = Manifest.load()
+    all_units = collect_units(loaders)
+    groups = _group_units(all_units)
+    units = _filter_changed_units(
+        all_units, groups, lambda key: is_changed(key, groups, manifest), action
+    )
+    on_result = make_on_result(units, groups, manifest)
+
+    collect_elapsed = time.perf_counter() - start
+    try:
+        elapsed, main_elapsed = run_units(units, func, jobs, on_result)
+    finally:
+        manifest.save()
+    _log_summary(
+        action,
+        units,
+        elapsed,
+        collect_elapsed + main_elapsed,
+        time.perf_counter() - start,
+        jobs,
+    )
+
+
+def _record_import_on_group_done(
+    units: List[FileUnit],
+    groups: Dict[GroupKey, List[FileUnit]],
+    manifest: Manifest,
+) -> Callable[[int], None]:
+    """
+    返回在每个任务完成后调用的函数，分组中的文件全部写回后记录写回后的导入指纹
+    """
+    remaining: Dict[GroupKey, int] = defaultdict(int)
+    for unit in units:
+        remaining[_unit_key(unit)] += 1
+
+    def on_unit_done(index: int) -> None:
+        key = _unit_key(units[index])
+        remaining[key] -= 1
+        if remaining[key] == 0:
+            manifest.set_entry(
+                _IMPORT_SECTION, key[1], _get_import_entry(key, groups, manifest)
+            )
+
+    return on_unit_done
+
+
+def run_export(
+    loaders: Sequence[Type[DataFile]], jobs: int = 1, force: bool = False
+) -> None:
+    """
+    从原文和译文文件导出 ParaTranz 词条，每个加载器的文件仍按 para_tranz_path 合并写出
+    输入指纹与上次导出时相同，且数据文件未被修改的分组跳过导出
+    :param force: 为 True 时忽略清单，重新导出所有文件
+    """
+
+    def is_changed(key, groups, manifest) -> bool:
+        return force or manifest.get_entry(_EXPORT_SECTION, key[1]) != _get_export_entry(
+            key, groups, manifest
+        )
+
+    def make_on_result(units, groups, manifest):
+        return _ExportWriter(units, groups, manifest).add
+
+    _run_with_manifest('导出', loaders, jobs, _export_unit, is_changed, make_on_result)
+
+
+def run_import(
+    loaders: Sequence[Type[DataFile]], jobs: int = 1, force: bool = False
+) -> None:
+    """
+    将 ParaTranz 词条写回译文文件，与上次导入后相比数据文件及输入均未变化的分组跳过导入
+    :param force: 为 True 时忽略清单，重新导入所有文件
+    """
+
+    def is_changed(key, groups, manifest) -> bool:
+        return force or manifest.get_entry(_IMPORT_SECTION, key[1]) != _get_import_entry(
+            key, groups, manifest
+        )
+
+    def make_on_result(units, groups, manifest):
+        on_unit_done = _record_import_on_group_done(units, groups, manifest)
+        return lambda index, result: on_unit_done(index)
+
+    _run_with_manifest('导入', loaders, jobs, _import_unit, is_changed, make_on_result)
+
+
+def run_sync(
+    loaders: Sequence[Type[DataFile]], jobs: int = 1, force: bool = False
+) -> None:
+    """
+    将 ParaTranz 词条写回译文文件，并从同一个内存中的文件对象重新导出词条，每个文件只读取一次。
+    结果与先执行 run_import 再执行 run_export 相同
+    :param force: 为 True 时忽略清单，处理所有文件
+    """
+
+    def is_changed(key, groups, manifest) -> bool:
+        return (
+            force
+            or manifest.get_entry(_IMPORT_SECTION, key[1])
+            != _get_import_entry(key, groups, manifest)
+            or manifest.get_entry(_EXPORT_SECTION, key[1])
+            != _get_export_entry(key, groups, manifest)
+        )
+
+    def make_on_result(units, groups, manifest):
+        # 导入指纹需要在导出覆盖数据文件之前记录
+        on_unit_done = _record_import_on_group_done(units, groups, manifest)
+        writer = _ExportWriter(units, groups, manifest)
+
+        def on_result(index: int, result: Tuple[Path, ExportedStrings]) -> None:
+            on_unit_done(index)
+            writer.add(index, result)
+
+        return on_result
+
+    _run_with_manifest('同步', loaders, jobs, _sync_unit, is_changed, make_on_result)
@@ -1,30 +1,14 @@
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
 from typing import List, Optional
 
-from para_tranz.jar_loader.jar_file import JavaJarFile
+from para_tranz.utils.jar_string_index import JarStringIndex, make_string_matcher
 from para_tranz.utils.mapping import PARA_TRANZ_MAP, JarMapItem
 from para_tranz.utils.util import GREEN, colorize, make_logger
 
 logger = make_logger('JarStringSearch')
 
-# 缓存已加载的 jar 文件，避免每次搜索都重新解析所有 class 文件
-_jar_files_cache: Optional[List[JavaJarFile]] = None
-
-
-def _get_loaded_jar_files() -> List[JavaJarFile]:
-    global _jar_files_cache
-    if _jar_files_cache is None:
-        logger.info('首次加载，正在解析所有 jar 文件中的 class，耗时较长请耐心等待...')
-        jar_file_items = [
-            item for item in PARA_TRANZ_MAP.items if isinstance(item, JarMapItem)
-        ]
-        _jar_files_cache = [
-            JavaJarFile(**asdict(item), no_auto_load=True) for item in jar_file_items
-        ]
-        for jar_file in _jar_files_cache:
-            jar_file.load_all_classes_in_jar(False, True)
-        logger.info('加载完成，后续搜索将直接复用缓存')
-    return _jar_files_cache
+# 交互式查找时在多次查找之间复用已读取的索引，每次查找前仍会检查jar文件是否变化
+_jar_string_index: Optional[JarStringIndex] = None
 
 
 @dataclass
@@ -50,7 +34,17 @@ class StringSearchResult:
         return f'{self.jar_name}:{self.class_path}\n\t"{string}"'
 
 
-def search_for_string_in_jar_files(pattern: str) -> List[StringSearchResult]:
+def search_for_string_in_jar_files(
+    pattern: str, ignore_case: bool = False, regex: bool = False
+) -> List[StringSearchResult]:
+    """
+    在映射表和所有映射中的jar文件的原文中查找字符串
+    :param pattern: 要查找的子串或正则表达式
+    :param ignore_case: 是否忽略大小写
+    :param regex: pattern 是否为正则表达式
+    """
+    matcher = make_string_matcher(pattern, ignore_case, regex)
+
     # 首先在当前映射表中查找
     results = set()
 
@@ -60,28 +54,26 @@ def search_for_string_in_jar_files(pattern: str) -> List[StringSearchResult]:
     ]
     for jar_item in jar_file_items:
         for class_file_item in jar_item.class_files:
-            included = class_file_item.search_for_string(pattern)
-
-            for string in included:
-                results.add(
-                    StringSearchResult(
-                        jar_item.path, class_file_item.path, string, True
+            for rule in class_file_item.get_include_rules():
+                if matcher(rule.val):
+                    results.add(
+                        StringSearchResult(
+                            jar_item.path, class_file_item.path, rule.val, True
+                        )
                     )
-                )
 
-    # 然后在所有类文件中查找（jar 文件首次使用时加载，后续复用缓存）
+    # 然后通过字符串索引在所有类文件中查找（jar 文件有变化时先增量更新索引）
     logger.info(f'正在在所有类文件中查找字符串 "{pattern}"...')
-
-    for jar_file in _get_loaded_jar_files():
-        for class_file in jar_file.class_files.values():
-            strings = class_file.get_strings()
-            for s in strings:
-                if pattern in s.original:
-                    result = StringSearchResult(
-                        str(jar_file.path), str(class_file.path), s.original, False
-                    )
-                    if result not in results:
-                        results.add(result)
+    global _jar_string_index
+    if _jar_string_index is None:
+        _jar_string_index = JarStringIndex.load()
+    index = _jar_string_index
+    index.update(item.path for item in jar_file_items)
+
+    for jar_path, class_path, string in index.search(pattern, ignore_case, regex):
+        result = StringSearchResult(jar_path, class_path, string, False)
+        if result not in results:
+            results.add(result)
 
     logger.info(f'查找到 {len(results)} 个结果')
     return list(sorted(results, key=lambda x: (x.jar_name, x.class_path, x.string)))
@@ -1,13 +1,34 @@
-import dataclasses
 import hashlib
 import json
+import io
 import logging
+import os
+import re
 import sys
 import urllib.parse
 from collections import defaultdict
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Container,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from para_tranz.config import (
     LOG_FILE_PATH,
@@ -18,6 +39,7 @@ from para_tranz.config import (
     PROJECT_DIRECTORY,
     TRANSLATION_PATH,
 )
+from para_tranz.utils.language import has_cjk, has_latin, has_surrogate
 
 
 def relative_path(path: Path) -> Path:
@@ -70,7 +92,65 @@ class CustomFormatter(logging.Formatter):
         return formatter.format(record)
 
 
+_WRITE_BUFFER_SIZE = 64 * 1024
+
 _file_handler_initialized = False
+# 为 True 时处于并行任务的子进程中，日志记录由 LogCollector 收集后交给主进程输出
+_worker_logging = False
+
+
+class LogCollector(logging.Handler):
+    """
+    在子进程中收集日志记录，任务完成后随结果返回主进程，由主进程按任务顺序输出，避免日志交错
+    """
+
+    def __init__(self) -> None:
+        super().__init__(logging.NOTSET)
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # 提前格式化消息并丢弃参数与异常对象，保证记录可以被 pickle
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+    def pop_records(self) -> List[logging.LogRecord]:
+        records, self.records = self.records, []
+        return records
+
+
+def init_worker_logging() -> LogCollector:
+    """
+    在并行任务的子进程中调用，移除输出到控制台和日志文件的 handler，改为收集日志记录
+    """
+    global _worker_logging, _file_handler_initialized
+    _worker_logging = True
+    _file_handler_initialized = True
+
+    for handler in list(logging.root.handlers):
+        logging.root.removeHandler(handler)
+    for logger in list(logging.root.manager.loggerDict.values()):
+        if not isinstance(logger, logging.Logger):
+            continue
+        for handler in list(logger.handlers):
+            if getattr(handler, '_para_tranz_stdout', False):
+                logger.removeHandler(handler)
+
+    collector = LogCollector()
+    logging.root.addHandler(collector)
+    logging.root.setLevel(logging.NOTSET)
+    return collector
+
+
+def replay_log_records(records: List[logging.LogRecord]) -> None:
+    """
+    在主进程中输出子进程收集到的日志记录
+    """
+    for record in records:
+        make_logger(record.name).handle(record)
 
 
 def _init_file_handler() -> None:
@@ -79,7 +159,10 @@ def _init_file_handler() -> None:
         return
     _file_handler_initialized = True
 
-    file_handler = logging.FileHandler(LOG_FILE_PATH, mode='w', encoding='utf-8')
+    # delay=True: 直到第一条日志写入时才打开日志文件
+    file_handler = logging.FileHandler(
+        LOG_FILE_PATH, mode='w', encoding='utf-8', delay=True
+    )
     file_handler.setLevel(logging.DEBUG)
     file_handler.terminator = ''
     file_handler.setFormatter(logging.Formatter('[%(name)s][%(levelname)s] %(message)s \n'))
@@ -92,6 +175,9 @@ def make_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(logging.NOTSET)
 
+    if _worker_logging:
+        return logger
+
     if not any(getattr(handler, '_para_tranz_stdout', False) for handler in logger.handlers):
         handle_out = logging.StreamHandler(sys.stdout)
         handle_out.setLevel(LOG_LEVEL)
@@ -109,27 +195,295 @@ def make_logger(name: str) -> logging.Logger:
 
 
 @dataclass
+class WriteStats:
+    """
+    本次运行中写入的文件数与因内容未变化而跳过写入的文件数
+    """
+
+    written: int = 0
+    skipped: int = 0
+
+
+WRITE_STATS = WriteStats()
+
+
+class _CompareWriter(io.RawIOBase):
+    """
+    将写入的内容逐块与已有文件比较，直到出现不同才开始写入临时文件（并补上之前相同的部分）。
+    内容与已有文件完全相同时不会产生任何磁盘写入。
+    """
+
+    def __init__(self, path: Path) -> None:
+        super().__init__()
+        self.path = path
+        self.temp_path = path.with_name(f'{path.name}.{os.getpid()}.temp')
+        try:
+            self._existing: Optional[BinaryIO] = open(path, 'rb')
+        except FileNotFoundError:
+            self._existing = None
+        self._temp: Optional[BinaryIO] = None
+        self._matched = 0
+        self._aborted = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        if self._aborted:
+            return len(b)
+        if self._temp is None and self._existing is not None:
+            if self._existing.read(len(b)) == b:
+                self._matched += len(b)
+                return len(b)
+        if self._temp is None:
+            self._open_temp()
+        self._temp.write(b)
+        return len(b)
+
+    def _open_temp(self) -> None:
+        self._temp = open(self.temp_path, 'wb')
+        if self._existing is not None:
+            self._existing.seek(0)
+            remaining = self._matched
+            while remaining > 0:
+                chunk = self._existing.read(min(remaining, 1024 * 1024))
+                self._temp.write(chunk)
+                remaining -= len(chunk)
+            self._existing.close()
+            self._existing = None
+
+    def finish(self) -> bool:
+        """
+        :return: 是否写入了文件
+        """
+        if self._temp is None:
+            # 已有文件比新内容更长，或文件不存在（新内容为空）时仍需写入
+            if self._existing is None or self._existing.read(1):
+                self._open_temp()
+            else:
+                self._existing.close()
+                self._existing = None
+                return False
+        self._temp.close()
+        self._temp = None
+        os.replace(self.temp_path, self.path)
+        return True
+
+    def abort(self) -> None:
+        self._aborted = True
+        if self._existing is not None:
+            self._existing.close()
+            self._existing = None
+        if self._temp is not None:
+            self._temp.close()
+            self._temp = None
+            self.temp_path.unlink(missing_ok=True)
+
+
+class FileWriter:
+    """
+    文件内容有变化时才写入的原子写入器：
+
+        with FileWriter(path, newline='') as writer:
+            writer.file.write(...)
+        if writer.written:
+            ...
+
+    新内容与已有文件相同时不修改文件（修改时间也不变），否则先写入临时文件再替换原文件，
+    运行中途出错不会留下写了一半的文件。
+    """
+
+    logger = make_logger('util.py - FileWriter')
+
+    def __init__(
+        self,
+        path: Path,
+        binary: bool = False,
+        encoding: str = 'utf-8',
+        newline: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.binary = binary
+        self.encoding = encoding
+        self.newline = newline
+        self.written = False
+        self.file: Union[TextIO, BinaryIO, None] = None
+        self._raw: Optional[_CompareWriter] = None
+
+    def __enter__(self) -> 'FileWriter':
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._raw = _CompareWriter(self.path)
+        buffered = io.BufferedWriter(self._raw, buffer_size=_WRITE_BUFFER_SIZE)
+        if self.binary:
+            self.file = buffered
+        else:
+            self.file = io.TextIOWrapper(
+                buffered, encoding=self.encoding, newline=self.newline
+            )
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self._raw.abort()
+            self.file.close()
+            return
+        try:
+            self.file.flush()
+            self.written = self._raw.finish()
+        except BaseException:
+            self._raw.abort()
+            raise
+        finally:
+            self.file.close()
+
+        if self.written:
+            WRITE_STATS.written += 1
+        else:
+            WRITE_STATS.skipped += 1
+            self.logger.debug(f'{relative_path(self.path)} 的内容未变化，跳过写入')
+
+
+def write_text_file(
+    path: Path, text: str, encoding: str = 'utf-8', newline: Optional[str] = None
+) -> bool:
+    """
+    内容有变化时原子地写入文本文件
+    :return: 是否写入了文件
+    """
+    with FileWriter(path, encoding=encoding, newline=newline) as writer:
+        writer.file.write(text)
+    return writer.written
+
+
 class String:
-    key: str
-    original: str
-    translation: str
-    stage: int = 0  # 词条翻译状态，0为未翻译，1为已翻译，2为有疑问，3为已校对，5为已审核（二校），9为已锁定，-1为已隐藏
-    context: str = ''  # 词条的备注信息
+    """
+    ParaTranz 词条。
+
+    使用 __slots__ 以减少大量词条时的内存占用。上下文可以拆分为共享的前缀（如版本、文件、类信息）
+    与每个词条自己的部分保存，同一文件的词条共用同一个前缀字符串对象。
+    """
+
+    __slots__ = ('key', 'original', 'translation', 'stage', '_context_prefix', '_context')
 
-    def __post_init__(self) -> None:
+    def __init__(
+        self,
+        key: str,
+        original: str,
+        translation: str,
+        stage: int = 0,  # 词条翻译状态，0为未翻译，1为已翻译，2为有疑问，3为已校对，5为已审核（二校），9为已锁定，-1为已隐藏
+        context: str = '',  # 词条的备注信息
+        context_prefix: str = '',  # 上下文的共享前缀，完整的上下文为 context_prefix + context
+    ) -> None:
         # 如果从 ParaTranz 输出的 json 导入，则需要将\\n替换回\n
         # 本程序输出的 json 不应包含 \\n，原文中的\\n使用^n替代
-        self.original = self.original.replace('\\n', '\n')
-        self.translation = self.translation.replace('\\n', '\n')
+        self.key = key
+        self.original = original.replace('\\n', '\n')
+        self.translation = translation.replace('\\n', '\n')
+        self.stage = stage
+        self._context_prefix = context_prefix
+        self._context = context
+
+    @classmethod
+    def trusted(
+        cls,
+        key: str,
+        original: str,
+        translation: str,
+        stage: int = 0,
+        context: str = '',
+        context_prefix: str = '',
+    ) -> 'String':
+        """
+        由加载器从游戏文件生成词条时使用，跳过 \\n 的替换，调用方需保证原文与译文中不含 \\n
+        """
+        string = cls.__new__(cls)
+        string.key = key
+        string.original = original
+        string.translation = translation
+        string.stage = stage
+        string._context_prefix = context_prefix
+        string._context = context
+        return string
+
+    @property
+    def context(self) -> str:
+        if self._context_prefix:
+            return self._context_prefix + self._context
+        return self._context
+
+    @context.setter
+    def context(self, value: str) -> None:
+        self._context_prefix = ''
+        self._context = value
+
+    def _astuple(self) -> Tuple[str, str, str, int, str]:
+        return self.key, self.original, self.translation, self.stage, self.context
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    __hash__ = None  # 与 dataclass 一致，词条可变，不可哈希
+
+    def __repr__(self) -> str:
+        return (
+            f'String(key={self.key!r}, original={self.original!r}, '
+            f'translation={self.translation!r}, stage={self.stage!r}, '
+            f'context={self.context!r})'
+        )
 
     def as_dict(self) -> Dict:
-        return dataclasses.asdict(self)
+        return {
+            'key': self.key,
+            'original': self.original,
+            'translation': self.translation,
+            'stage': self.stage,
+            'context': self.context,
+        }
+
+
+# (加载器类, 文件路径, 导出词条)
+ExportedStrings = Tuple[Type['DataFile'], Path, List[String]]
 
 
 def should_write_translation(string: String, allow_empty: bool = False) -> bool:
     return string.stage > 0 and (bool(string.translation) or allow_empty)
 
 
+LocatorT = TypeVar('LocatorT')
+
+
+class ContextLocatorCache(Generic[LocatorT]):
+    """
+    按词条 key 缓存从词条上下文解析出的定位信息，同一次运行中同一词条的上下文只解析一次。
+    缓存时同时记录上下文原文，上下文变化时重新解析。
+    """
+
+    def __init__(self, parser: Callable[[str], LocatorT]) -> None:
+        self.parser = parser
+        self._cache: Dict[str, Tuple[str, LocatorT]] = {}
+
+    def get(self, string: String) -> LocatorT:
+        """
+        获取词条的定位信息，解析失败时抛出 parser 的异常，不缓存失败结果
+        """
+        context = string.context
+        cached = self._cache.get(string.key)
+        if cached is not None and cached[0] == context:
+            return cached[1]
+        locator = self.parser(context)
+        self._cache[string.key] = (context, locator)
+        return locator
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+if TYPE_CHECKING:
+    from para_tranz.utils.manifest import Manifest
+
+
 class DataFile:
     logger = make_logger('util.py - DataFile')
     export_empty_strings = False  # jar子类覆盖为True以允许导出空原文词条
@@ -143,16 +497,57 @@ class DataFile:
         output_path: Optional[Path] = None,
     ) -> None:
         self.path = Path(path)  # 相对 original 或者 localization 文件夹的路径
-        self.original_path = ORIGINAL_PATH / Path(
-            original_path if original_path else path
+        (
+            self.original_path,
+            self.translation_path,
+            self.para_tranz_path,
+        ) = self.resolve_paths(path, original_path, translation_path, output_path)
+
+    @staticmethod
+    def resolve_paths(
+        path: Union[str, Path],
+        original_path: Optional[Path] = None,
+        translation_path: Optional[Path] = None,
+        output_path: Optional[Path] = None,
+    ) -> Tuple[Path, Path, Path]:
+        """
+        计算文件的 (原文路径, 译文路径, ParaTranz 数据文件路径)
+        """
+        path = Path(path)
+        return (
+            ORIGINAL_PATH / Path(original_path if original_path else path),
+            TRANSLATION_PATH / Path(translation_path if translation_path else path),
+            output_path
+            if output_path is not None
+            else PARA_TRANZ_PATH / path.with_suffix('.json'),
         )
-        self.translation_path = TRANSLATION_PATH / Path(
-            translation_path if translation_path else path
+
+    @classmethod
+    def get_input_fingerprint(cls, kwargs: dict, manifest: 'Manifest') -> List[str]:
+        """
+        根据构造参数计算文件输入的指纹，包括配置本身及原文、译文文件的内容hash，
+        指纹不变时导出结果也不会变化
+        :param kwargs: get_file_configs 返回的构造参数
+        """
+        from para_tranz.utils.manifest import hash_json
+
+        original_path, translation_path, _ = cls.resolve_paths(
+            kwargs['path'],
+            kwargs.get('original_path'),
+            kwargs.get('translation_path'),
         )
-        if output_path is not None:
-            self.para_tranz_path = output_path
-        else:
-            self.para_tranz_path = PARA_TRANZ_PATH / self.path.with_suffix('.json')
+        return [
+            hash_json(kwargs),
+            manifest.hash_file(original_path),
+            manifest.hash_file(translation_path),
+        ]
+
+    @classmethod
+    def get_output_path(cls, kwargs: dict) -> Path:
+        """
+        根据构造参数计算文件对应的 ParaTranz 数据文件路径，无需读取文件
+        """
+        return cls.resolve_paths(kwargs['path'], output_path=kwargs.get('output_path'))[2]
 
     def get_strings(self) -> List[String]:
         raise NotImplementedError
@@ -160,6 +555,12 @@ class DataFile:
     def update_strings(self, strings: List[String]) -> None:
         raise NotImplementedError
 
+    def get_export_strings(self) -> List[String]:
+        """
+        获取需要导出到 ParaTranz 的词条，除非 export_empty_strings 为 True，否则跳过原文为空的词条
+        """
+        return [s for s in self.get_strings() if s.original or self.export_empty_strings]
+
     def save_json(self, ensure_ascii: bool = False, indent: int = 4) -> None:
         self.save_json_files([self], ensure_ascii, indent)
 
@@ -170,63 +571,71 @@ class DataFile:
         ensure_ascii: bool = False,
         indent: int = 4,
     ) -> None:
-        output_path_files: Dict[Path, List['DataFile']] = defaultdict(list)
+        output_path_files: Dict[Path, List[ExportedStrings]] = defaultdict(list)
         for file in files:
-            output_path_files[file.para_tranz_path].append(file)
-
-        for output_path, grouped_files in output_path_files.items():
-            strings: List[String] = []
-            for file in grouped_files:
-                file_strings = [
-                    s
-                    for s in file.get_strings()
-                    if s.original or file.export_empty_strings
-                ]
-                if not file_strings:
-                    file.logger.info(
-                        f'从 {relative_path(file.path)} 中未提取到可翻译词条，跳过导出'
-                    )
-                    continue
-                strings.extend(file_strings)
-                file.logger.info(
-                    f'从 {relative_path(file.path)} 中提取了 {len(file_strings)} 个词条'
-                )
+            output_path_files[file.para_tranz_path].append(
+                (type(file), file.path, file.get_export_strings())
+            )
 
-            if not strings:
-                if output_path.exists():
-                    cls.write_json_strings(output_path, [], ensure_ascii, indent)
-                    cls.logger.info(
-                        f'当前配置未导出任何词条，已清空 {relative_path(output_path)}'
-                    )
-                continue
+        for output_path, exported in output_path_files.items():
+            cls.save_json_group(output_path, exported, ensure_ascii, indent)
 
-            if output_path.exists() and not OVERRIDE_STRING_STATUS:
-                cls.logger.debug(
-                    f'Paratranz 平台数据文件 {relative_path(output_path)} 已存在，从中读取已翻译词条的词条stage状态'
+    @classmethod
+    def save_json_group(
+        cls,
+        output_path: Path,
+        exported: List[ExportedStrings],
+        ensure_ascii: bool = False,
+        indent: int = 4,
+    ) -> None:
+        """
+        将导出到同一个 ParaTranz 数据文件的词条合并写入该文件
+        :param output_path: ParaTranz 数据文件路径
+        :param exported: (加载器类, 文件路径, 导出词条) 列表，按文件顺序排列
+        """
+        strings: List[String] = []
+        for loader, path, file_strings in exported:
+            if not file_strings:
+                loader.logger.info(
+                    f'从 {relative_path(path)} 中未提取到可翻译词条，跳过导出'
                 )
-                special_stages = (1, 2, 3, 5, 9, -1)
-                existing_stages = {
-                    s.key: s.stage
-                    for s in cls.read_json_strings(output_path)
-                    if s.stage in special_stages
-                }
-                for s in strings:
-                    if s.key in existing_stages and s.stage != existing_stages[s.key]:
-                        cls.logger.debug(
-                            f'更新词条 {s.key} 的stage：{s.stage}->{existing_stages[s.key]}'
-                        )
-                        s.stage = existing_stages[s.key]
-
-            cls.write_json_strings(output_path, strings, ensure_ascii, indent)
-
-            source_text = (
-                str(relative_path(grouped_files[0].path))
-                if len(grouped_files) == 1
-                else f'{len(grouped_files)} 个文件'
+                continue
+            strings.extend(file_strings)
+            loader.logger.info(
+                f'从 {relative_path(path)} 中提取了 {len(file_strings)} 个词条'
             )
-            cls.logger.info(
-                f'从 {source_text} 中导出了 {len(strings)} 个词条到 {relative_path(output_path)}'
+
+        if not strings:
+            if output_path.exists():
+                cls.write_json_strings(output_path, [], ensure_ascii, indent)
+                cls.logger.info(
+                    f'当前配置未导出任何词条，已清空 {relative_path(output_path)}'
+                )
+            return
+
+        if output_path.exists() and not OVERRIDE_STRING_STATUS:
+            cls.logger.debug(
+                f'Paratranz 平台数据文件 {relative_path(output_path)} 已存在，从中读取已翻译词条的词条stage状态'
             )
+            special_stages = (1, 2, 3, 5, 9, -1)
+            existing_stages = cls.read_json_stages(output_path, special_stages)
+            for s in strings:
+                if s.key in existing_stages and s.stage != existing_stages[s.key]:
+                    cls.logger.debug(
+                        f'更新词条 {s.key} 的stage：{s.stage}->{existing_stages[s.key]}'
+                    )
+                    s.stage = existing_stages[s.key]
+
+        cls.write_json_strings(output_path, strings, ensure_ascii, indent)
+
+        source_text = (
+            str(relative_path(exported[0][1]))
+            if len(exported) == 1
+            else f'{len(exported)} 个文件'
+        )
+        cls.logger.info(
+            f'从 {source_text} 中导出了 {len(strings)} 个词条到 {relative_path(output_path)}'
+        )
 
     def update_from_json(self) -> None:
         """
@@ -254,27 +663,49 @@ class DataFile:
     def load_files_from_config(cls) -> Sequence['DataFile']:
         raise NotImplementedError
 
+    @classmethod
+    def get_file_configs(cls) -> List[dict]:
+        """
+        获取配置中每个文件的构造参数，load_files_from_config 与并行调度器均使用该参数创建文件对象
+        """
+        raise NotImplementedError
+
     @staticmethod
-    def read_json_strings(path: Path) -> List[String]:
-        strings = []
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)  # type:List[Dict]
-        for d in data:
-            strings.append(
-                String(
-                    d['key'],
-                    d['original'],
-                    d.get('translation', ''),
-                    d['stage'],
-                    d.get('context', ''),
-                )
+    def iter_json_strings(path: Path) -> Iterator[String]:
+        """
+        逐个读取 ParaTranz 数据文件中的词条，不将整个文件载入内存
+        """
+        for d in iter_json_array(path):
+            yield String(
+                d['key'],
+                d['original'],
+                d.get('translation', ''),
+                d['stage'],
+                d.get('context', ''),
             )
-        return strings
+
+    @staticmethod
+    def read_json_strings(path: Path) -> List[String]:
+        return list(DataFile.iter_json_strings(path))
+
+    @staticmethod
+    def read_json_stages(
+        path: Path, stages: Optional[Container[int]] = None
+    ) -> Dict[str, int]:
+        """
+        只读取 ParaTranz 数据文件中词条的 key 与 stage，不创建 String 对象
+        :param stages: 只保留 stage 在其中的词条，为 None 时保留所有词条
+        """
+        return {
+            d['key']: d['stage']
+            for d in iter_json_array(path)
+            if stages is None or d['stage'] in stages
+        }
 
     @staticmethod
     def write_json_strings(
         path: Path,
-        strings: List[String],
+        strings: Iterable[String],
         ensure_ascii: bool = False,
         indent: int = 4,
         sort: bool = True,
@@ -282,33 +713,121 @@ class DataFile:
         if sort:
             strings = sorted(strings, key=lambda s: s.key)
 
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            data = []
-            for string in strings:
-                data.append(string.as_dict())
-            json.dump(data, f, ensure_ascii=ensure_ascii, indent=indent)
+        with FileWriter(path) as writer:
+            write_json_array(
+                writer.file, (string.as_dict() for string in strings), ensure_ascii, indent
+            )
 
 
-# https://segmentfault.com/a/1190000017940752
-# 判断是否包含中文字符
-def contains_chinese(s: str) -> bool:
-    for _char in s:
-        if '\u4e00' <= _char <= '\u9fa5':
-            return True
-    return False
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_JSON_READ_CHUNK_SIZE = 64 * 1024
+_JSON_WRITE_BATCH_SIZE = 256
+
+
+def _json_number_may_continue(value: Any, buffer: str, end: int) -> bool:
+    """
+    判断解析出的元素是否可能在读取的内容末尾被截断。
+    数字在块边界处被分开时（如 '[1' 与 '.5]'、'[12' 与 'e3]'），
+    raw_decode 会只解析出前半部分，此时后面为空或紧跟小数点、指数符号
+    """
+    if end == len(buffer):
+        return True
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    next_char = buffer[end]
+    return next_char in '.eE' or next_char.isdigit()
 
 
-def contains_english(s: str) -> bool:
-    for _char in s:
-        if 'a' <= _char <= 'z' or 'A' <= _char <= 'Z':
-            return True
-    return False
+def iter_json_array(path: Path) -> Iterator[Any]:
+    """
+    逐个读取 json 文件中顶层数组的元素，每次只读取一小块文件内容
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        pos = 0
+        # start：等待 [，value：等待元素，first：等待第一个元素或 ]，after：等待 , 或 ]
+        state = 'start'
+        while True:
+            pos = _JSON_WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                chunk = f.read(_JSON_READ_CHUNK_SIZE)
+                if not chunk:
+                    raise ValueError(f'{relative_path(path)} 不是完整的 json 数组')
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+
+            c = buffer[pos]
+            if state == 'start':
+                if c != '[':
+                    raise ValueError(f'{relative_path(path)} 的顶层不是 json 数组')
+                pos += 1
+                state = 'first'
+            elif c == ']' and state in ('first', 'after'):
+                return
+            elif state == 'after':
+                if c != ',':
+                    raise ValueError(
+                        f'{relative_path(path)} 中数组元素之间缺少逗号：{buffer[pos:pos + 20]!r}'
+                    )
+                pos += 1
+                state = 'value'
+            else:
+                try:
+                    value, end = _JSON_DECODER.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    value, end = None, -1
+                # 元素不完整，或可能被截断（如数字）时读取更多内容后重新解析
+                if end == -1 or _json_number_may_continue(value, buffer, end):
+                    chunk = f.read(_JSON_READ_CHUNK_SIZE)
+                    if chunk:
+                        buffer, pos = buffer[pos:] + chunk, 0
+                        continue
+                    if end == -1:
+                        # 文件已读完，重新解析以抛出原始的解析错误
+                        _JSON_DECODER.raw_decode(buffer, pos)
+                yield value
+                pos = end
+                state = 'after'
+
+
+def write_json_array(
+    f: TextIO, items: Iterable[Any], ensure_ascii: bool = False, indent: Optional[int] = 4
+) -> None:
+    """
+    分批写出 json 数组的元素，输出与 json.dump(list(items), f, ensure_ascii, indent) 完全相同，
+    同一时间只有一批元素的文本在内存中
+    """
+    separator, end = (', ', '') if indent is None else (',', '\n')
+
+    f.write('[')
+    first = True
+    items = iter(items)
+    while batch := list(islice(items, _JSON_WRITE_BATCH_SIZE)):
+        text = json.dumps(batch, ensure_ascii=ensure_ascii, indent=indent)
+        # 去掉每批的 [ 与 ]，拼接后与整体序列化的结果相同
+        if not first:
+            f.write(separator)
+        first = False
+        f.write(text[1 : len(text) - len(end) - 1])
+    if not first:
+        f.write(end)
+    f.write(']')
+
+
+# https://segmentfault.com/a/1190000017940752
+# 判断是否包含中文字符
+# 保留旧名称以兼容其他脚本，新代码请直接使用 para_tranz.utils.language
+contains_chinese = has_cjk
+contains_english = has_latin
 
 
 # From processWithWiredChars.py
 # 由于游戏原文文件中可能存在以Windows-1252格式编码的字符（如前后双引号等），所以需要进行转换
 def replace_weird_chars(s: str) -> str:
+    # 这些字符由 surrogateescape 解码产生，不含 surrogate 的字符串（包括全部纯ASCII字符串）无需替换
+    if not has_surrogate(s):
+        return s
     return (
         s.replace('\udc94', '""')
         .replace('\udc93', '""')